@@ -2,8 +2,19 @@
 # IMPORTS
 # =========================
 
-from flask import Flask, render_template, request   # Framework web Flask
-from pipeline.prediction_pipeline import hybrid_recommendation  # Pipeline de recomendación
+from flask import Flask, render_template, request, jsonify, Response   # Framework web Flask
+from pipeline.prediction_pipeline import (                     # Pipeline de recomendación
+    cached_hybrid_recommendation,
+    recommend_batch,
+    load_artifacts
+)
+from src.serving.micro_batcher import MicroBatcher
+from src.serving.metrics import metrics
+from src.utils.common_funtions import read_yaml
+from src.config.paths_config import CONFIG_PATH
+from src.logger import get_logger
+
+logger = get_logger(__name__)
 
 
 # =========================
@@ -17,6 +28,22 @@ app = Flask(
 )
    # Crea la aplicación Flask
 
+# Carga pesos, diccionarios y dataframes una sola vez al arrancar
+# (se comparten entre todas las peticiones)
+load_artifacts()
+
+# Micro-batcher: agrupa peticiones concurrentes de un solo usuario
+# en una única llamada vectorizada al pipeline
+micro_batch_config = read_yaml(CONFIG_PATH).get("serving", {}).get("micro_batch", {})
+
+micro_batcher = None
+if micro_batch_config.get("enabled", False):
+    micro_batcher = MicroBatcher(
+        lambda user_ids, params: recommend_batch(user_ids, *params),
+        max_batch_size=micro_batch_config.get("max_batch_size", 64),
+        max_wait_ms=micro_batch_config.get("max_wait_ms", 5)
+    )
+
 
 # =========================
 # HOME ROUTE
@@ -33,15 +60,17 @@ def home():
 
     # Si el formulario se envía (POST)
     if request.method == 'POST':
+        metrics.inc("http_requests_total", route="home")
         try:
             # Obtiene el userID desde el formulario HTML y lo convierte a entero
             user_id = int(request.form["userID"])
 
-            # Ejecuta el sistema híbrido de recomendación
-            recommendations = hybrid_recommendation(user_id)
+            # Ejecuta el sistema híbrido de recomendación (con caché de resultados)
+            recommendations = cached_hybrid_recommendation(user_id)
 
         except Exception as e:
             # Manejo básico de errores
+            metrics.inc("http_errors_total", route="home")
             print("Erorr occured....")
 
     # Renderiza la plantilla HTML y pasa las recomendaciones
@@ -51,6 +80,76 @@ def home():
     )
 
 
+# =========================
+# JSON API
+# =========================
+# POST /api/recommend  {"user_id": 1} o {"user_ids": [1, 2, 3]}
+# Parámetros opcionales: user_weight, content_weight, n
+# GET  /api/recommend?user_id=1&user_id=2&n=5 también es válido
+
+@app.route('/api/recommend', methods=['GET', 'POST'])
+def api_recommend():
+    metrics.inc("http_requests_total", route="api_recommend")
+    payload = request.get_json(silent=True) or {}
+    args = request.args
+
+    try:
+        if "user_ids" in payload:
+            user_ids = [int(user_id) for user_id in payload["user_ids"]]
+        elif "user_id" in payload:
+            user_ids = [int(payload["user_id"])]
+        else:
+            user_ids = [int(user_id) for user_id in args.getlist("user_id")]
+
+        user_weight = float(payload.get("user_weight", args.get("user_weight", 0.5)))
+        content_weight = float(payload.get("content_weight", args.get("content_weight", 0.5)))
+        n = int(payload.get("n", args.get("n", 10)))
+    except (TypeError, ValueError):
+        metrics.inc("http_errors_total", route="api_recommend")
+        return jsonify({"error": "Invalid request parameters"}), 400
+
+    if not user_ids:
+        metrics.inc("http_errors_total", route="api_recommend")
+        return jsonify({"error": "user_id or user_ids is required"}), 400
+
+    try:
+        params = (user_weight, content_weight, n)
+
+        # Un solo usuario -> micro-batcher (se agrupa con peticiones concurrentes)
+        if len(user_ids) == 1 and micro_batcher is not None:
+            results = [micro_batcher(user_ids[0], params)]
+        else:
+            results = recommend_batch(user_ids, *params)
+    except Exception as e:
+        metrics.inc("http_errors_total", route="api_recommend")
+        logger.error(f"Recommendation failed for users {user_ids}: {e}")
+        return jsonify({"error": "Recommendation failed"}), 500
+
+    return jsonify({
+        "results": [
+            {
+                "user_id": user_id,
+                "recommendations": [
+                    {"anime_id": anime_id, "name": name, "score": score}
+                    for anime_id, name, score in result
+                ],
+            }
+            for user_id, result in zip(user_ids, results)
+        ]
+    })
+
+
+# =========================
+# METRICS
+# =========================
+# Latencias por etapa (p50/p95/p99), contadores de peticiones, errores,
+# aciertos de caché y candidatos por etapa en formato Prometheus
+
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
 # =========================
 # MAIN ENTRY POINT
 # =========================
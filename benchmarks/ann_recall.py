@@ -0,0 +1,63 @@
+# =========================
+# ANN RECALL vs LATENCY
+# =========================
+# Compara el índice IVF/IVF-PQ con la búsqueda exacta sobre los pesos de
+# usuario (o una matriz sintética) y guarda el informe en ANN_REPORT_PATH.
+#
+#   python -m benchmarks.ann_recall
+#   python -m benchmarks.ann_recall --synthetic 200000 --pq-subvectors 16
+
+import argparse
+import json
+import os
+import time
+
+import joblib
+import numpy as np
+
+from src.config.paths_config import *
+from src.data_trainer.ann_index import IVFIndex, recall_latency_report
+from src.utils.common_funtions import read_yaml
+
+
+def parse_args():
+    ann_config = read_yaml(CONFIG_PATH).get("ann", {})
+
+    parser = argparse.ArgumentParser(description="ANN recall vs latency report")
+    parser.add_argument("--weights", default=USER_WEIGHTS_PATH)
+    parser.add_argument("--synthetic", type=int, default=0,
+                        help="nº de filas de una matriz aleatoria (0 = usar --weights)")
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--n-lists", type=int, default=ann_config.get("n_lists", 1024))
+    parser.add_argument("--pq-subvectors", type=int, default=ann_config.get("pq_subvectors", 0))
+    parser.add_argument("--n-probes", type=int, nargs="+", default=[1, 4, 16, 64, 256])
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--output", default=ANN_REPORT_PATH)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    if args.synthetic:
+        rng = np.random.default_rng(0)
+        weights = rng.normal(size=(args.synthetic, args.dim)).astype(np.float32)
+        weights /= np.linalg.norm(weights, axis=1, keepdims=True)
+    else:
+        weights = np.asarray(joblib.load(args.weights), dtype=np.float32)
+
+    start = time.perf_counter()
+    index = IVFIndex(n_lists=args.n_lists, pq_subvectors=args.pq_subvectors).fit(weights)
+    build_seconds = time.perf_counter() - start
+
+    report = recall_latency_report(
+        weights, index, n_queries=args.queries, k=args.k, n_probes=args.n_probes
+    )
+    report["build_seconds"] = build_seconds
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(json.dumps(report, indent=2))
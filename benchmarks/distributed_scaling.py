@@ -0,0 +1,60 @@
+# =========================
+# DISTRIBUTED SCALING
+# =========================
+# Throughput del entrenamiento data-parallel (launch_local_workers) con
+# 1..N procesos locales sobre el dataset procesado, con el mismo batch
+# global y los mismos pasos por época. Eficiencia = speedup / workers.
+#
+#   python -m benchmarks.distributed_scaling
+#   python -m benchmarks.distributed_scaling --workers 1 2 4 8 --steps 100
+
+import argparse
+import json
+import os
+
+from src.config.paths_config import *
+from src.data_trainer.distributed import launch_local_workers
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Distributed training scaling report")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--epochs", type=int, default=2)
+    parser.add_argument("--steps", type=int, default=50, help="pasos por época")
+    parser.add_argument("--threads-per-worker", type=int, default=0)
+    parser.add_argument("--output", default=DISTRIBUTED_SCALING_REPORT)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    runs = []
+    for n_workers in args.workers:
+        reports = launch_local_workers(
+            n_workers, epochs=args.epochs, steps_per_epoch=args.steps,
+            threads_per_worker=args.threads_per_worker, save_model=False
+        )
+        chief = reports[0]
+        # La primera época incluye el trazado de la función de entrenamiento
+        epoch_seconds = chief["epoch_seconds"][1:] or chief["epoch_seconds"]
+        runs.append({
+            "workers": n_workers,
+            "epoch_seconds": chief["epoch_seconds"],
+            "samples_per_second": args.steps * chief["global_batch_size"] * len(epoch_seconds) / sum(epoch_seconds),
+        })
+        print(f"{n_workers} workers: {runs[-1]['samples_per_second']:.0f} samples/s")
+
+    base = runs[0]
+    for run in runs:
+        speedup = run["samples_per_second"] / base["samples_per_second"]
+        run["speedup"] = speedup
+        run["efficiency"] = speedup / (run["workers"] / base["workers"])
+
+    report = {"cpu_count": os.cpu_count(), "epochs": args.epochs, "steps_per_epoch": args.steps, "runs": runs}
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,167 @@
+# =========================
+# INGESTION
+# =========================
+# Mide la ingesta contra un LocalStorage (sin red): la versión anterior
+# (descargas secuenciales, animelist.csv completo + read_csv(nrows) +
+# to_csv), la nueva en secuencial y en paralelo, y una segunda ejecución
+# sin cambios (se salta la descarga). --mbps limita el ancho de banda de
+# cada descarga para simular la latencia de GCS.
+#
+#   python -m benchmarks.ingestion
+#   python -m benchmarks.ingestion --source /ruta/al/bucket --mbps 100
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.config.paths_config import *
+from src.data_ingestion.ingestion import DataIngestion
+from src.data_ingestion.storage import LocalStorage
+
+FILE_NAMES = ["anime.csv", "anime_with_synopsis.csv", "animelist.csv"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Ingestion benchmark")
+    parser.add_argument("--source", default=None,
+                        help="directorio con los CSV de origen (por defecto, datos sintéticos)")
+    parser.add_argument("--rows", type=int, default=20000000,
+                        help="filas de animelist.csv sintético")
+    parser.add_argument("--max-rows", type=int, default=5000000)
+    parser.add_argument("--mbps", type=float, default=0,
+                        help="límite de MB/s por descarga; 0 = sin límite")
+    parser.add_argument("--output", default=INGESTION_BENCHMARK_REPORT)
+    return parser.parse_args()
+
+
+def synthetic_source(directory, n_rows, rng):
+    n_anime = 20000
+    pd.DataFrame({
+        "MAL_ID": np.arange(1, n_anime + 1),
+        "Name": [f"Name {i}" for i in range(1, n_anime + 1)],
+        "Score": rng.uniform(1, 10, n_anime).round(2),
+    }).to_csv(os.path.join(directory, "anime.csv"), index=False)
+
+    pd.DataFrame({
+        "MAL_ID": np.arange(1, n_anime + 1),
+        "sypnopsis": ["Lorem ipsum dolor sit amet " * 20] * n_anime,
+    }).to_csv(os.path.join(directory, "anime_with_synopsis.csv"), index=False)
+
+    path = os.path.join(directory, "animelist.csv")
+    block = 5000000
+    for start in range(0, n_rows, block):
+        size = min(block, n_rows - start)
+        pd.DataFrame({
+            "user_id": np.sort(rng.integers(0, 350000, size)),
+            "anime_id": rng.integers(1, n_anime + 1, size),
+            "rating": rng.integers(0, 11, size),
+            "watching_status": rng.integers(1, 7, size),
+            "watched_episodes": rng.integers(0, 100, size),
+        }).to_csv(path, index=False, header=start == 0, mode="w" if start == 0 else "a")
+
+
+class ThrottledStream:
+    def __init__(self, stream, bytes_per_second):
+        self.stream = stream
+        self.bytes_per_second = bytes_per_second
+
+    def read(self, size=-1):
+        block = self.stream.read(size)
+        time.sleep(len(block) / self.bytes_per_second)
+        return block
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.stream.close()
+
+
+class ThrottledStorage(LocalStorage):
+    def __init__(self, root, mbps):
+        super().__init__(root)
+        self.bytes_per_second = mbps * 1024 * 1024
+
+    def open(self, name, generation=None):
+        stream = super().open(name, generation)
+        return ThrottledStream(stream, self.bytes_per_second) if self.bytes_per_second else stream
+
+
+def legacy_ingestion(storage, raw_dir, max_rows):
+    # Implementación anterior de download_csv_from_gcp
+    for file_name in FILE_NAMES:
+        file_path = os.path.join(raw_dir, file_name)
+        with storage.open(file_name) as stream, open(file_path, "wb") as out:
+            shutil.copyfileobj(stream, out, 8 * 1024 * 1024)
+        if file_name == "animelist.csv" and max_rows:
+            data = pd.read_csv(file_path, nrows=max_rows)
+            data.to_csv(file_path, index=False)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return round(time.perf_counter() - start, 3)
+
+
+def main():
+    args = parse_args()
+    rng = np.random.default_rng(0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = args.source
+        if source is None:
+            source = os.path.join(tmp, "source")
+            os.makedirs(source)
+            synthetic_source(source, args.rows, rng)
+
+        storage = ThrottledStorage(source, args.mbps)
+        config = {"data_ingestion": {
+            "bucket_name": None,
+            "bucket_file_names": FILE_NAMES,
+            "max_rows": args.max_rows,
+        }}
+
+        def run_new(name, workers):
+            raw_dir = os.path.join(tmp, name)
+            config["data_ingestion"]["workers"] = workers
+            ingestion = DataIngestion(config, storage=storage, raw_dir=raw_dir,
+                                      state_path=os.path.join(raw_dir, "state.json"))
+            return raw_dir, ingestion
+
+        results = {
+            "source_bytes": {name: os.path.getsize(os.path.join(source, name)) for name in FILE_NAMES},
+            "max_rows": args.max_rows,
+            "mbps": args.mbps,
+        }
+
+        legacy_dir = os.path.join(tmp, "legacy")
+        os.makedirs(legacy_dir)
+        results["legacy_seconds"] = timed(lambda: legacy_ingestion(storage, legacy_dir, args.max_rows))
+
+        sequential_dir, sequential = run_new("sequential", 1)
+        results["sequential_seconds"] = timed(sequential.download_csv_from_gcp)
+
+        parallel_dir, parallel = run_new("parallel", len(FILE_NAMES))
+        results["parallel_seconds"] = timed(parallel.download_csv_from_gcp)
+        results["unchanged_rerun_seconds"] = timed(parallel.download_csv_from_gcp)
+
+        legacy = pd.read_csv(os.path.join(legacy_dir, "animelist.csv"))
+        streamed = pd.read_csv(os.path.join(parallel_dir, "animelist.csv"))
+        results["same_rows_as_legacy"] = bool(legacy.equals(streamed))
+        results["kept_bytes"] = os.path.getsize(os.path.join(parallel_dir, "animelist.csv"))
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# =========================
+# PREPROCESSING SCALING
+# =========================
+# Mide cómo escalan las transformaciones columnares del preprocesamiento
+# (resolve_anime_names y min_max_scale) con el tamaño del catálogo y el
+# nº de ratings, sobre datos sintéticos. Con --legacy compara además con
+# la implementación anterior (apply por fila, O(N²) en el catálogo) en
+# los tamaños pequeños.
+#
+#   python -m benchmarks.preprocessing_scaling
+#   python -m benchmarks.preprocessing_scaling --catalog-sizes 1000 10000 --legacy
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.config.paths_config import *
+from src.data_preprocessing.preprocessing import min_max_scale, resolve_anime_names
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Preprocessing scaling benchmark")
+    parser.add_argument("--catalog-sizes", type=int, nargs="+",
+                        default=[1000, 10000, 100000, 1000000])
+    parser.add_argument("--rating-sizes", type=int, nargs="+",
+                        default=[100000, 1000000, 10000000, 100000000])
+    parser.add_argument("--legacy", action="store_true",
+                        help="incluye la implementación anterior (solo tamaños <= --legacy-max)")
+    parser.add_argument("--legacy-max", type=int, default=10000)
+    parser.add_argument("--output", default=PREPROCESSING_BENCHMARK_REPORT)
+    return parser.parse_args()
+
+
+def synthetic_catalog(n_rows, rng):
+    ids = np.arange(1, n_rows + 1)
+    english = np.where(rng.random(n_rows) < 0.3, "Unknown", "Anime " + ids.astype(str))
+    return pd.DataFrame({
+        "MAL_ID": ids,
+        "Name": "Name " + ids.astype(str),
+        "English name": english,
+        "Score": np.where(rng.random(n_rows) < 0.1, "Unknown", "7.5"),
+    })
+
+
+def legacy_anime_names(df):
+    # Implementación anterior de process_anime_data (dos filtros por anime)
+    df = df.replace("Unknown", np.nan)
+
+    def getAnimeName(anime_id):
+        name = df[df.anime_id == anime_id].eng_version.values[0]
+        if name is np.nan:
+            name = df[df.anime_id == anime_id].Name.values[0]
+        return name
+
+    df["anime_id"] = df["MAL_ID"]
+    df["eng_version"] = df["English name"]
+    df["eng_version"] = df.anime_id.apply(lambda x: getAnimeName(x))
+    return df
+
+
+def legacy_scale(ratings):
+    min_rating, max_rating = min(ratings), max(ratings)
+    return ratings.apply(lambda x: (x - min_rating) / (max_rating - min_rating)).values
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    rng = np.random.default_rng(0)
+    report = {"catalog": [], "ratings": []}
+
+    for n_rows in args.catalog_sizes:
+        df = synthetic_catalog(n_rows, rng)
+        seconds, resolved = timed(resolve_anime_names, df)
+        run = {"rows": n_rows, "seconds": seconds, "ns_per_row": seconds * 1e9 / n_rows}
+
+        if args.legacy and n_rows <= args.legacy_max:
+            legacy_seconds, legacy = timed(legacy_anime_names, df)
+            run["legacy_seconds"] = legacy_seconds
+            run["same_result"] = bool(legacy["eng_version"].equals(resolved["eng_version"]))
+
+        report["catalog"].append(run)
+        print(f"catalog {n_rows:>10}: {run}")
+
+    for n_rows in args.rating_sizes:
+        ratings = pd.Series(rng.integers(0, 11, n_rows, dtype=np.int8))
+        seconds, scaled = timed(min_max_scale, ratings.values)
+        run = {"rows": n_rows, "seconds": seconds, "ns_per_row": seconds * 1e9 / n_rows}
+
+        if args.legacy and n_rows <= args.legacy_max * 100:
+            legacy_seconds, legacy = timed(legacy_scale, ratings)
+            run["legacy_seconds"] = legacy_seconds
+            run["same_result"] = bool(np.array_equal(legacy.astype(np.float64), scaled))
+
+        report["ratings"].append(run)
+        print(f"ratings {n_rows:>10}: {run}")
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
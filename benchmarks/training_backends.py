@@ -0,0 +1,119 @@
+# =========================
+# TRAINING BACKENDS
+# =========================
+# Compara el entrenador ALS en NumPy con RecommenderNet (Keras) en tiempo
+# de entrenamiento y MAE / MSE sobre el split de test, con los datos
+# procesados (ColumnarDataset) o con ratings sintéticos de rango bajo.
+#
+#   python -m benchmarks.training_backends
+#   python -m benchmarks.training_backends --synthetic 2000000 --backends als
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from src.config.paths_config import *
+from src.data_preprocessing.columnar_dataset import ColumnarDataset
+from src.data_trainer.matrix_factorization import ALSFactorization
+from src.utils.common_funtions import read_yaml
+
+
+def parse_args():
+    config = read_yaml(CONFIG_PATH)
+    als_config = config.get("als", {})
+
+    parser = argparse.ArgumentParser(description="ALS vs Keras training benchmark")
+    parser.add_argument("--backends", nargs="+", default=["als", "keras"], choices=["als", "keras"])
+    parser.add_argument("--synthetic", type=int, default=0,
+                        help="nº de ratings sintéticos (0 = usar el dataset procesado)")
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--anime", type=int, default=5000)
+    parser.add_argument("--factors", type=int, default=config["model"]["embedding_size"])
+    parser.add_argument("--reg", type=float, default=als_config.get("reg", 0.05))
+    parser.add_argument("--iterations", type=int, default=als_config.get("iterations", 10))
+    parser.add_argument("--workers", type=int, default=als_config.get("workers") or None)
+    parser.add_argument("--epochs", type=int, default=config.get("training", {}).get("epochs", 20))
+    parser.add_argument("--batch-size", type=int, default=config.get("training", {}).get("batch_size", 10000))
+    parser.add_argument("--output", default=TRAINING_BACKENDS_REPORT)
+    return parser.parse_args()
+
+
+def synthetic_ratings(n_ratings, n_users, n_anime, rank=16, test_size=1000, seed=0):
+    # Ratings en [0, 1] a partir de factores latentes de rango bajo + ruido
+    rng = np.random.default_rng(seed)
+    user_factors = rng.normal(size=(n_users, rank)) / np.sqrt(rank)
+    anime_factors = rng.normal(size=(n_anime, rank)) / np.sqrt(rank)
+
+    users = rng.integers(0, n_users, n_ratings)
+    anime = rng.integers(0, n_anime, n_ratings)
+    scores = np.einsum("ij,ij->i", user_factors[users], anime_factors[anime]) + rng.normal(0, 0.1, n_ratings)
+    ratings = (1 / (1 + np.exp(-2 * scores))).astype(np.float32)
+
+    train = slice(test_size, None)
+    test = slice(0, test_size)
+    return (
+        (users[train], anime[train], ratings[train]),
+        (users[test], anime[test], ratings[test]),
+        n_users, n_anime
+    )
+
+
+def processed_ratings():
+    dataset = ColumnarDataset.open(RATINGS_DATASET_DIR, columns=["user", "anime", "rating"])
+    split = lambda name: tuple(dataset.column(column, name) for column in ["user", "anime", "rating"])
+    return (
+        split("train"), split("test"),
+        int(dataset["user"].max()) + 1, int(dataset["anime"].max()) + 1
+    )
+
+
+def run_als(args, train, test, n_users, n_anime):
+    model = ALSFactorization(factors=args.factors, reg=args.reg,
+                             iterations=args.iterations, workers=args.workers)
+    start = time.perf_counter()
+    model.fit(*train, n_users=n_users, n_anime=n_anime)
+    seconds = time.perf_counter() - start
+    return {"train_seconds": seconds, **model.evaluate(*test)}
+
+
+def run_keras(args, train, test, n_users, n_anime):
+    from src.base_model.base_model import BaseModel
+
+    model = BaseModel(config_path=CONFIG_PATH).RecommenderNet(n_users=n_users, n_anime=n_anime)
+    start = time.perf_counter()
+    model.fit(x=[train[0], train[1]], y=train[2], batch_size=args.batch_size,
+              epochs=args.epochs, verbose=0)
+    seconds = time.perf_counter() - start
+
+    errors = model.predict([test[0], test[1]], batch_size=args.batch_size, verbose=0).ravel() - test[2]
+    return {"train_seconds": seconds, "mae": float(np.abs(errors).mean()), "mse": float((errors ** 2).mean())}
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    if args.synthetic:
+        train, test, n_users, n_anime = synthetic_ratings(args.synthetic, args.users, args.anime)
+    else:
+        train, test, n_users, n_anime = processed_ratings()
+
+    report = {
+        "train_rows": len(train[0]),
+        "test_rows": len(test[0]),
+        "n_users": n_users,
+        "n_anime": n_anime,
+        "factors": args.factors,
+    }
+    runners = {"als": run_als, "keras": run_keras}
+    for backend in args.backends:
+        report[backend] = runners[backend](args, train, test, n_users, n_anime)
+        print(backend, report[backend])
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,238 @@
+# =========================
+# TRAINING THROUGHPUT
+# =========================
+# Mide el entrenamiento de RecommenderNet con la misma entrada tf.data y el
+# mismo lrfn que ModelTraining, durante un nº fijo de pasos por época:
+#   - samples/s y tiempo de pared por época
+#   - tiempo esperando la entrada frente al paso del optimizador
+#   - pico de RSS
+# Barre batch_size, embedding_size e intra_op / inter_op. Cada combinación
+# corre en un proceso nuevo (los hilos de TensorFlow solo se pueden fijar
+# antes de inicializarlo y así el pico de RSS es el de esa combinación).
+# Con --baseline compara con un informe anterior y termina con código 1 si
+# alguna combinación pierde más de --tolerance de throughput.
+#
+#   python -m benchmarks.training_throughput
+#   python -m benchmarks.training_throughput --batch-sizes 4096 10000 --threads 1:1 4:2 0:0
+#   python -m benchmarks.training_throughput --sample 2000000 --baseline artifacts/reports/training_throughput.json
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from src.config.paths_config import *
+from src.utils.common_funtions import read_yaml
+
+
+def parse_args():
+    config = read_yaml(CONFIG_PATH)
+    training_config = config.get("training", {})
+
+    parser = argparse.ArgumentParser(description="Training throughput benchmark")
+    parser.add_argument("--batch-sizes", type=int, nargs="+",
+                        default=[training_config.get("batch_size", 10000)])
+    parser.add_argument("--embedding-sizes", type=int, nargs="+",
+                        default=[config["model"]["embedding_size"]])
+    parser.add_argument("--threads", nargs="+", default=["0:0"],
+                        help="pares intra_op:inter_op (0 = valor por defecto de TensorFlow)")
+    parser.add_argument("--epochs", type=int, default=2)
+    parser.add_argument("--steps", type=int, default=50, help="pasos por época")
+    parser.add_argument("--warmup", type=int, default=5, help="pasos descartados al inicio")
+    parser.add_argument("--sample", type=int, default=0,
+                        help="filas muestreadas del dataset procesado (0 = datos sintéticos)")
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--anime", type=int, default=17000)
+    parser.add_argument("--shuffle-buffer", type=int, default=training_config.get("shuffle_buffer", 262144))
+    parser.add_argument("--baseline", default=None, help="informe anterior con el que comparar")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="pérdida relativa de samples/s admitida frente al baseline")
+    parser.add_argument("--output", default=TRAINING_THROUGHPUT_REPORT)
+    parser.add_argument("--run", default=None, help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+# =========================
+# UNA COMBINACIÓN (proceso hijo)
+# =========================
+
+def load_ratings(settings):
+    n_rows = settings["batch_size"] * (settings["steps"] + settings["warmup"])
+    rng = np.random.default_rng(0)
+
+    if settings["sample"]:
+        from src.data_preprocessing.columnar_dataset import ColumnarDataset
+
+        dataset = ColumnarDataset.open(RATINGS_DATASET_DIR, columns=["user", "anime", "rating"])
+        train = dataset.split("train")
+        rows = np.sort(rng.choice(train.stop - train.start, min(settings["sample"], train.stop - train.start), replace=False))
+        rows += train.start
+        users, anime, ratings = (np.asarray(dataset[column][rows]) for column in ["user", "anime", "rating"])
+        return users, anime, ratings, int(dataset["user"].max()) + 1, int(dataset["anime"].max()) + 1
+
+    users = rng.integers(0, settings["users"], n_rows)
+    anime = rng.integers(0, settings["anime"], n_rows)
+    ratings = rng.random(n_rows).astype(np.float32)
+    return users, anime, ratings, settings["users"], settings["anime"]
+
+
+def run_single(settings):
+    import resource
+    import tensorflow as tf
+
+    tf.config.threading.set_intra_op_parallelism_threads(settings["intra_op"])
+    tf.config.threading.set_inter_op_parallelism_threads(settings["inter_op"])
+
+    from src.base_model.base_model import BaseModel
+    from src.data_trainer.input_pipeline import RatingsInput
+    from src.data_trainer.model_training import lrfn
+
+    users, anime, ratings, n_users, n_anime = load_ratings(settings)
+
+    base_model = BaseModel(config_path=CONFIG_PATH)
+    base_model.config["model"]["embedding_size"] = settings["embedding_size"]
+    model = base_model.RecommenderNet(n_users=n_users, n_anime=n_anime)
+
+    dataset = RatingsInput(
+        users, anime, ratings,
+        batch_size=settings["batch_size"],
+        shuffle_buffer=settings["shuffle_buffer"]
+    ).dataset(shuffle=True)
+    iterator = iter(dataset.repeat())
+
+    for _ in range(settings["warmup"]):
+        model.train_on_batch(*next(iterator))
+
+    epochs = []
+    for epoch in range(settings["epochs"]):
+        model.optimizer.learning_rate.assign(lrfn(epoch))
+        input_seconds = optimizer_seconds = 0.0
+
+        start = time.perf_counter()
+        for _ in range(settings["steps"]):
+            step_start = time.perf_counter()
+            x, y = next(iterator)
+            fetched = time.perf_counter()
+            model.train_on_batch(x, y)
+            input_seconds += fetched - step_start
+            optimizer_seconds += time.perf_counter() - fetched
+        seconds = time.perf_counter() - start
+
+        epochs.append({
+            "seconds": seconds,
+            "samples_per_second": settings["steps"] * settings["batch_size"] / seconds,
+            "input_seconds": input_seconds,
+            "optimizer_seconds": optimizer_seconds,
+        })
+
+    total_seconds = sum(epoch["seconds"] for epoch in epochs)
+    return {
+        **{key: settings[key] for key in ["batch_size", "embedding_size", "intra_op", "inter_op"]},
+        "samples_per_second": settings["epochs"] * settings["steps"] * settings["batch_size"] / total_seconds,
+        "epoch_seconds": [epoch["seconds"] for epoch in epochs],
+        "input_fraction": sum(epoch["input_seconds"] for epoch in epochs) / total_seconds,
+        "optimizer_fraction": sum(epoch["optimizer_seconds"] for epoch in epochs) / total_seconds,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0,
+        "epochs": epochs,
+    }
+
+
+# =========================
+# BARRIDO (proceso padre)
+# =========================
+
+def run_key(run):
+    return f"batch={run['batch_size']} emb={run['embedding_size']} threads={run['intra_op']}:{run['inter_op']}"
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare(report, baseline, tolerance):
+    previous = {run_key(run): run for run in baseline.get("runs", [])}
+    regressions = []
+    for run in report["runs"]:
+        old = previous.get(run_key(run))
+        if old is None:
+            continue
+        change = run["samples_per_second"] / old["samples_per_second"] - 1
+        run["change_vs_baseline"] = change
+        if change < -tolerance:
+            regressions.append({"run": run_key(run), "change": change})
+    return regressions
+
+
+def main():
+    args = parse_args()
+
+    if args.run:
+        print(json.dumps(run_single(json.loads(args.run))))
+        return 0
+
+    report = {"environment": environment(), "runs": []}
+    for batch_size, embedding_size, threads in itertools.product(
+            args.batch_sizes, args.embedding_sizes, args.threads):
+        intra_op, inter_op = (int(value) for value in threads.split(":"))
+        settings = {
+            "batch_size": batch_size,
+            "embedding_size": embedding_size,
+            "intra_op": intra_op,
+            "inter_op": inter_op,
+            "epochs": args.epochs,
+            "steps": args.steps,
+            "warmup": args.warmup,
+            "sample": args.sample,
+            "users": args.users,
+            "anime": args.anime,
+            "shuffle_buffer": args.shuffle_buffer,
+        }
+
+        result = subprocess.run(
+            [sys.executable, "-m", "benchmarks.training_throughput", "--run", json.dumps(settings)],
+            cwd=ROOT_DIR, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"Benchmark run failed ({run_key(settings)}):\n{result.stderr}")
+
+        run = json.loads(result.stdout.strip().splitlines()[-1])
+        report["runs"].append(run)
+        print(f"{run_key(run)}: {run['samples_per_second']:.0f} samples/s, "
+              f"input {run['input_fraction']:.1%}, peak RSS {run['peak_rss_mb']:.0f} MB")
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        report["baseline"] = {"commit": baseline.get("environment", {}).get("commit"), "tolerance": args.tolerance}
+        report["regressions"] = compare(report, baseline, args.tolerance)
+        if report["regressions"]:
+            print(f"Throughput regressions: {report['regressions']}")
+            exit_code = 1
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,106 +2,284 @@
 # IMPORTS
 # =========================
 
+import numpy as np
+
 from src.config.paths_config import *     # Rutas a datasets, modelos y pesos
 from src.utils.helpers import *           # Funciones auxiliares (user/content-based)
+from src.serving.artifact_store import get_artifact_store, SERVING_ARTIFACTS
+from src.serving.anime_catalog import get_anime_catalog
+from src.serving.similarity import get_similarity_engine
+from src.serving.preferences import get_preference_index
+from src.serving.result_cache import get_result_cache
+from src.serving.metrics import metrics
 
 
 # =========================
-# HYBRID RECOMMENDATION
+# CARGA DE ARTEFACTOS
 # =========================
-# Combina recomendaciones basadas en usuarios + contenido
-# user_weight y content_weight controlan la importancia de cada enfoque
+# Carga en memoria todos los artefactos de serving una sola vez
+# y construye los índices derivados (se llama al arrancar la aplicación)
+
+def load_artifacts():
+    get_artifact_store().load_all(SERVING_ARTIFACTS)
 
-def hybrid_recommendation(user_id, user_weight=0.5, content_weight=0.5):
+    get_anime_catalog(DF, SYNOPSIS_DF)
+    get_similarity_engine(USER_WEIGHTS_PATH)
+    get_similarity_engine(ANIME_WEIGHTS_PATH)
+    get_preference_index(RATING_DF)
+
+
+# =========================
+# UTILIDADES VECTORIZADAS
+# =========================
+
+def _expand_segments(starts, counts):
+    # Índices planos de varios tramos [start, start + count) concatenados
+    counts = np.asarray(counts, dtype=np.int64)
+    flat = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return flat + np.repeat(np.asarray(starts, dtype=np.int64), counts)
+
+
+def _rank_groups(groups, scores, first_seen, n):
+    # Ordena cada grupo por score descendente (desempate: primera aparición)
+    # y devuelve las posiciones del top-n de cada grupo
+    order = np.lexsort((first_seen, -scores, groups))
+    sorted_groups = groups[order]
+    group_starts = np.searchsorted(sorted_groups, sorted_groups, side="left")
+    rank = np.arange(len(order)) - group_starts
+    return order[rank < n]
+
+
+# =========================
+# HYBRID RECOMMENDATION (BATCH)
+# =========================
+# Misma lógica que hybrid_recommendation pero para muchos usuarios a la vez:
+#   1. usuarios similares de todo el lote con una sola GEMM
+#   2. preferencias de todos los usuarios implicados con un gather CSR
+#   3. animes similares de todos los títulos recomendados con otra GEMM
+#   4. combinación de scores con operaciones agrupadas de NumPy
+
+def hybrid_recommendation_batch(
+    user_ids,
+    user_weight=0.5,
+    content_weight=0.5,
+    n=10,
+    return_scores=False
+):
+    clock = metrics.stopwatch("pipeline_stage_seconds")
+
+    store = get_artifact_store()
+    catalog = get_anime_catalog(DF, SYNOPSIS_DF)
+    user_engine = get_similarity_engine(USER_WEIGHTS_PATH)
+    anime_engine = get_similarity_engine(ANIME_WEIGHTS_PATH)
+    preferences = get_preference_index(RATING_DF)
+
+    user2user_encoded = store.get(USER2USER_ENCODED)
+    user2user_decoded = store.get(USER2USER_DECODED)
+    anime2anime_encoded = store.get(ANIME2ANIME_ENCODED)
+    anime2anime_decoded = store.get(ANIME2ANIME_DECODED)
+
+    user_ids = [int(user_id) for user_id in user_ids]
+    results = [[] for _ in user_ids]
+
+    metrics.inc("pipeline_requests_total", len(user_ids))
+    metrics.observe("pipeline_batch_size", len(user_ids))
+
+    n_codes = len(catalog.names)
+    clock.lap("artifacts")
 
     # =========================
-    # 1. USER-BASED RECOMMENDATION
+    # 1. USUARIOS SIMILARES
     # =========================
 
-    # Encuentra usuarios similares al usuario objetivo
-    similar_users = find_similar_users(
-        user_id,
-        USER_WEIGHTS_PATH,
-        USER2USER_ENCODED,
-        USER2USER_DECODED
-    )
+    encoded_users = user2user_encoded.get_many(user_ids)
+    queries = np.flatnonzero(encoded_users >= 0)
+    if len(queries) == 0:
+        # Lote solo de usuarios desconocidos: también cuenta en la latencia
+        clock.finish()
+        return results
 
-    # Obtiene las preferencias (animes mejor valorados) del usuario
-    user_pref = get_user_preferences(
-        user_id,
-        RATING_DF,
-        DF
-    )
+    neighbours, _ = user_engine.top_k(encoded_users[queries], k=10)
+    n_neighbours = neighbours.shape[1]
+    neighbour_ids = user2user_decoded.get_many(neighbours.ravel())
+    clock.lap("similar_users")
+    metrics.observe("pipeline_candidates", len(neighbour_ids), stage="similar_users")
+
+    # =========================
+    # 2. PREFERENCIAS (gather CSR compartido)
+    # =========================
 
-    # Obtiene recomendaciones basadas en usuarios similares
-    user_recommended_animes = get_user_recommendations(
-        similar_users,
-        user_pref,
-        DF,
-        SYNOPSIS_DF,
-        RATING_DF
+    query_ids = np.array([user_ids[q] for q in queries], dtype=np.int64)
+    involved, involved_inverse = np.unique(
+        np.concatenate([query_ids, neighbour_ids]), return_inverse=True
     )
+    query_slot = involved_inverse[:len(query_ids)]
+    neighbour_slot = involved_inverse[len(query_ids):]
 
-    # Convierte el dataframe de recomendaciones en una lista de nombres
-    user_recommended_anime_list = (
-        user_recommended_animes["anime_name"].tolist()
+    # Favoritos de cada usuario implicado como códigos de nombre,
+    # únicos y en el orden del catálogo (igual que get_user_preferences)
+    liked_ids, owners = preferences.liked_batch(involved)
+    rows = catalog.rows(liked_ids)
+    keep = rows >= 0
+    pairs = np.unique(np.stack([owners[keep], rows[keep]], axis=1), axis=0)
+    pair_owner, pair_code = pairs[:, 0], catalog.name_codes[pairs[:, 1]]
+
+    segment_starts = np.searchsorted(pair_owner, np.arange(len(involved)))
+    segment_counts = np.searchsorted(pair_owner, np.arange(len(involved)), side="right") - segment_starts
+    clock.lap("user_preferences")
+    metrics.observe("pipeline_candidates", len(pairs), stage="user_preferences")
+
+    # Animes favoritos de los vecinos de cada consulta (en orden de similitud)
+    flat_slots = neighbour_slot
+    flat = _expand_segments(segment_starts[flat_slots], segment_counts[flat_slots])
+    flat_query = np.repeat(
+        np.repeat(np.arange(len(queries)), n_neighbours), segment_counts[flat_slots]
     )
+    flat_code = pair_code[flat]
+
+    # Animes favoritos del propio usuario (se excluyen)
+    own = _expand_segments(segment_starts[query_slot], segment_counts[query_slot])
+    own_query = np.repeat(np.arange(len(queries)), segment_counts[query_slot])
+    own_keys = own_query * n_codes + pair_code[own]
 
+    valid = flat_code >= 0
+    keys = flat_query * n_codes + flat_code
+    valid &= ~np.isin(keys, own_keys)
+    keys = keys[valid]
+
+    # Frecuencia de cada anime entre los vecinos -> top-n por usuario
+    unique_keys, first_seen, counts = np.unique(keys, return_index=True, return_counts=True)
+    user_groups = unique_keys // n_codes
+    top = _rank_groups(user_groups, counts, first_seen, n)
+
+    user_rec_query = user_groups[top]
+    user_rec_code = unique_keys[top] % n_codes
+    user_rec_rank = np.arange(len(top)) - np.searchsorted(user_rec_query, user_rec_query)
+    clock.lap("user_recommendations")
+    metrics.observe("pipeline_candidates", len(top), stage="user_recommendations")
 
     # =========================
-    # 2. CONTENT-BASED RECOMMENDATION
+    # 3. ANIMES SIMILARES (una GEMM para todos los títulos)
     # =========================
 
-    # Lista para almacenar recomendaciones basadas en contenido
-    content_recommended_animes = []
+    titles = np.unique(user_rec_code)
+    title_ids = catalog.anime_ids[catalog.name_rows[titles]]
+    title_encoded = anime2anime_encoded.get_many(title_ids)
+    encodable = title_encoded >= 0
 
-    # Para cada anime recomendado por usuarios similares
-    for anime in user_recommended_anime_list:
-
-        # Busca animes similares usando embeddings de contenido
-        similar_animes = find_similar_animes(
-            anime,
-            ANIME_WEIGHTS_PATH,
-            ANIME2ANIME_ENCODED,
-            ANIME2ANIME_DECODED,
-            DF
+    content_code = np.full((len(titles), 10), -1, dtype=np.int64)
+    if encodable.any():
+        similar, _ = anime_engine.top_k(title_encoded[encodable], k=10)
+        similar_ids = anime2anime_decoded.get_many(similar.ravel())
+        similar_rows = catalog.rows(similar_ids)
+        similar_codes = np.where(
+            similar_rows >= 0, catalog.name_codes[similar_rows], -1
         )
+        content_code[encodable, :similar.shape[1]] = similar_codes.reshape(similar.shape)
+    clock.lap("content")
+    metrics.observe("pipeline_candidates", int((content_code >= 0).sum()), stage="content")
+
+    # =========================
+    # 4. COMBINACIÓN DE SCORES
+    # =========================
+
+    title_slot = np.searchsorted(titles, user_rec_code)
+    n_similar = content_code.shape[1]
 
-        # Si se encuentran animes similares, se agregan a la lista
-        if similar_animes is not None and not similar_animes.empty:
-            content_recommended_animes.extend(
-                similar_animes["name"].tolist()
-            )
+    content_query = np.repeat(user_rec_query, n_similar)
+    content_codes = content_code[title_slot].ravel()
+    content_order = (
+        n + np.repeat(user_rec_rank, n_similar) * n_similar
+        + np.tile(np.arange(n_similar), len(user_rec_code))
+    )
+    has_code = content_codes >= 0
+
+    combined_query = np.concatenate([user_rec_query, content_query[has_code]])
+    combined_code = np.concatenate([user_rec_code, content_codes[has_code]])
+    combined_weight = np.concatenate([
+        np.full(len(user_rec_code), user_weight, dtype=np.float64),
+        np.full(has_code.sum(), content_weight, dtype=np.float64),
+    ])
+    combined_order = np.concatenate([user_rec_rank, content_order[has_code]])
+
+    combined_keys = combined_query * n_codes + combined_code
+    unique_keys, inverse = np.unique(combined_keys, return_inverse=True)
+    scores = np.bincount(inverse, weights=combined_weight, minlength=len(unique_keys))
+    first_seen = np.full(len(unique_keys), np.iinfo(np.int64).max, dtype=np.int64)
+    np.minimum.at(first_seen, inverse, combined_order)
+
+    groups = unique_keys // n_codes
+    top = _rank_groups(groups, scores, first_seen, n)
+
+    for query, code, score in zip(groups[top], unique_keys[top] % n_codes, scores[top]):
+        name = catalog.names[code]
+        if return_scores:
+            anime_id = int(catalog.anime_ids[catalog.name_rows[code]])
+            results[queries[query]].append((anime_id, name, float(score)))
         else:
-            # Mensaje informativo si no hay similitudes
-            print(f"No similar anime found {anime}")
+            results[queries[query]].append(name)
 
+    clock.lap("combine")
+    clock.finish()
+    metrics.observe("pipeline_candidates", len(top), stage="combine")
 
-    # =========================
-    # 3. COMBINACIÓN DE SCORES
-    # =========================
+    return results
 
-    # Diccionario para acumular puntuaciones finales
-    combined_scores = {}
 
-    # Suma el peso de user-based recommendation
-    for anime in user_recommended_anime_list:
-        combined_scores[anime] = (
-            combined_scores.get(anime, 0) + user_weight
-        )
+# =========================
+# HYBRID RECOMMENDATION
+# =========================
+# Combina recomendaciones basadas en usuarios + contenido
+# user_weight y content_weight controlan la importancia de cada enfoque.
+# Es el caso de un solo usuario de hybrid_recommendation_batch, por lo que
+# ambos devuelven exactamente el mismo ranking.
+
+def hybrid_recommendation(user_id, user_weight=0.5, content_weight=0.5, n=10):
+    return hybrid_recommendation_batch(
+        [user_id],
+        user_weight=user_weight,
+        content_weight=content_weight,
+        n=n
+    )[0]
+
 
-    # Suma el peso de content-based recommendation
-    for anime in content_recommended_animes:
-        combined_scores[anime] = (
-            combined_scores.get(anime, 0) + content_weight
+# =========================
+# HYBRID RECOMMENDATION CON CACHÉ
+# =========================
+# Puntos de entrada para la app: consultan la caché de resultados y solo
+# calculan (en un único lote) los usuarios que no estén en ella.
+# Los resultados se guardan con ids y scores: [(anime_id, name, score), ...]
+
+def recommend_batch(user_ids, user_weight=0.5, content_weight=0.5, n=10):
+    user_ids = [int(user_id) for user_id in user_ids]
+    results = [None] * len(user_ids)
+    keys = [None] * len(user_ids)
+
+    cache = get_result_cache()
+    if cache is not None:
+        version = cache.version()
+        for i, user_id in enumerate(user_ids):
+            keys[i] = cache.make_key(version, user_id, user_weight, content_weight, n)
+            results[i] = cache.get(keys[i])
+            metrics.inc("result_cache_total", result="miss" if results[i] is None else "hit")
+
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        computed = hybrid_recommendation_batch(
+            [user_ids[i] for i in missing],
+            user_weight=user_weight,
+            content_weight=content_weight,
+            n=n,
+            return_scores=True
         )
+        for i, result in zip(missing, computed):
+            results[i] = result
+            if cache is not None:
+                cache.set(keys[i], result)
+
+    return results
 
-    # Ordena los animes por score combinado (descendente)
-    sorted_animes = sorted(
-        combined_scores.items(),
-        key=lambda x: x[1],
-        reverse=True
-    )
 
-    # Devuelve el top 10 de animes recomendados
-    return [anime for anime, score in sorted_animes[:10]]
+def cached_hybrid_recommendation(user_id, user_weight=0.5, content_weight=0.5, n=10):
+    result = recommend_batch([user_id], user_weight, content_weight, n)[0]
+    return [name for _, name, _ in result]
@@ -1,12 +1,136 @@
+import argparse
+import os
+
 from src.utils.common_funtions import read_yaml
+from src.utils.pipeline_dag import Stage, StageDAG
 from src.config.paths_config import *
-from src.data_preprocessing.preprocessing import DataProcessor
-from src.data_trainer.model_training import ModelTraining
 
-if __name__=="__main__":
-    data_processor = DataProcessor(ANIMELIST_CSV,PROCESSED_DIR)
-    data_processor.run()
 
+# =========================
+# ETAPAS
+# =========================
+# Los módulos pesados (google-cloud, TensorFlow) se importan dentro de
+# cada etapa, así que las etapas que se saltan no los cargan.
+
+def ingest(config):
+    from src.data_ingestion.ingestion import DataIngestion
+    DataIngestion(config).download_csv_from_gcp()
+
+
+def process_ratings(config):
+    from src.data_preprocessing.preprocessing import DataProcessor
+    data_processor = DataProcessor(ANIMELIST_CSV, PROCESSED_DIR, config)
+    try:
+        data_processor.process_ratings()
+        data_processor.memory.save(PREPROCESSING_MEMORY_REPORT)
+    finally:
+        data_processor.memory.stop()
+
+
+def process_anime(config):
+    from src.data_preprocessing.preprocessing import DataProcessor
+    DataProcessor(ANIMELIST_CSV, PROCESSED_DIR, config).process_anime_data()
+
+
+def train(config):
+    from src.data_trainer.model_training import ModelTraining
     model_trainer = ModelTraining(PROCESSED_DIR)
-    model_trainer.train_model()
+    model = model_trainer.fit_model()
+    model_trainer.save_model(model)
+
+
+def export_weights(config):
+    from src.data_trainer.model_training import ModelTraining
+    ModelTraining(PROCESSED_DIR).export_weights()
+
+
+def evaluate(config):
+    from src.model_evaluation.offline_evaluation import OfflineEvaluator
+    OfflineEvaluator(config).run()
+
+
+def build_stages(config):
+    return [
+        Stage(
+            "ingest", lambda: ingest(config),
+            outputs=[ANIMELIST_CSV, ANIME_CSV, ANIMESYNOPSIS_CSV],
+            config_keys=["data_ingestion"],
+            code=[os.path.join(ROOT_DIR, "src", "data_ingestion")]
+        ),
+        Stage(
+            "process_ratings", lambda: process_ratings(config),
+            inputs=[ANIMELIST_CSV],
+            outputs=[RATINGS_DATASET_DIR, USER_IDS, USER_ID_LOOKUP, ANIME_IDS,
+                     ANIME_ID_LOOKUP, USER_PREFERENCES_DIR],
+            config_keys=["data_processing"],
+            code=[os.path.join(ROOT_DIR, "src", "data_preprocessing")],
+            after=["ingest"],
+            exclusive=config["data_processing"].get("workers", 1) != 1
+        ),
+        Stage(
+            "process_anime", lambda: process_anime(config),
+            inputs=[ANIME_CSV, ANIMESYNOPSIS_CSV],
+            outputs=[DF, SYNOPSIS_DF],
+            code=[os.path.join(ROOT_DIR, "src", "data_preprocessing", "preprocessing.py")],
+            after=["ingest"]
+        ),
+        Stage(
+            "train", lambda: train(config),
+            inputs=[RATINGS_DATASET_DIR, USER_IDS, ANIME_IDS],
+            outputs=[MODEL_PATH, ALS_MODEL_PATH, TRAINING_STATE_PATH],
+            config_keys=["model", "training", "als"],
+            code=[
+                os.path.join(ROOT_DIR, "src", "base_model"),
+                os.path.join(ROOT_DIR, "src", "data_trainer", "model_training.py"),
+                os.path.join(ROOT_DIR, "src", "data_trainer", "input_pipeline.py"),
+                os.path.join(ROOT_DIR, "src", "data_trainer", "matrix_factorization.py"),
+                os.path.join(ROOT_DIR, "src", "data_trainer", "distributed.py"),
+            ],
+            after=["process_ratings"]
+        ),
+        Stage(
+            "export_weights", lambda: export_weights(config),
+            inputs=[MODEL_PATH, ALS_MODEL_PATH],
+            outputs=[USER_WEIGHTS_PATH, ANIME_WEIGHTS_PATH, ANIME_NEIGHBOUR_IDS,
+                     ANIME_NEIGHBOUR_SIMS, USER_ANN_DIR, ANIME_ANN_DIR,
+                     USER_WEIGHTS_FP16, USER_WEIGHTS_INT8, USER_WEIGHTS_INT8_SCALES,
+                     ANIME_WEIGHTS_FP16, ANIME_WEIGHTS_INT8, ANIME_WEIGHTS_INT8_SCALES],
+            config_keys=["model", "quantization", "neighbours", "ann"],
+            code=[os.path.join(ROOT_DIR, "src", "data_trainer")],
+            after=["train"]
+        ),
+        Stage(
+            "evaluate", lambda: evaluate(config),
+            inputs=[RATINGS_DATASET_DIR, USER_WEIGHTS_PATH, ANIME_WEIGHTS_PATH],
+            outputs=[EVALUATION_REPORT],
+            config_keys=["evaluation"],
+            code=[os.path.join(ROOT_DIR, "src", "model_evaluation")],
+            after=["export_weights"],
+            exclusive=config.get("evaluation", {}).get("workers", 0) != 1
+        ),
+    ]
+
+
+def default_stages(config, stages):
+    # La ingesta necesita credenciales de GCP: por defecto los CSV ya están
+    # en artifacts/raw (dvc pull) y solo se ejecuta si data_ingestion.enabled
+    # está activo o se pide con --stages ingest. Como el resto de etapas se
+    # salta si sus CSV siguen intactos; --force vuelve a consultar el bucket
+    if config["data_ingestion"].get("enabled", False):
+        return [stage.name for stage in stages]
+    return [stage.name for stage in stages if stage.name != "ingest"]
+
+
+if __name__=="__main__":
+    parser = argparse.ArgumentParser(description="Training pipeline")
+    parser.add_argument("--stages", nargs="+", default=None,
+                        help="ejecuta solo estas etapas (el resto se da por hecho)")
+    parser.add_argument("--force", action="store_true",
+                        help="ignora la caché y ejecuta todas las etapas")
+    args = parser.parse_args()
 
+    config = read_yaml(CONFIG_PATH)
+    stages = build_stages(config)
+    StageDAG(stages, config).run(
+        only=args.stages or default_stages(config, stages), force=args.force
+    )
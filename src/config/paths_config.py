@@ -16,6 +16,8 @@ PROCESSED_DIR = os.path.join(ARTIFACTS_DIR, "processed")
 MODEL_DIR = os.path.join(ARTIFACTS_DIR, "model")
 WEIGHTS_DIR = os.path.join(ARTIFACTS_DIR, "weights")
 CHECKPOINT_DIR = os.path.join(ARTIFACTS_DIR, "model_checkpoint")
+REPORTS_DIR = os.path.join(ARTIFACTS_DIR, "reports")
+CACHE_DIR = os.path.join(ARTIFACTS_DIR, "cache")
 
 # ===================== CONFIG =====================
 
@@ -40,6 +42,10 @@ Y_TRAIN = os.path.join(PROCESSED_DIR, "y_train.pkl")
 Y_TEST = os.path.join(PROCESSED_DIR, "y_test.pkl")
 
 RATING_DF = os.path.join(PROCESSED_DIR, "rating_df.csv")
+
+# Ratings procesados en columnas .npy + manifest.json (sustituye a
+# rating_df.csv y a los .pkl de X / y)
+RATINGS_DATASET_DIR = os.path.join(PROCESSED_DIR, "ratings")
 DF = os.path.join(PROCESSED_DIR, "anime_df.csv")
 SYNOPSIS_DF = os.path.join(PROCESSED_DIR, "synopsis_df.csv")
 
@@ -49,14 +55,80 @@ USER2USER_DECODED = os.path.join(PROCESSED_DIR, "user2user_decoded.pkl")
 ANIME2ANIME_ENCODED = os.path.join(PROCESSED_DIR, "anim2anime_encoded.pkl")
 ANIME2ANIME_DECODED = os.path.join(PROCESSED_DIR, "anim2anime_decoded.pkl")
 
+# Codificación en arrays .npy (ids[código] y tabla densa lookup[id])
+USER_IDS = os.path.join(PROCESSED_DIR, "user_ids.npy")
+USER_ID_LOOKUP = os.path.join(PROCESSED_DIR, "user_id_lookup.npy")
+ANIME_IDS = os.path.join(PROCESSED_DIR, "anime_ids.npy")
+ANIME_ID_LOOKUP = os.path.join(PROCESSED_DIR, "anime_id_lookup.npy")
+
+# Estado para el preprocesamiento incremental: conteos por usuario,
+# filas de usuarios que aún no pasan el filtro y parámetros de escalado
+INCREMENTAL_DIR = os.path.join(PROCESSED_DIR, "incremental")
+USER_COUNTS = os.path.join(INCREMENTAL_DIR, "user_counts.npy")
+PENDING_RATINGS_DIR = os.path.join(INCREMENTAL_DIR, "pending")
+# Posiciones de filas pendientes ya promovidas (no se borran del almacén)
+PENDING_REMOVED = os.path.join(INCREMENTAL_DIR, "pending_removed.npy")
+INCREMENTAL_STATE = os.path.join(INCREMENTAL_DIR, "state.json")
+
+# Índice CSR de preferencias por usuario (arrays .npy)
+USER_PREFERENCES_DIR = os.path.join(PROCESSED_DIR, "user_preferences")
+
 # ===================== MODEL =====================
 
 MODEL_PATH = os.path.join(MODEL_DIR, "model.h5")
+# Estado del último entrenamiento (para el warm start)
+TRAINING_STATE_PATH = os.path.join(MODEL_DIR, "training_state.json")
+# Factores del entrenador ALS (model.trainer: als)
+ALS_MODEL_PATH = os.path.join(MODEL_DIR, "als_factors.npz")
 
 ANIME_WEIGHTS_PATH = os.path.join(WEIGHTS_DIR, "anime_weights.pkl")
 USER_WEIGHTS_PATH = os.path.join(WEIGHTS_DIR, "user_weights.pkl")
 
+# Versiones cuantizadas de los pesos (float16 e int8 con escala por fila)
+ANIME_WEIGHTS_FP16 = os.path.join(WEIGHTS_DIR, "anime_weights_fp16.npy")
+ANIME_WEIGHTS_INT8 = os.path.join(WEIGHTS_DIR, "anime_weights_int8.npy")
+ANIME_WEIGHTS_INT8_SCALES = os.path.join(WEIGHTS_DIR, "anime_weights_int8_scales.npy")
+USER_WEIGHTS_FP16 = os.path.join(WEIGHTS_DIR, "user_weights_fp16.npy")
+USER_WEIGHTS_INT8 = os.path.join(WEIGHTS_DIR, "user_weights_int8.npy")
+USER_WEIGHTS_INT8_SCALES = os.path.join(WEIGHTS_DIR, "user_weights_int8_scales.npy")
+
+# Tabla precalculada de vecinos anime -> anime (top-K)
+ANIME_NEIGHBOUR_IDS = os.path.join(WEIGHTS_DIR, "anime_neighbour_ids.npy")
+ANIME_NEIGHBOUR_SIMS = os.path.join(WEIGHTS_DIR, "anime_neighbour_sims.npy")
+
+# Índices ANN (IVF / IVF-PQ) construidos sobre los pesos
+USER_ANN_DIR = os.path.join(WEIGHTS_DIR, "user_ann")
+ANIME_ANN_DIR = os.path.join(WEIGHTS_DIR, "anime_ann")
+
 CHECKPOINT_FILE_PATH = os.path.join(
     CHECKPOINT_DIR,
     "weights.weights.h5"
 )
+
+# ===================== INGESTION =====================
+
+# Metadatos (size / crc32c / generation) de los ficheros ya descargados
+INGESTION_STATE_PATH = os.path.join(CACHE_DIR, "ingestion_state.json")
+
+# ===================== SERVING =====================
+
+RESULT_CACHE_PATH = os.path.join(CACHE_DIR, "results.sqlite")
+
+# ===================== PIPELINE =====================
+
+# Huellas de cada etapa del pipeline de entrenamiento (caché por contenido)
+PIPELINE_STATE_PATH = os.path.join(CACHE_DIR, "pipeline_state.json")
+
+# ===================== REPORTS =====================
+
+ANN_REPORT_PATH = os.path.join(REPORTS_DIR, "ann_recall.json")
+PREPROCESSING_MEMORY_REPORT = os.path.join(REPORTS_DIR, "preprocessing_memory.json")
+PREPROCESSING_BENCHMARK_REPORT = os.path.join(REPORTS_DIR, "preprocessing_scaling.json")
+INGESTION_BENCHMARK_REPORT = os.path.join(REPORTS_DIR, "ingestion.json")
+TRAINING_INPUT_REPORT = os.path.join(REPORTS_DIR, "training_input.json")
+TRAINING_BACKENDS_REPORT = os.path.join(REPORTS_DIR, "training_backends.json")
+QUANTIZATION_REPORT = os.path.join(REPORTS_DIR, "quantization.json")
+TRAINING_THROUGHPUT_REPORT = os.path.join(REPORTS_DIR, "training_throughput.json")
+DISTRIBUTED_TRAINING_REPORT = os.path.join(REPORTS_DIR, "distributed_training.json")
+DISTRIBUTED_SCALING_REPORT = os.path.join(REPORTS_DIR, "distributed_scaling.json")
+EVALUATION_REPORT = os.path.join(REPORTS_DIR, "offline_evaluation.json")
@@ -1,50 +1,137 @@
-import pandas as pd
-import os 
-from google.cloud import storage 
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-from src.logger.logger import get_logger 
+from src.logger.logger import get_logger
 from src.exception.exception import CustomException
 from src.config.paths_config import *
 from src.utils.common_funtions import read_yaml
+from src.data_ingestion.storage import get_storage, stream_to_file, file_crc32c
 
 logger = get_logger(__name__)
 
+LARGE_FILE = "animelist.csv"
+
 class DataIngestion:
-    def __init__(self,config):
+    def __init__(self,config,storage=None,raw_dir=RAW_DIR,state_path=INGESTION_STATE_PATH):
         self.config = config["data_ingestion"]
         self.bucket_name = self.config["bucket_name"]
         self.file_names = self.config["bucket_file_names"]
+        self.max_rows = self.config.get("max_rows", 5000000)
+        self.workers = self.config.get("workers") or len(self.file_names)
+        self.chunk_size = self.config.get("chunk_size_mb", 8) * 1024 * 1024
+
+        self.storage = storage
+        self.raw_dir = raw_dir
+        self.state_path = state_path
 
-        os.makedirs(RAW_DIR,exist_ok=True)
+        os.makedirs(self.raw_dir,exist_ok=True)
 
         logger.info("Data Ingestion Started....")
 
-    def download_csv_from_gcp(self):
-        try:
+    # -------------------- ESTADO --------------------
+    # Por fichero: metadatos del objeto de origen (size, crc32c, generation),
+    # filas conservadas y tamaño / mtime del fichero local escrito
+    def _load_state(self):
+        if os.path.exists(self.state_path):
+            with open(self.state_path) as f:
+                return json.load(f)
+        return {}
+
+    def _save_state(self, state):
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        with open(self.state_path + ".tmp", "w") as f:
+            json.dump(state, f, indent=2, sort_keys=True)
+        os.replace(self.state_path + ".tmp", self.state_path)
+
+    def _max_rows(self, file_name):
+        return self.max_rows if file_name == LARGE_FILE else None
+
+    def is_up_to_date(self, file_name, remote, previous):
+        file_path = os.path.join(self.raw_dir, file_name)
+        if not os.path.exists(file_path):
+            return False
+
+        max_rows = self._max_rows(file_name)
+        stat = os.stat(file_path)
+
+        if previous:
+            return (
+                previous["remote"] == remote
+                and previous["max_rows"] == max_rows
+                and previous["local"] == [stat.st_size, stat.st_mtime_ns]
+            )
 
-            client  = storage.Client()
-            bucket = client.bucket(self.bucket_name)
+        # Sin estado previo (descargado por una versión anterior): solo vale
+        # una copia completa con el mismo tamaño y crc32c que el objeto
+        return (
+            not max_rows
+            and stat.st_size == remote["size"]
+            and remote["crc32c"] is not None
+            and file_crc32c(file_path) == remote["crc32c"]
+        )
 
-            for file_name in self.file_names:
-                file_path = os.path.join(RAW_DIR,file_name)
+    # -------------------- DESCARGA --------------------
+    def download_file(self, file_name, previous):
+        # Devuelve la entrada de estado del fichero (None si no cambia)
+        file_path = os.path.join(self.raw_dir, file_name)
+        remote = self.storage.stat(file_name)
 
-                if file_name=="animelist.csv":
-                    blob = bucket.blob(file_name)
-                    blob.download_to_filename(file_path)
+        if self.is_up_to_date(file_name, remote, previous):
+            logger.info(f"{file_name} is up to date (generation {remote['generation']}), skipping download")
+            return None
 
-                    data = pd.read_csv(file_path,nrows=5000000)
-                    data.to_csv(file_path,index=False)
-                    logger.info("Large file detected Only downloading 5M rows")
-                else:
-                    blob = bucket.blob(file_name)
-                    blob.download_to_filename(file_path)
+        max_rows = self._max_rows(file_name)
+        start = time.perf_counter()
+        written, truncated, crc32c = stream_to_file(
+            self.storage.open(file_name, remote["generation"]),
+            file_path,
+            max_rows=max_rows,
+            chunk_size=self.chunk_size
+        )
+
+        if crc32c is not None and remote["crc32c"] is not None and crc32c != remote["crc32c"]:
+            os.remove(file_path)
+            raise ValueError(f"crc32c mismatch for {file_name}: {crc32c} vs {remote['crc32c']}")
+
+        if truncated:
+            logger.info(f"Large file detected Only keeping {max_rows} rows ({written} of {remote['size']} bytes downloaded)")
+        elif file_name == LARGE_FILE:
+            logger.info("Large file detected keeping the full dump")
+        logger.info(f"Downloaded {file_name}: {written} bytes in {time.perf_counter() - start:.1f}s")
+
+        stat = os.stat(file_path)
+        return {
+            "remote": remote,
+            "max_rows": max_rows,
+            "local": [stat.st_size, stat.st_mtime_ns],
+        }
+
+    def download_csv_from_gcp(self):
+        # Los tres ficheros se descargan a la vez en hilos (E/S de red);
+        # animelist.csv se corta en streaming tras max_rows filas
+        try:
+            if self.storage is None:
+                self.storage = get_storage(self.config)
+
+            state = self._load_state()
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                futures = {
+                    file_name: pool.submit(self.download_file, file_name, state.get(file_name))
+                    for file_name in self.file_names
+                }
+                for file_name, future in futures.items():
+                    entry = future.result()
+                    if entry is not None:
+                        state[file_name] = entry
+
+            self._save_state(state)
 
-                    logger.info("Downloading Smaller Files ie anime and anime_with synopsis")
-        
         except Exception as e:
             logger.error("Error while downloading data from GCP")
             raise CustomException("Failed to download data",e)
-        
+
     def run(self):
         try:
             logger.info("Starting Data Ingestion Process....")
@@ -58,4 +145,4 @@ class DataIngestion:
 
 if __name__=="__main__":
     data_ingestion = DataIngestion(read_yaml(CONFIG_PATH))
-    data_ingestion.run()
\ No newline at end of file
+    data_ingestion.run()
@@ -0,0 +1,234 @@
+import hashlib
+import io
+import json
+import os
+
+import numpy as np
+
+from src.logger import get_logger
+from src.exception.exception import CustomException
+
+logger = get_logger(__name__)
+
+
+MANIFEST_FILE = "manifest.json"
+FORMAT_VERSION = 1
+
+
+def _sha256(path, chunk_size=16 * 1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _append_npy(path, values):
+    # Añade filas al final de un .npy 1-D reescribiendo solo la cabecera
+    # (np.save deja hueco para que crezca la dimensión 0)
+    with open(path, "r+b") as f:
+        version = np.lib.format.read_magic(f)
+        read_header = (
+            np.lib.format.read_array_header_1_0 if version == (1, 0)
+            else np.lib.format.read_array_header_2_0
+        )
+        write_header = (
+            np.lib.format.write_array_header_1_0 if version == (1, 0)
+            else np.lib.format.write_array_header_2_0
+        )
+        shape, fortran_order, dtype = read_header(f)
+        data_offset = f.tell()
+
+        values = np.ascontiguousarray(values, dtype=dtype)
+        header = io.BytesIO()
+        write_header(header, {
+            "descr": np.lib.format.dtype_to_descr(dtype),
+            "fortran_order": fortran_order,
+            "shape": (shape[0] + len(values),) + tuple(shape[1:]),
+        })
+
+        if len(header.getvalue()) == data_offset:
+            f.seek(0)
+            f.write(header.getvalue())
+            f.seek(0, os.SEEK_END)
+            f.write(values.tobytes())
+            return
+
+    # Sin hueco en la cabecera: se reescribe el fichero completo
+    np.save(path, np.concatenate([np.load(path), values]))
+
+
+# Datos procesados en columnas binarias tipadas:
+#   <dir>/<columna>.npy   -> una columna por fichero (memory-map, sin parseo)
+#   <dir>/manifest.json   -> esquema (dtype), nº de filas, sha256 de cada
+#                            columna y tramos [inicio, fin) de cada split
+# Solo se abren las columnas pedidas (proyección) y los splits son slices
+# del memory-map, así que entrenamiento y serving leen sin copias.
+class ColumnarDataset:
+    def __init__(self, directory, columns, manifest):
+        self.directory = directory
+        self.columns = columns
+        self.manifest = manifest
+
+    def __len__(self):
+        return self.manifest["rows"]
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    @property
+    def schema(self):
+        return {name: spec["dtype"] for name, spec in self.manifest["columns"].items()}
+
+    def split(self, name):
+        start, stop = self.manifest["splits"][name]
+        return slice(start, stop)
+
+    def column(self, name, split=None):
+        column = self.columns[name]
+        return column if split is None else column[self.split(split)]
+
+    # -------------------- ESCRITURA --------------------
+    @classmethod
+    def write(cls, directory, columns, splits=None):
+        try:
+            os.makedirs(directory, exist_ok=True)
+
+            rows = {len(values) for values in columns.values()}
+            if len(rows) != 1:
+                raise ValueError(f"Columns have different lengths: {sorted(rows)}")
+            rows = rows.pop()
+
+            manifest = {
+                "format_version": FORMAT_VERSION,
+                "rows": int(rows),
+                "columns": {},
+                "splits": {name: [int(start), int(stop)] for name, (start, stop) in (splits or {}).items()},
+            }
+
+            for name, values in columns.items():
+                values = np.ascontiguousarray(values)
+                path = os.path.join(directory, f"{name}.npy")
+                np.save(path, values)
+                manifest["columns"][name] = {
+                    "file": f"{name}.npy",
+                    "dtype": values.dtype.str,
+                    "sha256": _sha256(path),
+                }
+
+            # El manifest se escribe al final: si existe, las columnas están completas
+            cls._write_manifest(directory, manifest)
+
+            logger.info(f"Columnar dataset saved to {directory}: {rows} rows, {len(columns)} columns")
+        except Exception as e:
+            raise CustomException("Error while saving columnar dataset", e)
+
+    @staticmethod
+    def _write_manifest(directory, manifest):
+        manifest_path = os.path.join(directory, MANIFEST_FILE)
+        with open(manifest_path + ".tmp", "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(manifest_path + ".tmp", manifest_path)
+
+    @classmethod
+    def append(cls, directory, columns, split=None, checksum=True):
+        # Añade filas a todas las columnas; si se indica split, este debe
+        # ser el último tramo y se amplía con las filas nuevas.
+        # checksum=False no vuelve a leer las columnas para el sha256 (queda
+        # a null hasta update_checksums): para escrituras bloque a bloque
+        try:
+            with open(os.path.join(directory, MANIFEST_FILE)) as f:
+                manifest = json.load(f)
+
+            if set(columns) != set(manifest["columns"]):
+                raise ValueError(f"Expected columns {sorted(manifest['columns'])}")
+            rows = {len(values) for values in columns.values()}
+            if len(rows) != 1:
+                raise ValueError(f"Columns have different lengths: {sorted(rows)}")
+            added = rows.pop()
+
+            if split is not None and manifest["splits"][split][1] != manifest["rows"]:
+                raise ValueError(f"Split {split} is not the last range of the dataset")
+
+            for name, values in columns.items():
+                spec = manifest["columns"][name]
+                path = os.path.join(directory, spec["file"])
+                _append_npy(path, values)
+                spec["sha256"] = _sha256(path) if checksum else None
+
+            manifest["rows"] += int(added)
+            if split is not None:
+                manifest["splits"][split][1] = manifest["rows"]
+            cls._write_manifest(directory, manifest)
+
+            logger.info(f"Appended {added} rows to columnar dataset {directory}")
+        except Exception as e:
+            raise CustomException("Error while appending to columnar dataset", e)
+
+    @classmethod
+    def update_checksums(cls, directory):
+        # Recalcula el sha256 de las columnas que no lo tienen
+        try:
+            with open(os.path.join(directory, MANIFEST_FILE)) as f:
+                manifest = json.load(f)
+
+            for spec in manifest["columns"].values():
+                if spec["sha256"] is None:
+                    spec["sha256"] = _sha256(os.path.join(directory, spec["file"]))
+            cls._write_manifest(directory, manifest)
+        except Exception as e:
+            raise CustomException("Error while updating columnar dataset checksums", e)
+
+    @classmethod
+    def replace_column(cls, directory, name, values):
+        # Reescribe una columna completa (mismo nº de filas)
+        try:
+            with open(os.path.join(directory, MANIFEST_FILE)) as f:
+                manifest = json.load(f)
+
+            if len(values) != manifest["rows"]:
+                raise ValueError(f"Column {name} must have {manifest['rows']} rows")
+
+            values = np.ascontiguousarray(values)
+            spec = manifest["columns"][name]
+            path = os.path.join(directory, spec["file"])
+            np.save(path, values)
+            spec["dtype"] = values.dtype.str
+            spec["sha256"] = _sha256(path)
+            cls._write_manifest(directory, manifest)
+        except Exception as e:
+            raise CustomException("Error while replacing column in columnar dataset", e)
+
+    # -------------------- LECTURA --------------------
+    @classmethod
+    def open(cls, directory, columns=None, mmap_mode="r", verify=False):
+        try:
+            with open(os.path.join(directory, MANIFEST_FILE)) as f:
+                manifest = json.load(f)
+
+            names = columns or list(manifest["columns"])
+            loaded = {}
+            for name in names:
+                spec = manifest["columns"][name]
+                path = os.path.join(directory, spec["file"])
+
+                if verify and spec["sha256"] is None:
+                    raise ValueError(f"Column {name} has no checksum")
+                if verify and _sha256(path) != spec["sha256"]:
+                    raise ValueError(f"Checksum mismatch for column {name}")
+
+                values = np.load(path, mmap_mode=mmap_mode)
+                if values.dtype.str != spec["dtype"] or len(values) != manifest["rows"]:
+                    raise ValueError(
+                        f"Column {name} does not match manifest: "
+                        f"{values.dtype.str}[{len(values)}] vs {spec['dtype']}[{manifest['rows']}]"
+                    )
+                loaded[name] = values
+
+            return cls(directory, loaded, manifest)
+        except Exception as e:
+            raise CustomException(f"Error while opening columnar dataset {directory}", e)
+
+    @staticmethod
+    def exists(directory):
+        return os.path.exists(os.path.join(directory, MANIFEST_FILE))
@@ -0,0 +1,171 @@
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from src.logger import get_logger
+from src.exception.exception import CustomException
+
+logger = get_logger(__name__)
+
+
+# Codificación ID real <-> índice del embedding con arrays de NumPy:
+#   ids[code]    -> ID real (orden de primera aparición, como los antiguos
+#                   diccionarios, para que los pesos ya entrenados sigan valiendo)
+#   lookup[id]   -> código, o -1 si el ID no existe (tabla densa: los IDs
+#                   de MAL son enteros no negativos y acotados)
+# Ambos se guardan como .npy y se leen con memory-map, en lugar de
+# deserializar dos diccionarios de Python por tabla.
+class IdEncoding:
+    def __init__(self, ids, lookup):
+        self.ids = ids
+        self.lookup = lookup
+
+    def __len__(self):
+        return self.ids.shape[0]
+
+    # -------------------- CONSTRUCCIÓN --------------------
+    @classmethod
+    def fit(cls, values):
+        # Devuelve (códigos de cada fila, codificación)
+        codes, ids = pd.factorize(np.asarray(values), sort=False)
+        ids = ids.astype(np.int32 if ids.max(initial=0) < 2 ** 31 else np.int64)
+
+        lookup = np.full(int(ids.max(initial=-1)) + 1, -1, dtype=np.int32)
+        lookup[ids] = np.arange(len(ids), dtype=np.int32)
+        return codes.astype(np.int64), cls(ids, lookup)
+
+    @classmethod
+    def from_mapping(cls, mapping, decoded=False):
+        # Convierte los diccionarios pickle antiguos (encoded o decoded)
+        if decoded:
+            codes = np.fromiter(mapping.keys(), dtype=np.int64, count=len(mapping))
+            ids = np.fromiter(mapping.values(), dtype=np.int64, count=len(mapping))
+        else:
+            ids = np.fromiter(mapping.keys(), dtype=np.int64, count=len(mapping))
+            codes = np.fromiter(mapping.values(), dtype=np.int64, count=len(mapping))
+
+        ordered = np.empty(len(ids), dtype=np.int64)
+        ordered[codes] = ids
+        lookup = np.full(int(ids.max(initial=-1)) + 1, -1, dtype=np.int32)
+        lookup[ordered] = np.arange(len(ordered), dtype=np.int32)
+        return cls(ordered, lookup)
+
+    def extend(self, values):
+        # Añade al final los IDs que aún no tienen código (orden de primera
+        # aparición) sin tocar los existentes. Devuelve (códigos, codificación)
+        values = np.asarray(values)
+        codes = self.encode(values)
+        new_ids = pd.unique(values[codes < 0]).astype(np.int64)
+        if len(new_ids) == 0:
+            return codes, self
+
+        ids = np.concatenate([np.asarray(self.ids, dtype=np.int64), new_ids])
+        ids = ids.astype(np.int32 if ids.max() < 2 ** 31 else np.int64)
+
+        lookup = np.full(max(len(self.lookup), int(new_ids.max()) + 1), -1, dtype=np.int32)
+        lookup[:len(self.lookup)] = self.lookup
+        lookup[new_ids] = np.arange(len(self), len(ids), dtype=np.int32)
+
+        encoding = IdEncoding(ids, lookup)
+        return encoding.encode(values), encoding
+
+    # -------------------- CONSULTAS --------------------
+    def encode(self, ids):
+        # IDs reales -> códigos (-1 si no existen)
+        ids = np.asarray(ids, dtype=np.int64)
+        codes = np.full(ids.shape, -1, dtype=np.int64)
+        inside = (ids >= 0) & (ids < len(self.lookup))
+        codes[inside] = self.lookup[ids[inside]]
+        return codes
+
+    def decode(self, codes):
+        # Códigos -> IDs reales (-1 si están fuera de rango)
+        codes = np.asarray(codes, dtype=np.int64)
+        ids = np.full(codes.shape, -1, dtype=np.int64)
+        inside = (codes >= 0) & (codes < len(self.ids))
+        ids[inside] = self.ids[codes[inside]]
+        return ids
+
+    def encoder(self):
+        return EncodedMapping(self)
+
+    def decoder(self):
+        return DecodedMapping(self)
+
+    # -------------------- PERSISTENCIA --------------------
+    def save(self, ids_path, lookup_path):
+        try:
+            os.makedirs(os.path.dirname(ids_path), exist_ok=True)
+            np.save(ids_path, self.ids)
+            np.save(lookup_path, self.lookup)
+            logger.info(f"Id encoding saved to {ids_path}")
+        except Exception as e:
+            raise CustomException("Error while saving id encoding", e)
+
+    @classmethod
+    def load(cls, ids_path, lookup_path, mmap_mode="r"):
+        return cls(
+            np.load(ids_path, mmap_mode=mmap_mode),
+            np.load(lookup_path, mmap_mode=mmap_mode)
+        )
+
+    @staticmethod
+    def exists(ids_path, lookup_path):
+        return os.path.exists(ids_path) and os.path.exists(lookup_path)
+
+
+def load_id_encoding(ids_path, lookup_path, legacy_path=None, decoded=False):
+    # Arrays .npy si existen; si no, convierte el diccionario pickle antiguo
+    if IdEncoding.exists(ids_path, lookup_path) or legacy_path is None:
+        return IdEncoding.load(ids_path, lookup_path)
+    return IdEncoding.from_mapping(joblib.load(legacy_path), decoded=decoded)
+
+
+# =========================
+# ADAPTADORES TIPO DICT
+# =========================
+# Mantienen la interfaz de los antiguos diccionarios (.get, [], in, len)
+# para helpers.py; get_many hace la misma consulta vectorizada.
+
+class _Mapping:
+    def __init__(self, encoding):
+        self.encoding = encoding
+
+    def __len__(self):
+        return len(self.encoding)
+
+    def get(self, key, default=None):
+        try:
+            value = int(self.get_many([int(key)])[0])
+        except (TypeError, ValueError, OverflowError):
+            return default
+        return default if value < 0 else value
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+
+class EncodedMapping(_Mapping):
+    # ID real -> código
+    def get_many(self, keys):
+        return self.encoding.encode(keys)
+
+    def __iter__(self):
+        return iter(np.asarray(self.encoding.ids).tolist())
+
+
+class DecodedMapping(_Mapping):
+    # Código -> ID real
+    def get_many(self, keys):
+        return self.encoding.decode(keys)
+
+    def __iter__(self):
+        return iter(range(len(self.encoding)))
@@ -0,0 +1,171 @@
+import os
+
+import numpy as np
+
+from src.logger.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+# Clase que guarda las valoraciones de cada usuario en formato CSR:
+#   user_ids[i]                     -> usuario i (ordenados)
+#   offsets[i]:offsets[i + 1]       -> sus filas en anime_ids / ratings
+#   anime_ids, ratings              -> ordenados por rating descendente dentro de cada usuario
+#   liked_counts[i]                 -> nº de animes con rating >= percentil 75
+# Como las valoraciones están ordenadas de mayor a menor, los animes
+# favoritos de un usuario son siempre un prefijo de su tramo.
+class UserPreferenceIndex:
+    FILES = ("user_ids", "offsets", "anime_ids", "ratings", "liked_counts")
+
+    def __init__(self, user_ids, offsets, anime_ids, ratings, liked_counts):
+        self.user_ids = user_ids
+        self.offsets = offsets
+        self.anime_ids = anime_ids
+        self.ratings = ratings
+        self.liked_counts = liked_counts
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    # -------------------- CONSTRUCCIÓN --------------------
+    @classmethod
+    def from_ratings(cls, user_ids, anime_ids, ratings, percentile=75):
+        user_ids = np.asarray(user_ids)
+        anime_ids = np.asarray(anime_ids)
+        ratings = np.asarray(ratings)
+
+        # Ordena por usuario y, dentro de cada usuario, por rating descendente
+        order = np.lexsort((-ratings, user_ids))
+        sorted_users = user_ids[order]
+
+        unique_users, starts, counts = np.unique(
+            sorted_users, return_index=True, return_counts=True
+        )
+        offsets = np.append(starts, len(sorted_users)).astype(np.int64)
+        sorted_anime = anime_ids[order].astype(np.int32)
+        sorted_ratings = ratings[order]
+
+        # Percentil por usuario (interpolación lineal, igual que np.percentile)
+        # sobre el tramo ordenado de forma descendente
+        position = (percentile / 100.0) * (counts - 1)
+        low = np.floor(position).astype(np.int64)
+        high = np.ceil(position).astype(np.int64)
+        fraction = position - low
+
+        ends = offsets[1:] - 1
+        low_values = sorted_ratings[ends - low]
+        high_values = sorted_ratings[ends - high]
+        thresholds = low_values + (high_values - low_values) * fraction
+
+        # Nº de animes con rating >= percentil (prefijo de cada tramo)
+        user_of_row = np.repeat(np.arange(len(unique_users)), counts)
+        liked = sorted_ratings >= thresholds[user_of_row]
+        liked_counts = np.bincount(
+            user_of_row[liked], minlength=len(unique_users)
+        ).astype(np.int32)
+
+        logger.info(f"User preference index built for {len(unique_users)} users")
+        return cls(
+            unique_users.astype(np.int64),
+            offsets,
+            sorted_anime,
+            sorted_ratings.astype(np.float32),
+            liked_counts
+        )
+
+    def merge(self, other):
+        # Índice nuevo en el que los usuarios de other sustituyen (o se
+        # añaden) a los de este; el resto de tramos se copia tal cual
+        keep = ~np.isin(self.user_ids, other.user_ids)
+        user_ids = np.concatenate([np.asarray(self.user_ids)[keep], other.user_ids])
+        order = np.argsort(user_ids, kind="stable")
+
+        self_offsets = np.asarray(self.offsets)
+        starts = np.concatenate([
+            self_offsets[:-1][keep], other.offsets[:-1] + len(self.anime_ids)
+        ])[order]
+        counts = np.concatenate([
+            np.diff(self_offsets)[keep], np.diff(other.offsets)
+        ])[order]
+
+        flat = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        flat += np.repeat(starts, counts)
+
+        return UserPreferenceIndex(
+            user_ids[order].astype(np.int64),
+            np.append(0, np.cumsum(counts)).astype(np.int64),
+            np.concatenate([self.anime_ids, other.anime_ids])[flat],
+            np.concatenate([self.ratings, other.ratings])[flat],
+            np.concatenate([np.asarray(self.liked_counts)[keep], other.liked_counts])[order]
+        )
+
+    # -------------------- PERSISTENCIA --------------------
+    def save(self, output_dir):
+        os.makedirs(output_dir, exist_ok=True)
+        for name in self.FILES:
+            np.save(os.path.join(output_dir, f"{name}.npy"), getattr(self, name))
+        logger.info(f"User preference index saved to {output_dir}")
+
+    @classmethod
+    def load(cls, input_dir, mmap_mode="r"):
+        arrays = {
+            name: np.load(os.path.join(input_dir, f"{name}.npy"), mmap_mode=mmap_mode)
+            for name in cls.FILES
+        }
+        logger.info(f"User preference index loaded from {input_dir}")
+        return cls(**arrays)
+
+    @classmethod
+    def exists(cls, input_dir):
+        return all(
+            os.path.exists(os.path.join(input_dir, f"{name}.npy"))
+            for name in cls.FILES
+        )
+
+    # -------------------- CONSULTAS --------------------
+    def position(self, user_id):
+        # Posición del usuario en user_ids (-1 si no existe)
+        pos = int(np.searchsorted(self.user_ids, user_id))
+        if pos < len(self.user_ids) and self.user_ids[pos] == user_id:
+            return pos
+        return -1
+
+    def ratings_of(self, user_id):
+        # (anime_ids, ratings) del usuario, ordenados por rating descendente
+        pos = self.position(user_id)
+        if pos < 0:
+            return self.anime_ids[:0], self.ratings[:0]
+        start, stop = self.offsets[pos], self.offsets[pos + 1]
+        return self.anime_ids[start:stop], self.ratings[start:stop]
+
+    def liked(self, user_id):
+        # Animes con rating >= percentil 75 del usuario (slice del array)
+        pos = self.position(user_id)
+        if pos < 0:
+            return self.anime_ids[:0]
+        start = self.offsets[pos]
+        return self.anime_ids[start:start + self.liked_counts[pos]]
+
+    def liked_many(self, user_ids):
+        return [self.liked(user_id) for user_id in user_ids]
+
+    def liked_batch(self, user_ids):
+        # Favoritos de muchos usuarios de una vez, sin bucles de Python:
+        # devuelve (anime_ids, owners) donde owners[i] es la posición en
+        # user_ids del usuario al que pertenece anime_ids[i]
+        user_ids = np.asarray(user_ids, dtype=np.int64)
+        if len(self.user_ids) == 0:
+            # Índice vacío (ningún usuario supera min_rating)
+            return np.asarray(self.anime_ids[:0]), np.empty(0, dtype=np.int64)
+
+        pos = np.searchsorted(self.user_ids, user_ids)
+        pos = np.minimum(pos, len(self.user_ids) - 1)
+        found = self.user_ids[pos] == user_ids
+
+        starts = np.asarray(self.offsets)[pos]
+        counts = np.where(found, np.asarray(self.liked_counts)[pos], 0)
+
+        owners = np.repeat(np.arange(len(user_ids)), counts)
+        flat = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        flat += np.repeat(starts, counts)
+        return np.asarray(self.anime_ids[flat]), owners
@@ -1,26 +1,58 @@
 import pandas as pd
 import os 
 import numpy as np
-import joblib
 import sys
+import json
+import shutil
+import argparse
 
 from src.logger.logger import get_logger 
 from src.exception.exception import CustomException
 from src.config.paths_config import *
+from src.utils.common_funtions import read_yaml
+from src.utils.memory_profiler import StageMemoryTracker
+from src.data_preprocessing.preference_index import UserPreferenceIndex
+from src.data_preprocessing.id_encoding import IdEncoding
+from src.data_preprocessing.columnar_dataset import ColumnarDataset, _append_npy
+from src.data_preprocessing.sharding import load_sharded
 
 # Se crea un logger para registrar mensajes de ejecución (info, errores, etc.)
 logger = get_logger(__name__)
 
 
+# -------------------- TRANSFORMACIONES COLUMNARES --------------------
+# Operan sobre columnas completas (coste lineal), sin apply por fila
+
+def min_max_scale(values, min_value=None, max_value=None):
+    # Normaliza a [0,1] en float64 (se convierte antes de restar para
+    # no desbordar los ratings int8). Sin límites usa el mín / máx de values
+    values = np.asarray(values, dtype=np.float64)
+    if min_value is None:
+        min_value, max_value = values.min(), values.max()
+    return (values - min_value) / (max_value - min_value)
+
+
+def resolve_anime_names(df):
+    # "Unknown" -> NaN y nombre inglés con respaldo en Name
+    df = df.replace("Unknown", np.nan)
+    df["anime_id"] = df["MAL_ID"]
+    df["eng_version"] = df["English name"].fillna(df["Name"])
+    return df
+
+
 # Clase encargada de todo el preprocesamiento de datos
 class DataProcessor:
-    def __init__(self, input_file, output_dir):
+    def __init__(self, input_file, output_dir, config=None):
         # Ruta del CSV de ratings (user_id, anime_id, rating)
         self.input_file = input_file
 
         # Carpeta donde se guardarán los datos procesados
         self.output_dir = output_dir
 
+        # Sección data_processing de config.yaml
+        self.config = (config or read_yaml(CONFIG_PATH)).get("data_processing", {})
+        self.memory = StageMemoryTracker(enabled=self.config.get("report_memory", False))
+
         # DataFrames principales (se inicializan vacíos)
         self.rating_df = None
         self.anime_df = None
@@ -31,11 +63,16 @@ class DataProcessor:
         self.y_train = None
         self.y_test = None
 
-        # Diccionarios de codificación (ID real ↔ índice)
-        self.user2user_encoded = {}
-        self.user2user_decoded = {}
-        self.anime2anime_encoded = {}
-        self.anime2anime_decoded = {}
+        # Codificación ID real ↔ índice (arrays de NumPy)
+        self.user_encoding = None
+        self.anime_encoding = None
+
+        # Estado para el modo incremental: conteos por usuario (todos),
+        # directorio con las filas de usuarios que no pasan el filtro y
+        # rango del rating
+        self.user_counts = None
+        self.pending_dir = PENDING_RATINGS_DIR + ".tmp"
+        self.rating_range = None
 
         # Crea el directorio de salida si no existe
         os.makedirs(self.output_dir, exist_ok=True)
@@ -55,7 +92,83 @@ class DataProcessor:
         except Exception as e:
             # Lanza excepción personalizada si falla
             raise CustomException("Failed to load data", sys)
-        
+
+    # -------------------- CARGA POR BLOQUES --------------------
+    # Para el dump completo (~100M filas) que no cabe con los dtypes por defecto:
+    #   1ª pasada: solo user_id, cuenta valoraciones por usuario
+    #   2ª pasada: conserva únicamente las filas de usuarios que pasan el filtro
+    # Los IDs se leen como int32 y el rating como int8 / float32, y nunca
+    # se materializa el CSV completo (sustituye a load_data + filter_users).
+    def _dtypes(self, usecols):
+        dtypes = {
+            "user_id": np.int32,
+            "anime_id": np.int32,
+            "rating": self.config.get("rating_dtype", "int8"),
+        }
+        return {c: dtypes[c] for c in usecols if c in dtypes}
+
+    def load_data_streaming(self, usecols, min_rating=400, chunk_size=1000000):
+        try:
+            keep_pending = self.config.get("incremental_state", False)
+            if keep_pending:
+                self.start_pending(usecols)
+
+            # 1ª pasada: conteo por usuario (IDs de MAL enteros no negativos)
+            n_ratings = np.zeros(0, dtype=np.int64)
+            for chunk in pd.read_csv(self.input_file, usecols=["user_id"],
+                                     dtype={"user_id": np.int32}, chunksize=chunk_size):
+                counts = np.bincount(chunk["user_id"].values)
+                if len(counts) > len(n_ratings):
+                    n_ratings = np.pad(n_ratings, (0, len(counts) - len(n_ratings)))
+                n_ratings[:len(counts)] += counts
+
+            keep_user = n_ratings >= min_rating
+
+            # 2ª pasada: filtra cada bloque antes de acumularlo; las filas
+            # pendientes van directamente a disco
+            chunks = []
+            for chunk in pd.read_csv(self.input_file, usecols=usecols,
+                                     dtype=self._dtypes(usecols), chunksize=chunk_size):
+                keep = keep_user[chunk["user_id"].values]
+                chunks.append(chunk[keep])
+                if keep_pending:
+                    self.append_pending(chunk[~keep])
+
+            self.rating_df = pd.concat(chunks, ignore_index=True)
+            self.user_counts = n_ratings
+
+            logger.info(
+                f"Data loaded in chunks for Data Processing: {len(self.rating_df)} rows "
+                f"from {int(keep_user.sum())} users"
+            )
+        except Exception as e:
+            raise CustomException("Failed to load data in chunks", sys)
+
+    # -------------------- CARGA EN PARALELO --------------------
+    # Parseo, conteo y filtrado repartidos por shards de usuario en un
+    # ProcessPoolExecutor (ver sharding.py). Mismo resultado que la carga
+    # secuencial para cualquier nº de procesos.
+    def load_data_parallel(self, usecols, min_rating=400, workers=None):
+        try:
+            keep_pending = self.config.get("incremental_state", False)
+            if keep_pending:
+                self.start_pending(usecols)
+
+            self.rating_df, self.user_counts = load_sharded(
+                self.input_file,
+                usecols,
+                self._dtypes(usecols),
+                min_rating=min_rating,
+                workers=workers,
+                n_shards=self.config.get("shards") or None,
+                pending_dir=self.pending_dir if keep_pending else None,
+                scratch_dir=self.output_dir
+            )
+
+            logger.info(f"Data loaded in parallel for Data Processing: {len(self.rating_df)} rows")
+        except Exception as e:
+            raise CustomException("Failed to load data in parallel", sys)
+
     # -------------------- FILTRADO DE USUARIOS --------------------
     def filter_users(self, min_rating=400):
         try:
@@ -63,11 +176,14 @@ class DataProcessor:
             n_ratings = self.rating_df["user_id"].value_counts()
 
             # Se queda solo con usuarios con al menos min_rating valoraciones
-            self.rating_df = self.rating_df[
-                self.rating_df["user_id"].isin(
-                    n_ratings[n_ratings >= min_rating].index
-                )
-            ].copy()
+            keep = self.rating_df["user_id"].isin(
+                n_ratings[n_ratings >= min_rating].index
+            )
+            if self.config.get("incremental_state", False):
+                self.user_counts = np.bincount(self.rating_df["user_id"].values)
+                self.start_pending(self.rating_df.columns)
+                self.append_pending(self.rating_df[~keep])
+            self.rating_df = self.rating_df[keep].copy()
 
             logger.info("Filtered users successfully...")
         except Exception as e:
@@ -76,17 +192,10 @@ class DataProcessor:
     # -------------------- ESCALADO DE RATINGS --------------------
     def scale_ratings(self):
         try:
-            # Obtiene el mínimo y máximo rating
-            min_rating = min(self.rating_df["rating"])
-            max_rating = max(self.rating_df["rating"])
-
             # Normaliza los ratings a rango [0,1]
-            self.rating_df["rating"] = (
-                self.rating_df["rating"]
-                .apply(lambda x: (x - min_rating) / (max_rating - min_rating))
-                .values
-                .astype(np.float64)
-            )
+            ratings = self.rating_df["rating"].values
+            self.rating_range = (float(ratings.min()), float(ratings.max()))
+            self.rating_df["rating"] = min_max_scale(ratings, *self.rating_range)
 
             logger.info("Scaling done for Processing")
         except Exception as e:
@@ -95,28 +204,19 @@ class DataProcessor:
     # -------------------- CODIFICACIÓN DE USUARIOS Y ANIMES --------------------
     def encode_data(self):
         try:
-            ### -------- USERS --------
-            # Obtiene IDs únicos de usuarios
-            user_ids = self.rating_df["user_id"].unique().tolist()
-
-            # Crea diccionarios de codificación
-            self.user2user_encoded = {x: i for i, x in enumerate(user_ids)}
-            self.user2user_decoded = {i: x for i, x in enumerate(user_ids)}
+            # pd.factorize asigna los códigos en orden de primera aparición
+            # (los mismos que los antiguos diccionarios) sin bucles de Python
 
+            ### -------- USERS --------
             # Añade columna "user" con IDs codificados
-            self.rating_df["user"] = self.rating_df["user_id"].map(
-                self.user2user_encoded
+            self.rating_df["user"], self.user_encoding = IdEncoding.fit(
+                self.rating_df["user_id"].values
             )
 
             ### -------- ANIME --------
-            anime_ids = self.rating_df["anime_id"].unique().tolist()
-
-            self.anime2anime_encoded = {x: i for i, x in enumerate(anime_ids)}
-            self.anime2anime_decoded = {i: x for i, x in enumerate(anime_ids)}
-
             # Añade columna "anime" con IDs codificados
-            self.rating_df["anime"] = self.rating_df["anime_id"].map(
-                self.anime2anime_encoded
+            self.rating_df["anime"], self.anime_encoding = IdEncoding.fit(
+                self.rating_df["anime_id"].values
             )
 
             logger.info("Encoding done for Users and Anime")
@@ -163,35 +263,265 @@ class DataProcessor:
     # -------------------- GUARDADO DE ARTEFACTOS --------------------
     def save_artifacts(self):
         try:
-            # Diccionarios a persistir
-            artifacts = {
-                "user2user_encoded": self.user2user_encoded,
-                "user2user_decoded": self.user2user_decoded,
-                "anim2anime_encoded": self.anime2anime_encoded,
-                "anim2anime_decoded": self.anime2anime_decoded,
-            }
-
-            # Guarda cada diccionario como .pkl
-            for name, data in artifacts.items():
-                joblib.dump(
-                    data,
-                    os.path.join(self.output_dir, f"{name}.pkl")
-                )
-                logger.info(f"{name} saved successfully")
-
-            # Guarda datos de entrenamiento y test
-            joblib.dump(self.X_train_array, X_TRAIN_ARRAY)
-            joblib.dump(self.X_test_array, X_TEST_ARRAY)
-            joblib.dump(self.y_train, Y_TRAIN)
-            joblib.dump(self.y_test, Y_TEST)
-
-            # Guarda el dataframe final de ratings
-            self.rating_df.to_csv(RATING_DF, index=False)
+            # Codificaciones como arrays .npy (sustituyen a los diccionarios .pkl)
+            self.user_encoding.save(USER_IDS, USER_ID_LOOKUP)
+            self.anime_encoding.save(ANIME_IDS, ANIME_ID_LOOKUP)
+
+            # Guarda el dataframe final de ratings (ya barajado) en columnas
+            # binarias. El test va primero ([0, n_test)) y el train al final
+            # ([n_test, n)) para que el modo incremental pueda ampliarlo
+            n_train = len(self.y_train)
+            n_rows = len(self.rating_df)
+            layout = np.r_[n_train:n_rows, 0:n_train]
+
+            ColumnarDataset.write(
+                RATINGS_DATASET_DIR,
+                self._dataset_columns(self.rating_df.iloc[layout]),
+                splits={
+                    "test": (0, n_rows - n_train),
+                    "train": (n_rows - n_train, n_rows),
+                }
+            )
 
             logger.info("All processed data saved successfully")
         except Exception as e:
             raise CustomException("Failed to save artifacts data", sys)
         
+    # -------------------- ÍNDICE DE PREFERENCIAS --------------------
+    def save_preference_index(self):
+        try:
+            # Índice CSR por usuario con sus animes favoritos precalculados
+            # (lo usa get_user_preferences en serving en lugar de rating_df)
+            index = UserPreferenceIndex.from_ratings(
+                self.rating_df["user_id"].values,
+                self.rating_df["anime_id"].values,
+                self.rating_df["rating"].values
+            )
+            index.save(USER_PREFERENCES_DIR)
+
+            logger.info("User preference index saved successfully")
+        except Exception as e:
+            raise CustomException("Failed to save user preference index", sys)
+
+    @staticmethod
+    def _dataset_columns(rating_df):
+        return {
+            "user_id": rating_df["user_id"].values.astype(np.int32),
+            "anime_id": rating_df["anime_id"].values.astype(np.int32),
+            "rating": rating_df["rating"].values.astype(np.float64),
+            "user": rating_df["user"].values.astype(np.int32),
+            "anime": rating_df["anime"].values.astype(np.int32),
+        }
+
+    # -------------------- FILAS PENDIENTES --------------------
+    # Las filas de usuarios que no pasan el filtro se escriben en disco
+    # bloque a bloque mientras se cargan (nunca se juntan en memoria) en un
+    # directorio temporal que save_incremental_state mueve a PENDING_RATINGS_DIR
+    PENDING_COLUMNS = ["user_id", "anime_id", "rating"]
+
+    def start_pending(self, usecols):
+        dtypes = self._dtypes(usecols)
+        shutil.rmtree(self.pending_dir, ignore_errors=True)
+        ColumnarDataset.write(self.pending_dir, {
+            column: np.empty(0, dtype=dtypes[column]) for column in self.PENDING_COLUMNS
+        })
+
+    def append_pending(self, rows):
+        ColumnarDataset.append(self.pending_dir, {
+            column: rows[column].values for column in self.PENDING_COLUMNS
+        }, checksum=False)
+
+    @staticmethod
+    def mark_pending_removed(rows):
+        # Lápidas: posiciones del almacén que ya están en los datos procesados
+        rows = np.asarray(rows, dtype=np.int64)
+        if os.path.exists(PENDING_REMOVED):
+            _append_npy(PENDING_REMOVED, rows)
+        else:
+            np.save(PENDING_REMOVED, rows)
+
+    # -------------------- ESTADO INCREMENTAL --------------------
+    def save_incremental_state(self, min_rating=400, random_state=43, deltas=0):
+        try:
+            os.makedirs(INCREMENTAL_DIR, exist_ok=True)
+            np.save(USER_COUNTS, self.user_counts)
+
+            ColumnarDataset.update_checksums(self.pending_dir)
+            shutil.rmtree(PENDING_RATINGS_DIR, ignore_errors=True)
+            os.replace(self.pending_dir, PENDING_RATINGS_DIR)
+            if os.path.exists(PENDING_REMOVED):
+                os.remove(PENDING_REMOVED)
+
+            with open(INCREMENTAL_STATE, "w") as f:
+                json.dump({
+                    "min_rating": min_rating,
+                    "rating_range": list(self.rating_range),
+                    "random_state": random_state,
+                    "deltas": deltas,
+                }, f, indent=2)
+
+            logger.info("Incremental state saved successfully")
+        except Exception as e:
+            raise CustomException("Failed to save incremental state", sys)
+
+    def load_incremental_state(self):
+        try:
+            if not os.path.exists(INCREMENTAL_STATE):
+                raise FileNotFoundError(
+                    "No incremental state found: run a full build with "
+                    "data_processing.incremental_state enabled first"
+                )
+
+            with open(INCREMENTAL_STATE) as f:
+                state = json.load(f)
+
+            self.user_counts = np.load(USER_COUNTS)
+            self.rating_range = tuple(state["rating_range"])
+            self.user_encoding = IdEncoding.load(USER_IDS, USER_ID_LOOKUP, mmap_mode=None)
+            self.anime_encoding = IdEncoding.load(ANIME_IDS, ANIME_ID_LOOKUP, mmap_mode=None)
+
+            logger.info("Incremental state loaded successfully")
+            return state
+        except Exception as e:
+            raise CustomException("Failed to load incremental state", sys)
+
+    def load_delta(self, delta_file, usecols):
+        try:
+            delta_df = pd.read_csv(delta_file, usecols=usecols, dtype=self._dtypes(usecols))
+            logger.info(f"Delta loaded: {len(delta_df)} rows from {delta_file}")
+            return delta_df
+        except Exception as e:
+            raise CustomException("Failed to load delta data", sys)
+
+    # -------------------- DELTA: FILTRO --------------------
+    def apply_delta_filter(self, delta_df, min_rating=400):
+        # Actualiza los conteos por usuario con el delta y reparte las filas:
+        #   - usuarios que ya pasaban el filtro      -> sus filas del delta
+        #   - usuarios que lo pasan ahora            -> sus filas pendientes + delta
+        #   - usuarios que siguen sin pasarlo        -> quedan pendientes
+        # El almacén de pendientes no se reescribe: las filas del delta se
+        # añaden al final y las promovidas se anotan en PENDING_REMOVED, así
+        # que solo se leen user_id (si alguien pasa el filtro) y sus filas
+        try:
+            delta_users = delta_df["user_id"].values
+            size = max(len(self.user_counts), int(delta_users.max(initial=-1)) + 1)
+
+            old_counts = np.zeros(size, dtype=np.int64)
+            old_counts[:len(self.user_counts)] = self.user_counts
+            self.user_counts = old_counts + np.bincount(delta_users, minlength=size)
+
+            qualifies = self.user_counts >= min_rating
+            promoted = qualifies & (old_counts < min_rating)
+            in_delta = qualifies[delta_users]
+
+            self.rating_df = delta_df[in_delta].reset_index(drop=True)
+
+            if promoted.any():
+                # Filas de los usuarios promovidos leídas del memory-map
+                pending = ColumnarDataset.open(PENDING_RATINGS_DIR)
+                rows = np.flatnonzero(promoted[pending["user_id"]])
+                if os.path.exists(PENDING_REMOVED):
+                    rows = rows[~np.isin(rows, np.load(PENDING_REMOVED))]
+
+                promoted_df = pd.DataFrame({c: pending[c][rows] for c in self.PENDING_COLUMNS})
+                self.rating_df = pd.concat([promoted_df, self.rating_df], ignore_index=True)
+                self.mark_pending_removed(rows)
+
+            ColumnarDataset.append(PENDING_RATINGS_DIR, {
+                column: delta_df[column].values[~in_delta] for column in self.PENDING_COLUMNS
+            }, checksum=False)
+
+            np.save(USER_COUNTS, self.user_counts)
+
+            logger.info(
+                f"Delta filtered: {len(self.rating_df)} new rows, "
+                f"{int(promoted.sum())} users now pass the filter"
+            )
+        except Exception as e:
+            raise CustomException("Failed to filter delta data", sys)
+
+    # -------------------- DELTA: ESCALADO --------------------
+    def scale_delta_ratings(self):
+        # Escala con el rango guardado; si el delta lo amplía se reescala
+        # también la columna ya guardada. Devuelve True en ese caso.
+        try:
+            ratings = self.rating_df["rating"].values
+            old_range = self.rating_range
+            self.rating_range = (
+                min(old_range[0], float(ratings.min())),
+                max(old_range[1], float(ratings.max()))
+            )
+            self.rating_df["rating"] = min_max_scale(ratings, *self.rating_range)
+
+            if self.rating_range == old_range:
+                return False
+
+            stored = ColumnarDataset.open(RATINGS_DATASET_DIR, columns=["rating"], mmap_mode=None)
+            raw = stored["rating"] * (old_range[1] - old_range[0]) + old_range[0]
+            if np.issubdtype(np.dtype(self.config.get("rating_dtype", "int8")), np.integer):
+                raw = np.rint(raw)
+            ColumnarDataset.replace_column(
+                RATINGS_DATASET_DIR, "rating", min_max_scale(raw, *self.rating_range)
+            )
+
+            logger.info(f"Rating range changed {old_range} -> {self.rating_range}, ratings rescaled")
+            return True
+        except Exception as e:
+            raise CustomException("Failed to scale delta data", sys)
+
+    # -------------------- DELTA: CODIFICACIÓN Y GUARDADO --------------------
+    def append_delta(self, random_state=43):
+        try:
+            # Los IDs nuevos se codifican al final; los existentes no cambian
+            self.rating_df["user"], self.user_encoding = self.user_encoding.extend(
+                self.rating_df["user_id"].values
+            )
+            self.rating_df["anime"], self.anime_encoding = self.anime_encoding.extend(
+                self.rating_df["anime_id"].values
+            )
+            self.user_encoding.save(USER_IDS, USER_ID_LOOKUP)
+            self.anime_encoding.save(ANIME_IDS, ANIME_ID_LOOKUP)
+
+            # Filas nuevas barajadas y añadidas al final del split de train
+            self.rating_df = (
+                self.rating_df
+                .sample(frac=1, random_state=random_state)
+                .reset_index(drop=True)
+            )
+            ColumnarDataset.append(
+                RATINGS_DATASET_DIR, self._dataset_columns(self.rating_df), split="train"
+            )
+
+            logger.info(f"Appended {len(self.rating_df)} rows to processed data")
+        except Exception as e:
+            raise CustomException("Failed to append delta data", sys)
+
+    def update_preference_index(self, rebuild=False):
+        # Recalcula solo los usuarios con filas nuevas (con todas sus filas)
+        # y los mezcla con el índice existente
+        try:
+            dataset = ColumnarDataset.open(
+                RATINGS_DATASET_DIR, columns=["user_id", "anime_id", "rating"]
+            )
+
+            if rebuild or not UserPreferenceIndex.exists(USER_PREFERENCES_DIR):
+                mask = slice(None)
+            else:
+                mask = np.isin(dataset["user_id"], np.unique(self.rating_df["user_id"].values))
+
+            index = UserPreferenceIndex.from_ratings(
+                dataset["user_id"][mask],
+                dataset["anime_id"][mask],
+                dataset["rating"][mask]
+            )
+            if not isinstance(mask, slice):
+                index = UserPreferenceIndex.load(USER_PREFERENCES_DIR, mmap_mode=None).merge(index)
+            index.save(USER_PREFERENCES_DIR)
+
+            logger.info("User preference index updated successfully")
+        except Exception as e:
+            raise CustomException("Failed to update user preference index", sys)
+
     # -------------------- PROCESAMIENTO DE DATOS DE ANIME --------------------
     def process_anime_data(self):
         try:
@@ -205,27 +535,9 @@ class DataProcessor:
                 usecols=cols
             )
 
-            # Reemplaza "Unknown" por NaN
-            df = df.replace("Unknown", np.nan)
-
-            # Función auxiliar para obtener el nombre del anime
-            def getAnimeName(anime_id):
-                try:
-                    name = df[df.anime_id == anime_id].eng_version.values[0]
-                    if name is np.nan:
-                        name = df[df.anime_id == anime_id].Name.values[0]
-                except:
-                    print("Error")
-                return name
-                
-            # Unifica nombres de columnas
-            df["anime_id"] = df["MAL_ID"]
-            df["eng_version"] = df["English name"]
-
-            # Obtiene el nombre correcto del anime
-            df["eng_version"] = df.anime_id.apply(
-                lambda x: getAnimeName(x)
-            )
+            # Reemplaza "Unknown" por NaN, unifica nombres de columnas y
+            # obtiene el nombre correcto del anime (inglés o, si no hay, Name)
+            df = resolve_anime_names(df)
 
             # Ordena por score de MyAnimeList
             df.sort_values(
@@ -252,29 +564,113 @@ class DataProcessor:
         except Exception as e:
             raise CustomException("Failed to process anime data", sys)
     
-    # -------------------- PIPELINE COMPLETO --------------------
-    def run(self):
-        try:
-            self.load_data(usecols=["user_id", "anime_id", "rating"])
-            self.filter_users()
+    # -------------------- PIPELINE DE RATINGS --------------------
+    # Todo lo que depende de animelist.csv (process_anime_data es
+    # independiente y el DAG de entrenamiento lo lanza en paralelo)
+    def process_ratings(self):
+        usecols = ["user_id", "anime_id", "rating"]
+        min_rating = self.config.get("min_rating", 400)
+
+        workers = self.config.get("workers", 1)
+
+        if workers != 1:
+            with self.memory.stage("load_data"):
+                self.load_data_parallel(usecols, min_rating=min_rating, workers=workers or None)
+        elif self.config.get("streaming", False):
+            with self.memory.stage("load_data"):
+                self.load_data_streaming(
+                    usecols,
+                    min_rating=min_rating,
+                    chunk_size=self.config.get("chunk_size", 1000000)
+                )
+        else:
+            with self.memory.stage("load_data"):
+                self.load_data(usecols=usecols)
+            with self.memory.stage("filter_users"):
+                self.filter_users(min_rating=min_rating)
+
+        with self.memory.stage("scale_ratings"):
             self.scale_ratings()
+        with self.memory.stage("encode_data"):
             self.encode_data()
-            self.split_data()
+        with self.memory.stage("split_data"):
+            self.split_data(test_size=self.config.get("test_size", 1000))
+        with self.memory.stage("save_artifacts"):
             self.save_artifacts()
-            self.process_anime_data()
+        with self.memory.stage("save_preference_index"):
+            self.save_preference_index()
+        if self.config.get("incremental_state", False):
+            with self.memory.stage("save_incremental_state"):
+                self.save_incremental_state(min_rating=min_rating)
 
+    # -------------------- PIPELINE COMPLETO --------------------
+    def run(self):
+        try:
+            self.process_ratings()
+            with self.memory.stage("process_anime_data"):
+                self.process_anime_data()
+
+            self.memory.save(PREPROCESSING_MEMORY_REPORT)
             logger.info("Data Processing Pipeline ran successfully")
         except CustomException as e:
             logger.error(str(e))
+        finally:
+            self.memory.stop()
+
+    # -------------------- PIPELINE INCREMENTAL --------------------
+    # Añade un fichero delta (mismas columnas que animelist.csv) a los datos
+    # procesados sin recalcular lo existente. El resultado coincide con una
+    # reconstrucción completa sobre base + delta salvo el orden de los IDs
+    # nuevos en la codificación y el orden de las filas nuevas.
+    def run_incremental(self, delta_file):
+        try:
+            usecols = ["user_id", "anime_id", "rating"]
+
+            with self.memory.stage("load_state"):
+                state = self.load_incremental_state()
+            with self.memory.stage("load_delta"):
+                delta_df = self.load_delta(delta_file, usecols)
+
+            with self.memory.stage("filter_users"):
+                self.apply_delta_filter(delta_df, min_rating=state["min_rating"])
+
+            rescaled = False
+            if len(self.rating_df):
+                state["deltas"] += 1
+                with self.memory.stage("scale_ratings"):
+                    rescaled = self.scale_delta_ratings()
+                with self.memory.stage("append_artifacts"):
+                    self.append_delta(random_state=state["random_state"] + state["deltas"])
+                with self.memory.stage("update_preference_index"):
+                    self.update_preference_index(rebuild=rescaled)
+
+            with open(INCREMENTAL_STATE, "w") as f:
+                state["rating_range"] = list(self.rating_range)
+                json.dump(state, f, indent=2)
+
+            self.memory.save(PREPROCESSING_MEMORY_REPORT)
+            logger.info(f"Incremental Data Processing ran successfully for {delta_file}")
+        except CustomException as e:
+            logger.error(str(e))
+        finally:
+            self.memory.stop()
 
 
 # -------------------- EJECUCIÓN DEL SCRIPT --------------------
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Data processing")
+    parser.add_argument("--delta", default=None,
+                        help="CSV con ratings nuevos para el modo incremental")
+    args = parser.parse_args()
+
     # Se instancia el procesador con rutas de entrada y salida
     data_processor = DataProcessor(
         ANIMELIST_CSV,
         PROCESSED_DIR
     )
 
-    # Se ejecuta todo el pipeline
-    data_processor.run()
+    # Se ejecuta todo el pipeline (o solo el delta)
+    if args.delta:
+        data_processor.run_incremental(args.delta)
+    else:
+        data_processor.run()
@@ -0,0 +1,165 @@
+import io
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from src.logger import get_logger
+from src.data_preprocessing.columnar_dataset import ColumnarDataset
+
+logger = get_logger(__name__)
+
+
+# Preprocesamiento en paralelo por shards de usuario:
+#   1. El CSV se divide en tramos de bytes alineados a líneas; cada proceso
+#      parsea su tramo y reparte las filas en shards por hash(user_id),
+#      guardando cada parte como .npy en un directorio temporal
+#   2. Cada shard (todas las filas de sus usuarios) se cuenta y filtra en
+#      un proceso, sin coordinación con los demás
+#   3. Las filas se reordenan por su posición original en el fichero, así
+#      que el resultado es idéntico al de la versión secuencial para
+#      cualquier nº de procesos o shards
+
+ORDER_BITS = 40     # posición = (tramo << 40) | fila dentro del tramo
+
+
+def split_byte_ranges(path, n_ranges):
+    # Tramos [inicio, fin) del fichero; cada línea pertenece al tramo
+    # que contiene su primer byte (la cabecera se salta en el primero)
+    size = os.path.getsize(path)
+    bounds = np.linspace(0, size, n_ranges + 1).astype(np.int64)
+    return [(int(start), int(stop)) for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start]
+
+
+def _read_range(path, start, stop):
+    with open(path, "rb") as f:
+        if start == 0:
+            f.readline()
+        else:
+            f.seek(start - 1)
+            f.readline()
+        begin = f.tell()
+
+        f.seek(stop - 1)
+        f.readline()
+        end = f.tell()
+
+        if begin >= end:
+            return b""
+        f.seek(begin)
+        return f.read(end - begin)
+
+
+def user_shard(user_ids, n_shards):
+    # Hash multiplicativo (Knuth) para repartir IDs consecutivos
+    hashed = (np.asarray(user_ids, dtype=np.uint64) * np.uint64(2654435761)) & np.uint64(0xFFFFFFFF)
+    return (hashed % np.uint64(n_shards)).astype(np.int64)
+
+
+def _partition_range(task):
+    # Fase 1: parsea un tramo y guarda sus filas repartidas por shard
+    path, range_index, start, stop, names, usecols, dtypes, n_shards, scratch_dir = task
+
+    data = _read_range(path, start, stop)
+    if not data:
+        return range_index, 0
+
+    chunk = pd.read_csv(io.BytesIO(data), header=None, names=names, usecols=usecols, dtype=dtypes)
+    order = (np.int64(range_index) << ORDER_BITS) + np.arange(len(chunk), dtype=np.int64)
+    shards = user_shard(chunk["user_id"].values, n_shards)
+
+    for shard in range(n_shards):
+        mask = shards == shard
+        for column in usecols:
+            np.save(
+                os.path.join(scratch_dir, f"{shard}_{range_index}_{column}.npy"),
+                chunk[column].values[mask]
+            )
+        np.save(os.path.join(scratch_dir, f"{shard}_{range_index}_order.npy"), order[mask])
+
+    return range_index, len(chunk)
+
+
+def _filter_shard(task):
+    # Fase 2: cuenta y filtra los usuarios de un shard
+    shard, range_indices, usecols, min_rating, keep_pending, scratch_dir = task
+
+    columns = {
+        column: np.concatenate([
+            np.load(os.path.join(scratch_dir, f"{shard}_{r}_{column}.npy"))
+            for r in range_indices
+        ])
+        for column in list(usecols) + ["order"]
+    }
+
+    counts = np.bincount(columns["user_id"])
+    keep = counts[columns["user_id"]] >= min_rating
+
+    # Las filas pendientes se quedan en disco (el proceso principal las
+    # añade al almacén de pendientes sin cargarlas todas a la vez)
+    if keep_pending:
+        for column in usecols:
+            np.save(os.path.join(scratch_dir, f"{shard}_pending_{column}.npy"), columns[column][~keep])
+
+    kept = {column: values[keep] for column, values in columns.items()}
+    return shard, kept, counts
+
+
+def _concat_in_order(parts, usecols):
+    # Une los shards y recupera el orden original del fichero
+    order = np.concatenate([part["order"] for part in parts])
+    position = np.argsort(order, kind="stable")
+    return pd.DataFrame({
+        column: np.concatenate([part[column] for part in parts])[position]
+        for column in usecols
+    })
+
+
+def load_sharded(path, usecols, dtypes, min_rating=400, workers=None, n_shards=None,
+                 ranges_per_worker=4, pending_dir=None, scratch_dir=None):
+    # Devuelve (rating_df filtrado, conteos por user_id). Con pending_dir
+    # (ColumnarDataset ya creado) las filas de usuarios que no pasan el
+    # filtro se añaden ahí shard a shard, en el orden del fichero dentro
+    # de cada shard
+    workers = workers or os.cpu_count()
+    n_shards = n_shards or workers
+
+    with open(path) as f:
+        names = f.readline().strip().split(",")
+
+    ranges = split_byte_ranges(path, workers * ranges_per_worker)
+
+    with tempfile.TemporaryDirectory(dir=scratch_dir) as tmp, \
+            ProcessPoolExecutor(max_workers=workers) as pool:
+        rows = dict(pool.map(_partition_range, [
+            (path, i, start, stop, names, usecols, dtypes, n_shards, tmp)
+            for i, (start, stop) in enumerate(ranges)
+        ]))
+        range_indices = [i for i in range(len(ranges)) if rows[i]]
+
+        results = sorted(pool.map(_filter_shard, [
+            (shard, range_indices, usecols, min_rating, pending_dir is not None, tmp)
+            for shard in range(n_shards)
+        ]), key=lambda result: result[0])
+
+        if pending_dir is not None:
+            for shard in range(n_shards):
+                ColumnarDataset.append(pending_dir, {
+                    column: np.load(os.path.join(tmp, f"{shard}_pending_{column}.npy"), mmap_mode="r")
+                    for column in usecols
+                }, checksum=False)
+
+    size = max(len(counts) for _, _, counts in results)
+    user_counts = np.zeros(size, dtype=np.int64)
+    for _, _, counts in results:
+        user_counts[:len(counts)] += counts
+
+    rating_df = _concat_in_order([kept for _, kept, _ in results], usecols)
+
+    logger.info(
+        f"Sharded load: {sum(rows.values())} rows in {len(ranges)} ranges, "
+        f"{n_shards} shards, {workers} workers -> {len(rating_df)} rows kept"
+    )
+    return rating_df, user_counts
@@ -0,0 +1,288 @@
+import json
+import os
+import time
+
+import numpy as np
+
+from src.logger import get_logger
+from src.exception.exception import CustomException
+
+logger = get_logger(__name__)
+
+
+# Índice aproximado (ANN) para las matrices de embeddings L2-normalizadas:
+#   - IVF: k-means esférico como cuantizador grueso; cada fila va a la
+#     lista de su centroide más cercano y una consulta solo recorre las
+#     n_probe listas más prometedoras
+#   - PQ (opcional): el residuo (fila - centroide) se comprime en
+#     pq_subvectors códigos uint8; el producto punto se aproxima con una
+#     tabla de lookup por consulta
+#   - La búsqueda exacta (fuerza bruta) sigue en SimilarityEngine
+class IVFIndex:
+    def __init__(self, n_lists=256, n_probe=16, pq_subvectors=0,
+                 kmeans_iters=20, train_size=100000, seed=42):
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.pq_subvectors = pq_subvectors
+        self.kmeans_iters = kmeans_iters
+        self.train_size = train_size
+        self.seed = seed
+
+        self.centroids = None       # (n_lists, d)
+        self.list_offsets = None    # (n_lists + 1,) tramos CSR en list_ids
+        self.list_ids = None        # filas ordenadas por lista
+        self.vectors = None         # filas en orden de list_ids (sin PQ)
+        self.codebooks = None       # (m, 256, d / m) con PQ
+        self.codes = None           # (N, m) uint8 en orden de list_ids
+
+    # -------------------- K-MEANS --------------------
+    @staticmethod
+    def _assign(X, centroids, spherical, block_size=65536):
+        labels = np.empty(len(X), dtype=np.int64)
+        norms = None if spherical else (centroids ** 2).sum(axis=1)
+        for start in range(0, len(X), block_size):
+            scores = X[start:start + block_size] @ centroids.T
+            if spherical:
+                labels[start:start + block_size] = scores.argmax(axis=1)
+            else:
+                labels[start:start + block_size] = (norms - 2 * scores).argmin(axis=1)
+        return labels
+
+    @classmethod
+    def _kmeans(cls, X, n_clusters, n_iter, rng, spherical):
+        n_clusters = min(n_clusters, len(X))
+        centroids = X[rng.choice(len(X), n_clusters, replace=False)].copy()
+
+        for _ in range(n_iter):
+            labels = cls._assign(X, centroids, spherical)
+
+            # Suma por cluster con ordenación + reduceat (sin bucles de Python)
+            order = np.argsort(labels, kind="stable")
+            counts = np.bincount(labels, minlength=n_clusters)
+            non_empty = counts > 0
+            starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[non_empty]
+            sums = np.add.reduceat(X[order], starts, axis=0)
+
+            if spherical:
+                norms = np.linalg.norm(sums, axis=1, keepdims=True)
+                centroids[non_empty] = sums / np.maximum(norms, 1e-12)
+            else:
+                centroids[non_empty] = sums / counts[non_empty, None]
+
+            # Clusters vacíos: se reinician con filas aleatorias
+            empty = np.flatnonzero(~non_empty)
+            if len(empty):
+                centroids[empty] = X[rng.choice(len(X), len(empty), replace=False)]
+
+        return centroids.astype(np.float32)
+
+    # -------------------- CONSTRUCCIÓN --------------------
+    def fit(self, weights):
+        try:
+            weights = np.asarray(weights, dtype=np.float32)
+            rng = np.random.default_rng(self.seed)
+
+            sample = weights
+            if len(weights) > self.train_size:
+                sample = weights[rng.choice(len(weights), self.train_size, replace=False)]
+
+            # Cuantizador grueso
+            self.centroids = self._kmeans(
+                sample, self.n_lists, self.kmeans_iters, rng, spherical=True
+            )
+            self.n_lists = len(self.centroids)
+            labels = self._assign(weights, self.centroids, spherical=True)
+
+            # Listas invertidas en formato CSR
+            self.list_ids = np.argsort(labels, kind="stable").astype(np.int64)
+            counts = np.bincount(labels, minlength=self.n_lists)
+            self.list_offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+            if self.pq_subvectors:
+                self._fit_pq(weights, labels, rng)
+            else:
+                self.vectors = weights[self.list_ids]
+
+            logger.info(
+                f"IVF index built: {len(weights)} rows, {self.n_lists} lists, "
+                f"pq_subvectors={self.pq_subvectors}"
+            )
+            return self
+        except Exception as e:
+            raise CustomException("Error while building ANN index", e)
+
+    def _fit_pq(self, weights, labels, rng):
+        dim = weights.shape[1]
+        if dim % self.pq_subvectors:
+            raise ValueError(
+                f"Embedding size {dim} is not divisible by pq_subvectors={self.pq_subvectors}"
+            )
+
+        residuals = weights - self.centroids[labels]
+        sample = residuals
+        if len(residuals) > self.train_size:
+            sample = residuals[rng.choice(len(residuals), self.train_size, replace=False)]
+
+        sub_dim = dim // self.pq_subvectors
+        n_codes = min(256, len(sample))
+        self.codebooks = np.empty((self.pq_subvectors, n_codes, sub_dim), dtype=np.float32)
+        self.codes = np.empty((len(weights), self.pq_subvectors), dtype=np.uint8)
+
+        ordered = residuals[self.list_ids]
+        for m in range(self.pq_subvectors):
+            columns = slice(m * sub_dim, (m + 1) * sub_dim)
+            codebook = self._kmeans(
+                sample[:, columns], n_codes, self.kmeans_iters, rng, spherical=False
+            )
+            self.codebooks[m] = codebook
+            self.codes[:, m] = self._assign(ordered[:, columns], codebook, spherical=False)
+
+    # -------------------- BÚSQUEDA --------------------
+    def _probe_lists(self, vectors, n_probe):
+        n_probe = min(n_probe, self.n_lists)
+        coarse = vectors @ self.centroids.T
+        if n_probe < self.n_lists:
+            return np.argpartition(-coarse, n_probe - 1, axis=1)[:, :n_probe], coarse
+        return np.broadcast_to(np.arange(self.n_lists), coarse.shape), coarse
+
+    def _candidate_scores(self, vector, lists, coarse):
+        starts = self.list_offsets[lists]
+        counts = self.list_offsets[lists + 1] - starts
+        flat = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        flat += np.repeat(starts, counts)
+
+        if self.codes is None:
+            return flat, self.vectors[flat] @ vector
+
+        # q·x ≈ q·centroide + Σ_m LUT[m, código_m]
+        sub_dim = self.codebooks.shape[2]
+        lut = np.einsum(
+            "mkd,md->mk", self.codebooks, vector.reshape(self.pq_subvectors, sub_dim)
+        )
+        residual = lut[np.arange(self.pq_subvectors), self.codes[flat]].sum(axis=1)
+        return flat, np.repeat(coarse[lists], counts) + residual
+
+    def search(self, vectors, k=10, n_probe=None, exclude=None,
+               rerank_weights=None, rerank_candidates=100):
+        # Devuelve (indices, scores), ambos (B, k), de más a menos similar.
+        # Con rerank_weights (matriz original) los rerank_candidates mejores
+        # candidatos PQ se re-puntúan con el producto punto exacto.
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        n_probe = n_probe or self.n_probe
+        lists, coarse = self._probe_lists(vectors, n_probe)
+
+        indices = np.full((len(vectors), k), -1, dtype=np.int64)
+        scores = np.full((len(vectors), k), -np.inf, dtype=np.float32)
+
+        for i, vector in enumerate(vectors):
+            flat, candidate_scores = self._candidate_scores(vector, lists[i], coarse[i])
+            candidates = self.list_ids[flat]
+
+            if exclude is not None and len(exclude[i]):
+                keep = ~np.isin(candidates, exclude[i])
+                candidates, candidate_scores = candidates[keep], candidate_scores[keep]
+
+            if rerank_weights is not None and self.codes is not None:
+                shortlist = min(max(rerank_candidates, k), len(candidates))
+                if shortlist < len(candidates):
+                    best = np.argpartition(-candidate_scores, shortlist - 1)[:shortlist]
+                    candidates = candidates[best]
+                candidate_scores = rerank_weights[candidates] @ vector
+
+            top = min(k, len(candidates))
+            if top == 0:
+                continue
+            best = np.argpartition(-candidate_scores, top - 1)[:top]
+            best = best[np.argsort(-candidate_scores[best], kind="stable")]
+            indices[i, :top] = candidates[best]
+            scores[i, :top] = candidate_scores[best]
+
+        return indices, scores
+
+    # -------------------- PERSISTENCIA --------------------
+    ARRAYS = ("centroids", "list_offsets", "list_ids", "vectors", "codebooks", "codes")
+    PARAMS = ("n_lists", "n_probe", "pq_subvectors", "kmeans_iters", "train_size", "seed")
+
+    def save(self, output_dir):
+        try:
+            os.makedirs(output_dir, exist_ok=True)
+            for name in self.ARRAYS:
+                array = getattr(self, name)
+                if array is not None:
+                    np.save(os.path.join(output_dir, f"{name}.npy"), array)
+
+            with open(os.path.join(output_dir, "index.json"), "w") as f:
+                json.dump({name: getattr(self, name) for name in self.PARAMS}, f, indent=2)
+
+            logger.info(f"ANN index saved to {output_dir}")
+        except Exception as e:
+            raise CustomException("Error while saving ANN index", e)
+
+    @classmethod
+    def load(cls, input_dir, mmap_mode="r"):
+        try:
+            with open(os.path.join(input_dir, "index.json")) as f:
+                index = cls(**json.load(f))
+
+            for name in cls.ARRAYS:
+                path = os.path.join(input_dir, f"{name}.npy")
+                if os.path.exists(path):
+                    setattr(index, name, np.load(path, mmap_mode=mmap_mode))
+
+            logger.info(f"ANN index loaded from {input_dir}")
+            return index
+        except Exception as e:
+            raise CustomException("Error while loading ANN index", e)
+
+    @staticmethod
+    def exists(input_dir):
+        return os.path.exists(os.path.join(input_dir, "index.json"))
+
+
+# Compara el índice con la búsqueda exacta: recall@k y latencia por
+# consulta para varios valores de n_probe
+def recall_latency_report(weights, index, n_queries=1000, k=10, n_probes=(1, 4, 16, 64),
+                          rerank=True, seed=0):
+    weights = np.asarray(weights, dtype=np.float32)
+    rng = np.random.default_rng(seed)
+    queries = rng.choice(len(weights), min(n_queries, len(weights)), replace=False)
+    vectors = weights[queries]
+    exclude = queries[:, None]
+
+    # Referencia exacta (excluyendo la propia consulta)
+    start = time.perf_counter()
+    exact_scores = vectors @ weights.T
+    exact_scores[np.arange(len(queries)), queries] = -np.inf
+    exact = np.argpartition(-exact_scores, k - 1, axis=1)[:, :k]
+    exact_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    report = {
+        "rows": int(len(weights)),
+        "queries": int(len(queries)),
+        "k": k,
+        "n_lists": int(index.n_lists),
+        "pq_subvectors": int(index.pq_subvectors),
+        "rerank": bool(rerank and index.codes is not None),
+        "exact_ms_per_query": exact_ms,
+        "runs": [],
+    }
+
+    for n_probe in n_probes:
+        start = time.perf_counter()
+        approx, _ = index.search(
+            vectors, k=k, n_probe=n_probe, exclude=exclude,
+            rerank_weights=weights if rerank else None
+        )
+        latency_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+        hits = sum(
+            len(np.intersect1d(approx[i], exact[i])) for i in range(len(queries))
+        )
+        report["runs"].append({
+            "n_probe": int(n_probe),
+            "recall_at_k": hits / float(len(queries) * k),
+            "ms_per_query": latency_ms,
+        })
+        logger.info(f"ANN n_probe={n_probe}: recall@{k}={report['runs'][-1]['recall_at_k']:.3f}")
+
+    return report
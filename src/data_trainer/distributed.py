@@ -0,0 +1,230 @@
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from src.logger import get_logger
+from src.exception.exception import CustomException
+from src.config.paths_config import *
+from src.utils.common_funtions import read_yaml
+
+logger = get_logger(__name__)
+
+
+# Entrenamiento data-parallel en un solo host con varios procesos:
+#   - launch_local_workers arranca N procesos con TF_CONFIG apuntando a
+#     localhost y MultiWorkerMirroredStrategy sincroniza los gradientes
+#   - cada worker lee solo su shard (tramo contiguo del memory-map de train,
+#     todos del mismo tamaño para que den los mismos pasos por época)
+#   - el batch global es el de config (cada worker aporta batch / N filas
+#     por paso), así que lrfn y el nº de pasos por época no cambian
+#   - solo el chief escribe el checkpoint y el modelo final
+# TensorFlow se importa dentro del worker: la estrategia tiene que crearse
+# antes que cualquier otra operación.
+
+def _free_ports(n):
+    sockets = [socket.socket() for _ in range(n)]
+    try:
+        for s in sockets:
+            s.bind(("localhost", 0))
+        return [s.getsockname()[1] for s in sockets]
+    finally:
+        for s in sockets:
+            s.close()
+
+
+def shard_range(start, stop, n_workers, index):
+    # Tramo [inicio, fin) del worker; todos con el mismo nº de filas
+    rows = (stop - start) // n_workers
+    return start + index * rows, start + (index + 1) * rows
+
+
+def launch_local_workers(n_workers, epochs=None, steps_per_epoch=None, threads_per_worker=0,
+                         save_model=True, timeout=None):
+    # Devuelve el informe de cada worker (lista ordenada por índice)
+    try:
+        ports = _free_ports(n_workers)
+        cluster = {"worker": [f"localhost:{port}" for port in ports]}
+        threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // n_workers)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            processes = []
+            for index in range(n_workers):
+                env = dict(os.environ)
+                env["TF_CONFIG"] = json.dumps({"cluster": cluster, "task": {"type": "worker", "index": index}})
+                command = [
+                    sys.executable, "-m", "src.data_trainer.distributed",
+                    "--threads", str(threads_per_worker),
+                    "--report", os.path.join(tmp, f"worker_{index}.json"),
+                ]
+                if epochs:
+                    command += ["--epochs", str(epochs)]
+                if steps_per_epoch:
+                    command += ["--steps-per-epoch", str(steps_per_epoch)]
+                if not save_model:
+                    command += ["--no-save"]
+                processes.append(subprocess.Popen(command, cwd=ROOT_DIR, env=env))
+
+            # Si un worker falla los demás se quedarían esperando en el
+            # all-reduce: se terminan todos
+            start = time.perf_counter()
+            while any(process.poll() is None for process in processes):
+                failed = any(process.poll() not in (None, 0) for process in processes)
+                timed_out = timeout is not None and time.perf_counter() - start > timeout
+                if failed or timed_out:
+                    for process in processes:
+                        if process.poll() is None:
+                            process.terminate()
+                    for process in processes:
+                        process.wait()
+                    break
+                time.sleep(0.5)
+
+            codes = [process.returncode for process in processes]
+            if any(codes):
+                raise RuntimeError(f"Distributed workers failed with exit codes {codes}")
+
+            reports = []
+            for index in range(n_workers):
+                with open(os.path.join(tmp, f"worker_{index}.json")) as f:
+                    reports.append(json.load(f))
+
+        logger.info(f"Distributed training with {n_workers} workers finished in {time.perf_counter() - start:.1f}s")
+        return reports
+    except Exception as e:
+        raise CustomException("Error during distributed training", e)
+
+
+# =========================
+# WORKER
+# =========================
+
+def run_worker(args):
+    import tensorflow as tf
+
+    tf.config.threading.set_intra_op_parallelism_threads(args.threads)
+    strategy = tf.distribute.MultiWorkerMirroredStrategy()
+
+    from tensorflow.keras.callbacks import ModelCheckpoint, LearningRateScheduler, EarlyStopping
+
+    from src.base_model.base_model import BaseModel
+    from src.data_trainer.input_pipeline import RatingsInput
+    from src.data_trainer.model_training import ModelTraining, lrfn
+    from src.data_preprocessing.columnar_dataset import ColumnarDataset
+    from src.data_preprocessing.id_encoding import IdEncoding
+
+    task = json.loads(os.environ["TF_CONFIG"])["task"]
+    n_workers = strategy.cluster_resolver.cluster_spec().num_tasks("worker")
+    index = task["index"]
+    is_chief = index == 0
+
+    config = read_yaml(CONFIG_PATH)
+    training_config = config.get("training", {})
+    batch_size = training_config.get("batch_size", 10000)
+    epochs = args.epochs or training_config.get("epochs", 20)
+
+    dataset = ColumnarDataset.open(RATINGS_DATASET_DIR, columns=["user", "anime", "rating"])
+    train = dataset.split("train")
+    start, stop = shard_range(train.start, train.stop, n_workers, index)
+    shard = slice(start, stop)
+
+    # Cada worker ya tiene su shard: sin auto-sharding de tf.data
+    options = tf.data.Options()
+    options.experimental_distribute.auto_shard_policy = tf.data.experimental.AutoShardPolicy.OFF
+
+    train_data = RatingsInput(
+        dataset["user"][shard], dataset["anime"][shard], dataset["rating"][shard],
+        batch_size=batch_size,
+        shuffle_buffer=training_config.get("shuffle_buffer", 262144),
+        block_size=training_config.get("block_size", 65536),
+        seed=training_config.get("seed")
+    ).dataset(shuffle=True).repeat().with_options(options)
+    validation_data = RatingsInput(
+        dataset.column("user", "test"), dataset.column("anime", "test"),
+        dataset.column("rating", "test"), batch_size=batch_size
+    ).dataset(shuffle=False).with_options(options)
+
+    # Cada paso consume batch / N filas del shard de cada worker
+    steps_per_epoch = args.steps_per_epoch or max(1, (stop - start) * n_workers // batch_size)
+
+    with strategy.scope():
+        model = BaseModel(config_path=CONFIG_PATH).RecommenderNet(
+            n_users=len(IdEncoding.load(USER_IDS, USER_ID_LOOKUP)),
+            n_anime=len(IdEncoding.load(ANIME_IDS, ANIME_ID_LOOKUP))
+        )
+
+    # Los workers que no son chief escriben su checkpoint en un directorio
+    # temporal que se borra al terminar el entrenamiento
+    scratch_dir = None if is_chief else tempfile.TemporaryDirectory()
+    checkpoint_path = CHECKPOINT_FILE_PATH if is_chief else os.path.join(
+        scratch_dir.name, os.path.basename(CHECKPOINT_FILE_PATH)
+    )
+    os.makedirs(os.path.dirname(checkpoint_path), exist_ok=True)
+
+    epoch_times = []
+
+    class EpochTimer(tf.keras.callbacks.Callback):
+        def on_epoch_begin(self, epoch, logs=None):
+            self.start = time.perf_counter()
+
+        def on_epoch_end(self, epoch, logs=None):
+            epoch_times.append(time.perf_counter() - self.start)
+
+    callbacks = [
+        ModelCheckpoint(
+            filepath=checkpoint_path,
+            save_weights_only=True,
+            monitor="val_loss",
+            mode="min",
+            save_best_only=True
+        ),
+        LearningRateScheduler(lambda epoch: lrfn(epoch), verbose=0),
+        EarlyStopping(patience=3, monitor="val_loss", mode="min", restore_best_weights=True),
+        EpochTimer(),
+    ]
+
+    try:
+        history = model.fit(
+            train_data,
+            epochs=epochs,
+            steps_per_epoch=steps_per_epoch,
+            validation_data=validation_data,
+            callbacks=callbacks,
+            verbose=1 if is_chief else 0
+        )
+    finally:
+        if scratch_dir is not None:
+            scratch_dir.cleanup()
+
+    if is_chief and args.save:
+        model.load_weights(CHECKPOINT_FILE_PATH)
+        ModelTraining(PROCESSED_DIR).save_model(model)
+
+    report = {
+        "worker": index,
+        "workers": n_workers,
+        "shard_rows": stop - start,
+        "steps_per_epoch": steps_per_epoch,
+        "global_batch_size": batch_size,
+        "epoch_seconds": epoch_times,
+        "samples_per_second": float(np.mean([steps_per_epoch * batch_size / t for t in epoch_times])),
+        "val_loss": [float(value) for value in history.history.get("val_loss", [])],
+    }
+    with open(args.report, "w") as f:
+        json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distributed training worker (lanzado por launch_local_workers)")
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--epochs", type=int, default=None)
+    parser.add_argument("--steps-per-epoch", type=int, default=None)
+    parser.add_argument("--report", required=True)
+    parser.add_argument("--no-save", dest="save", action="store_false")
+    run_worker(parser.parse_args())
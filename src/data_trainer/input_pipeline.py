@@ -0,0 +1,161 @@
+import json
+import os
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from src.logger import get_logger
+from src.exception.exception import CustomException
+
+logger = get_logger(__name__)
+
+
+# Entrada de entrenamiento con tf.data sobre los arrays procesados
+# (memory-maps del ColumnarDataset o arrays en memoria):
+#   1. Se leen bloques contiguos de filas (en paralelo, orden de bloques
+#      barajado en cada época) y se permutan dentro del bloque
+#   2. Las filas pasan por un buffer de barajado acotado y se agrupan en
+#      batches en paralelo
+#   3. prefetch solapa la lectura con el paso de entrenamiento
+# En memoria solo hay unos pocos bloques + el buffer, sea cual sea el
+# tamaño del dataset.
+class RatingsInput:
+    def __init__(self, users, anime, ratings, batch_size=10000, shuffle_buffer=262144,
+                 block_size=65536, seed=None):
+        if not len(users) == len(anime) == len(ratings):
+            raise ValueError("users, anime and ratings must have the same length")
+
+        self.users = users
+        self.anime = anime
+        self.ratings = ratings
+        self.batch_size = batch_size
+        self.shuffle_buffer = shuffle_buffer
+        self.block_size = block_size
+        self.seed = seed
+
+    def __len__(self):
+        # Nº de batches por época
+        return -(-len(self.users) // self.batch_size)
+
+    def _read_block(self, start, block_size, shuffle):
+        start = int(start)
+        stop = min(start + block_size, len(self.users))
+
+        users = np.asarray(self.users[start:stop], dtype=np.int32)
+        anime = np.asarray(self.anime[start:stop], dtype=np.int32)
+        ratings = np.asarray(self.ratings[start:stop], dtype=np.float32)
+
+        if shuffle:
+            order = np.random.default_rng(None if self.seed is None else (self.seed, start)).permutation(stop - start)
+            users, anime, ratings = users[order], anime[order], ratings[order]
+
+        return users.reshape(-1, 1), anime.reshape(-1, 1), ratings
+
+    def dataset(self, shuffle=True):
+        try:
+            # Sin buffer de barajado cada bloque es ya un batch
+            per_row = shuffle and self.shuffle_buffer > 0
+            block_size = self.block_size if per_row else self.batch_size
+
+            def read(start):
+                users, anime, ratings = tf.numpy_function(
+                    lambda s: self._read_block(s, block_size, shuffle),
+                    [start],
+                    [tf.int32, tf.int32, tf.float32]
+                )
+                users.set_shape([None, 1])
+                anime.set_shape([None, 1])
+                ratings.set_shape([None])
+                return users, anime, ratings
+
+            starts = tf.data.Dataset.range(0, len(self.users), block_size)
+            if shuffle:
+                starts = starts.shuffle(
+                    -(-len(self.users) // block_size), seed=self.seed, reshuffle_each_iteration=True
+                )
+
+            dataset = starts.map(read, num_parallel_calls=tf.data.AUTOTUNE, deterministic=not shuffle)
+
+            if per_row:
+                dataset = (
+                    dataset
+                    .unbatch()
+                    .shuffle(self.shuffle_buffer, seed=self.seed, reshuffle_each_iteration=True)
+                    .batch(self.batch_size, num_parallel_calls=tf.data.AUTOTUNE, deterministic=False)
+                )
+
+            return (
+                dataset
+                .map(lambda users, anime, ratings: ({"user": users, "anime": anime}, ratings))
+                .prefetch(tf.data.AUTOTUNE)
+            )
+        except Exception as e:
+            raise CustomException("Error while building tf.data input pipeline", e)
+
+
+# =========================
+# PERFIL DE LA ENTRADA
+# =========================
+# Bucle manual sobre un modelo desechable: el tiempo esperando el
+# siguiente batch (stall) frente al tiempo del paso de entrenamiento.
+# Si la espera es una parte apreciable del total, el entrenamiento está
+# limitado por la entrada (E/S / parseo) y no por el cómputo.
+
+def profile_input_pipeline(build_model, dataset, steps=50, warmup=5, stall_threshold=0.1):
+    try:
+        model = build_model()
+        iterator = iter(dataset.repeat())
+
+        stalls, step_times = [], []
+        for step in range(warmup + steps):
+            start = time.perf_counter()
+            x, y = next(iterator)
+            fetched = time.perf_counter()
+            model.train_on_batch(x, y)
+            done = time.perf_counter()
+
+            if step >= warmup:
+                stalls.append(fetched - start)
+                step_times.append(done - fetched)
+
+        # La misma entrada sin entrenar: techo de batches/s del pipeline
+        iterator = iter(dataset.repeat())
+        start = time.perf_counter()
+        for _ in range(steps):
+            next(iterator)
+        input_only = time.perf_counter() - start
+
+        stalls, step_times = np.array(stalls), np.array(step_times)
+        stall_fraction = float(stalls.sum() / (stalls.sum() + step_times.sum()))
+
+        report = {
+            "steps": steps,
+            "stall_seconds": {
+                "mean": float(stalls.mean()),
+                "p50": float(np.percentile(stalls, 50)),
+                "p95": float(np.percentile(stalls, 95)),
+            },
+            "step_seconds": {
+                "mean": float(step_times.mean()),
+                "p50": float(np.percentile(step_times, 50)),
+                "p95": float(np.percentile(step_times, 95)),
+            },
+            "stall_fraction": stall_fraction,
+            "input_only_batches_per_second": steps / input_only,
+            "bound": "input" if stall_fraction > stall_threshold else "compute",
+        }
+
+        logger.info(
+            f"Input pipeline: {stall_fraction:.1%} of step time waiting for data "
+            f"({report['bound']}-bound)"
+        )
+        return report
+    except Exception as e:
+        raise CustomException("Error while profiling input pipeline", e)
+
+
+def save_report(report, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
@@ -1,4 +1,6 @@
+import hashlib
 import joblib
+import json
 import numpy as np
 import os
 from tensorflow.keras.callbacks import (
@@ -6,21 +8,71 @@ from tensorflow.keras.callbacks import (
     LearningRateScheduler,
     EarlyStopping
 )
+from tensorflow.keras.models import load_model
 
 from src.logger import get_logger
 from src.exception.exception import CustomException
 from src.base_model.base_model import BaseModel
+from src.data_trainer.ann_index import IVFIndex
+from src.data_trainer.neighbour_table import NeighbourTable
+from src.data_trainer.input_pipeline import RatingsInput, profile_input_pipeline, save_report
+from src.data_trainer.matrix_factorization import ALSFactorization
+from src.data_trainer.quantization import QuantizedMatrix, topk_overlap_report, file_fingerprint
+from src.data_trainer.distributed import launch_local_workers
+from src.data_preprocessing.id_encoding import IdEncoding, load_id_encoding
+from src.data_preprocessing.columnar_dataset import ColumnarDataset
 from src.config.paths_config import *
+from src.utils.common_funtions import read_yaml
 
 logger = get_logger(__name__)
 
+
+# Learning rate schedule (FIXED)
+def lrfn(epoch, start_lr=1e-5, max_lr=5e-5, min_lr=1e-6,
+         rampup_epochs=5, sustain_epochs=0, exp_decay=0.8):
+    if epoch < rampup_epochs:
+        return (max_lr - start_lr) / rampup_epochs * epoch + start_lr
+    elif epoch < rampup_epochs + sustain_epochs:
+        return max_lr
+    else:
+        return (max_lr - min_lr) * exp_decay ** (
+            epoch - rampup_epochs - sustain_epochs
+        ) + min_lr
+
+
+def _ids_digest(ids, rows):
+    # Huella de los primeros `rows` IDs de una codificación
+    return hashlib.sha256(np.asarray(ids[:rows], dtype=np.int64).tobytes()).hexdigest()
+
+
 class ModelTraining:
     def __init__(self, data_path):
         self.data_path = data_path
+        self.config = read_yaml(CONFIG_PATH)
+        # keras (RecommenderNet) | als (factorización matricial en NumPy)
+        self.trainer = self.config["model"].get("trainer", "keras")
         logger.info("ModelTraining initialized (NO comet_ml)")
 
+    @property
+    def model_path(self):
+        return ALS_MODEL_PATH if self.trainer == "als" else MODEL_PATH
+
     def load_data(self):
         try:
+            # Formato columnar: slices de memory-maps, sin deserializar
+            if ColumnarDataset.exists(RATINGS_DATASET_DIR):
+                dataset = ColumnarDataset.open(
+                    RATINGS_DATASET_DIR, columns=["user", "anime", "rating"]
+                )
+                X_train_array = [dataset.column("user", "train"), dataset.column("anime", "train")]
+                X_test_array = [dataset.column("user", "test"), dataset.column("anime", "test")]
+                y_train = dataset.column("rating", "train")
+                y_test = dataset.column("rating", "test")
+
+                logger.info("Data loaded successfully for training (columnar)")
+                return X_train_array, X_test_array, y_train, y_test
+
+            # Artefactos antiguos en pickle
             X_train_array = joblib.load(X_TRAIN_ARRAY)
             X_test_array = joblib.load(X_TEST_ARRAY)
             y_train = joblib.load(Y_TRAIN)
@@ -32,11 +84,27 @@ class ModelTraining:
             raise CustomException("Failed to load training data", e)
 
     def train_model(self):
+        model = self.fit_model()
+        self.save_model_weights(model)
+
+    def fit_model(self):
+        if self.trainer == "als":
+            return self.fit_als()
+
+        if self.config.get("training", {}).get("warm_start", {}).get("enabled", False):
+            state = self.warm_start_state()
+            if state is not None:
+                return self.fine_tune_model(state)
+
+        distributed = self.config.get("training", {}).get("distributed", {})
+        if distributed.get("workers", 0) > 1:
+            return self.fit_distributed(distributed)
+
         try:
             X_train_array, X_test_array, y_train, y_test = self.load_data()
 
-            n_users = len(joblib.load(USER2USER_ENCODED))
-            n_anime = len(joblib.load(ANIME2ANIME_ENCODED))
+            n_users = len(load_id_encoding(USER_IDS, USER_ID_LOOKUP, USER2USER_ENCODED))
+            n_anime = len(load_id_encoding(ANIME_IDS, ANIME_ID_LOOKUP, ANIME2ANIME_ENCODED))
 
             base_model = BaseModel(config_path=CONFIG_PATH)
             model = base_model.RecommenderNet(
@@ -44,26 +112,12 @@ class ModelTraining:
                 n_anime=n_anime
             )
 
-            # Learning rate schedule (FIXED)
-            start_lr = 1e-5
-            max_lr = 5e-5
-            min_lr = 1e-6
-
-            rampup_epochs = 5
-            sustain_epochs = 0
-            exp_decay = 0.8
+            training_config = self.config.get("training", {})
+            batch_size = training_config.get("batch_size", 10000)
+            epochs = training_config.get("epochs", 20)
 
-            def lrfn(epoch):
-                if epoch < rampup_epochs:
-                    return (max_lr - start_lr) / rampup_epochs * epoch + start_lr
-                elif epoch < rampup_epochs + sustain_epochs:
-                    return max_lr
-                else:
-                    return (max_lr - min_lr) * exp_decay ** (
-                        epoch - rampup_epochs - sustain_epochs
-                    ) + min_lr
-
-            lr_callback = LearningRateScheduler(lrfn, verbose=0)
+            # Con un solo argumento, LearningRateScheduler no le pasa el lr actual
+            lr_callback = LearningRateScheduler(lambda epoch: lrfn(epoch), verbose=0)
 
             checkpoint_cb = ModelCheckpoint(
                 filepath=CHECKPOINT_FILE_PATH,
@@ -86,39 +140,273 @@ class ModelTraining:
             os.makedirs(MODEL_DIR, exist_ok=True)
             os.makedirs(WEIGHTS_DIR, exist_ok=True)
 
-            history = model.fit(
-                x=X_train_array,
-                y=y_train,
-                batch_size=10000,
-                epochs=20,
-                validation_data=(X_test_array, y_test),
-                callbacks=callbacks,
+            if training_config.get("streaming", True):
+                # tf.data sobre los arrays (memory-maps): la memoria no crece con el dataset
+                train_input = RatingsInput(
+                    X_train_array[0], X_train_array[1], y_train,
+                    batch_size=batch_size,
+                    shuffle_buffer=training_config.get("shuffle_buffer", 262144),
+                    block_size=training_config.get("block_size", 65536),
+                    seed=training_config.get("seed")
+                )
+                train_data = train_input.dataset(shuffle=True)
+                validation_data = RatingsInput(
+                    X_test_array[0], X_test_array[1], y_test, batch_size=batch_size
+                ).dataset(shuffle=False)
+
+                profile_steps = training_config.get("profile_steps", 0)
+                if profile_steps:
+                    report = profile_input_pipeline(
+                        lambda: base_model.RecommenderNet(n_users=n_users, n_anime=n_anime),
+                        train_data,
+                        steps=min(profile_steps, len(train_input))
+                    )
+                    save_report(report, TRAINING_INPUT_REPORT)
+
+                history = model.fit(
+                    train_data,
+                    epochs=epochs,
+                    validation_data=validation_data,
+                    callbacks=callbacks,
+                    verbose=1
+                )
+            else:
+                history = model.fit(
+                    x=X_train_array,
+                    y=y_train,
+                    batch_size=batch_size,
+                    epochs=epochs,
+                    validation_data=(X_test_array, y_test),
+                    callbacks=callbacks,
+                    verbose=1
+                )
+
+            model.load_weights(CHECKPOINT_FILE_PATH)
+            logger.info("Model training completed successfully")
+            return model
+
+        except Exception as e:
+            logger.error(str(e))
+            raise CustomException("Error during model training process", e)
+
+    def fit_distributed(self, distributed):
+        # Varios procesos locales con MultiWorkerMirroredStrategy; el chief
+        # guarda el modelo en MODEL_PATH y aquí se vuelve a cargar
+        try:
+            reports = launch_local_workers(
+                distributed["workers"],
+                threads_per_worker=distributed.get("threads_per_worker", 0)
+            )
+
+            os.makedirs(REPORTS_DIR, exist_ok=True)
+            with open(DISTRIBUTED_TRAINING_REPORT, "w") as f:
+                json.dump(reports, f, indent=2)
+
+            logger.info("Distributed model training completed successfully")
+            return load_model(MODEL_PATH)
+
+        except Exception as e:
+            logger.error(str(e))
+            raise CustomException("Error during distributed model training", e)
+
+    # -------------------- WARM START --------------------
+    # Parte del último modelo guardado: las tablas de embeddings crecen con
+    # las filas de los IDs añadidos desde entonces (las existentes no se
+    # mueven) y se ajusta unas pocas épocas solo con los datos recientes.
+    # Requiere que las codificaciones sean una extensión de las usadas en
+    # el último entrenamiento (preprocesamiento incremental con --delta).
+    def warm_start_state(self):
+        # Estado del último entrenamiento si se puede continuar, si no None
+        if not (os.path.exists(TRAINING_STATE_PATH) and os.path.exists(MODEL_PATH)
+                and ColumnarDataset.exists(RATINGS_DATASET_DIR)):
+            logger.info("No previous model to warm start from, training from scratch")
+            return None
+
+        with open(TRAINING_STATE_PATH) as f:
+            state = json.load(f)
+
+        if state.get("embedding_size") != self.config["model"]["embedding_size"]:
+            logger.warning("Embedding size changed since the last training, training from scratch")
+            return None
+
+        encodings = {
+            "users": IdEncoding.load(USER_IDS, USER_ID_LOOKUP),
+            "anime": IdEncoding.load(ANIME_IDS, ANIME_ID_LOOKUP),
+        }
+        for name, encoding in encodings.items():
+            rows = state[name]["rows"]
+            if len(encoding) < rows or _ids_digest(encoding.ids, rows) != state[name]["sha256"]:
+                logger.warning(f"{name} id encoding was rebuilt since the last training, training from scratch")
+                return None
+
+        return state
+
+    def grow_model(self, previous, n_users, n_anime):
+        # Mismo modelo con más filas en las tablas de embeddings; el resto de
+        # capas copia los pesos del modelo anterior
+        model = BaseModel(config_path=CONFIG_PATH).RecommenderNet(n_users=n_users, n_anime=n_anime)
+
+        for layer, previous_layer in zip(model.layers, previous.layers):
+            weights = previous_layer.get_weights()
+            if layer.name in ("user_embedding", "anime_embedding"):
+                grown = layer.get_weights()[0]
+                grown[:len(weights[0])] = weights[0]
+                weights = [grown]
+            layer.set_weights(weights)
+
+        logger.info(
+            f"Embeddings grown: users {previous.get_layer('user_embedding').input_dim} -> {n_users}, "
+            f"anime {previous.get_layer('anime_embedding').input_dim} -> {n_anime}"
+        )
+        return model
+
+    def fine_tune_model(self, state):
+        try:
+            training_config = self.config.get("training", {})
+            warm_start = training_config.get("warm_start", {})
+            batch_size = training_config.get("batch_size", 10000)
+
+            n_users = len(IdEncoding.load(USER_IDS, USER_ID_LOOKUP))
+            n_anime = len(IdEncoding.load(ANIME_IDS, ANIME_ID_LOOKUP))
+            model = self.grow_model(load_model(MODEL_PATH), n_users, n_anime)
+            model.optimizer.learning_rate.assign(warm_start.get("learning_rate", 1e-5))
+
+            # Datos recientes: filas de train añadidas desde el último
+            # entrenamiento (o, si son pocas, las últimas min_rows)
+            dataset = ColumnarDataset.open(RATINGS_DATASET_DIR, columns=["user", "anime", "rating"])
+            train = dataset.split("train")
+            start = min(max(state["train_stop"], train.start),
+                        max(train.stop - warm_start.get("min_rows", 1000000), train.start))
+            recent = slice(start, train.stop)
+
+            train_data = RatingsInput(
+                dataset["user"][recent], dataset["anime"][recent], dataset["rating"][recent],
+                batch_size=batch_size,
+                shuffle_buffer=training_config.get("shuffle_buffer", 262144),
+                block_size=training_config.get("block_size", 65536),
+                seed=training_config.get("seed")
+            ).dataset(shuffle=True)
+            validation_data = RatingsInput(
+                dataset.column("user", "test"), dataset.column("anime", "test"),
+                dataset.column("rating", "test"), batch_size=batch_size
+            ).dataset(shuffle=False)
+
+            checkpoint_cb = ModelCheckpoint(
+                filepath=CHECKPOINT_FILE_PATH,
+                save_weights_only=True,
+                monitor="val_loss",
+                mode="min",
+                save_best_only=True
+            )
+
+            os.makedirs(os.path.dirname(CHECKPOINT_FILE_PATH), exist_ok=True)
+            logger.info(f"Warm start: fine-tuning on {recent.stop - recent.start} recent rows")
+
+            model.fit(
+                train_data,
+                epochs=warm_start.get("epochs", 3),
+                validation_data=validation_data,
+                callbacks=[checkpoint_cb],
                 verbose=1
             )
 
             model.load_weights(CHECKPOINT_FILE_PATH)
-            logger.info("Model training completed successfully")
+            logger.info("Warm start fine-tuning completed successfully")
+            return model
 
-            self.save_model_weights(model)
+        except Exception as e:
+            logger.error(str(e))
+            raise CustomException("Error during warm start fine-tuning", e)
+
+    def save_training_state(self):
+        # Lo que necesita el siguiente warm start para comprobar que puede partir de este modelo
+        try:
+            user_ids = IdEncoding.load(USER_IDS, USER_ID_LOOKUP).ids
+            anime_ids = IdEncoding.load(ANIME_IDS, ANIME_ID_LOOKUP).ids
+            train_stop = (
+                ColumnarDataset.open(RATINGS_DATASET_DIR, columns=["rating"]).split("train").stop
+                if ColumnarDataset.exists(RATINGS_DATASET_DIR) else 0
+            )
+
+            state = {
+                "embedding_size": self.config["model"]["embedding_size"],
+                "train_stop": int(train_stop),
+                "users": {"rows": len(user_ids), "sha256": _ids_digest(user_ids, len(user_ids))},
+                "anime": {"rows": len(anime_ids), "sha256": _ids_digest(anime_ids, len(anime_ids))},
+            }
+            with open(TRAINING_STATE_PATH, "w") as f:
+                json.dump(state, f, indent=2)
+        except Exception as e:
+            raise CustomException("Error while saving training state", e)
+
+    def fit_als(self):
+        try:
+            X_train_array, X_test_array, y_train, y_test = self.load_data()
+
+            n_users = len(load_id_encoding(USER_IDS, USER_ID_LOOKUP, USER2USER_ENCODED))
+            n_anime = len(load_id_encoding(ANIME_IDS, ANIME_ID_LOOKUP, ANIME2ANIME_ENCODED))
+
+            als_config = self.config.get("als", {})
+            model = ALSFactorization(
+                factors=als_config.get("factors") or self.config["model"]["embedding_size"],
+                reg=als_config.get("reg", 0.05),
+                iterations=als_config.get("iterations", 10),
+                workers=als_config.get("workers") or None,
+                seed=als_config.get("seed", 42)
+            )
+            model.fit(
+                X_train_array[0], X_train_array[1], y_train,
+                n_users=n_users,
+                n_anime=n_anime,
+                validation=(X_test_array[0], X_test_array[1], y_test)
+            )
+
+            logger.info("ALS training completed successfully")
+            return model
 
         except Exception as e:
             logger.error(str(e))
-            raise CustomException("Error during model training process", e)
+            raise CustomException("Error during ALS training process", e)
 
     def extract_weights(self, layer_name, model):
         try:
-            weight_layer = model.get_layer(layer_name)
-            weights = weight_layer.get_weights()[0]
+            if isinstance(model, ALSFactorization):
+                weights = model.user_factors if layer_name == "user_embedding" else model.anime_factors
+            else:
+                weight_layer = model.get_layer(layer_name)
+                weights = weight_layer.get_weights()[0]
             weights = weights / np.linalg.norm(weights, axis=1).reshape((-1, 1))
             logger.info(f"Weights extracted for layer: {layer_name}")
             return weights
         except Exception as e:
             raise CustomException("Error during weight extraction", e)
 
+    def load_trained_model(self):
+        if self.trainer == "als":
+            return ALSFactorization.load(ALS_MODEL_PATH)
+        return load_model(MODEL_PATH)
+
+    def save_model(self, model):
+        model.save(self.model_path)
+        logger.info(f"Model saved at {self.model_path}")
+
+        if self.trainer == "keras" and IdEncoding.exists(USER_IDS, USER_ID_LOOKUP):
+            self.save_training_state()
+
     def save_model_weights(self, model):
         try:
-            model.save(MODEL_PATH)
-            logger.info(f"Model saved at {MODEL_PATH}")
+            self.save_model(model)
+            self.export_weights(model)
+
+        except Exception as e:
+            raise CustomException("Error while saving model and weights", e)
+
+    def export_weights(self, model=None):
+        # Pesos normalizados, tabla de vecinos e índices ANN a partir del
+        # modelo entrenado (o del guardado en model_path)
+        try:
+            if model is None:
+                model = self.load_trained_model()
 
             user_weights = self.extract_weights("user_embedding", model)
             anime_weights = self.extract_weights("anime_embedding", model)
@@ -128,8 +416,97 @@ class ModelTraining:
 
             logger.info("User & Anime weights saved successfully")
 
+            self.save_quantized_weights(user_weights, anime_weights)
+            self.save_neighbour_table(anime_weights)
+            self.build_ann_indexes(user_weights, anime_weights)
+
         except Exception as e:
-            raise CustomException("Error while saving model and weights", e)
+            raise CustomException("Error while exporting weights", e)
+
+    def save_quantized_weights(self, user_weights, anime_weights):
+        # Versiones float16 / int8 para serving y su solapamiento top-k con float32
+        try:
+            quantization_config = self.config.get("quantization", {})
+            precisions = quantization_config.get("export", [])
+
+            tables = {
+                "user": (user_weights, USER_WEIGHTS_PATH, {
+                    "float16": (USER_WEIGHTS_FP16, None),
+                    "int8": (USER_WEIGHTS_INT8, USER_WEIGHTS_INT8_SCALES),
+                }),
+                "anime": (anime_weights, ANIME_WEIGHTS_PATH, {
+                    "float16": (ANIME_WEIGHTS_FP16, None),
+                    "int8": (ANIME_WEIGHTS_INT8, ANIME_WEIGHTS_INT8_SCALES),
+                }),
+            }
+
+            # Las exportaciones de precisiones que ya no se piden serían de
+            # un entrenamiento anterior: se borran
+            for _, _, paths in tables.values():
+                for precision, precision_paths in paths.items():
+                    if precision not in precisions:
+                        QuantizedMatrix.remove(*precision_paths)
+            if not precisions:
+                return
+
+            report = {}
+            for table, (weights, weights_path, paths) in tables.items():
+                source = file_fingerprint(weights_path)
+                for precision in precisions:
+                    quantized = QuantizedMatrix.quantize(weights, precision)
+                    quantized.save(*paths[precision], source=source)
+                    report[f"{table}_{precision}"] = topk_overlap_report(
+                        weights, quantized,
+                        n_queries=quantization_config.get("validation_queries", 1000),
+                        k=quantization_config.get("k", 10)
+                    )
+
+            os.makedirs(REPORTS_DIR, exist_ok=True)
+            with open(QUANTIZATION_REPORT, "w") as f:
+                json.dump(report, f, indent=2)
+
+            logger.info("Quantized weights saved successfully")
+        except Exception as e:
+            raise CustomException("Error while saving quantized weights", e)
+
+    def save_neighbour_table(self, anime_weights):
+        try:
+            neighbours_config = self.config.get("neighbours", {})
+            table = NeighbourTable.compute(
+                anime_weights,
+                k=neighbours_config.get("k", 50),
+                block_size=neighbours_config.get("block_size", 2048)
+            )
+            table.save(ANIME_NEIGHBOUR_IDS, ANIME_NEIGHBOUR_SIMS)
+
+            logger.info("Anime neighbour table saved successfully")
+        except Exception as e:
+            raise CustomException("Error while saving anime neighbour table", e)
+
+    def build_ann_indexes(self, user_weights, anime_weights):
+        try:
+            ann_config = self.config.get("ann", {})
+            if not ann_config.get("enabled", False):
+                return
+
+            tables = {
+                "user": (user_weights, USER_ANN_DIR),
+                "anime": (anime_weights, ANIME_ANN_DIR),
+            }
+            for table in ann_config.get("tables", []):
+                weights, index_dir = tables[table]
+                index = IVFIndex(
+                    n_lists=ann_config.get("n_lists", 1024),
+                    n_probe=ann_config.get("n_probe", 32),
+                    pq_subvectors=ann_config.get("pq_subvectors", 0),
+                    kmeans_iters=ann_config.get("kmeans_iters", 20),
+                    train_size=ann_config.get("train_size", 100000),
+                )
+                index.fit(weights).save(index_dir)
+
+            logger.info("ANN indexes built successfully")
+        except Exception as e:
+            raise CustomException("Error while building ANN indexes", e)
 
 
 if __name__ == "__main__":
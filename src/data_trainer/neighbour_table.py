@@ -0,0 +1,87 @@
+import os
+
+import numpy as np
+
+from src.logger import get_logger
+from src.exception.exception import CustomException
+
+logger = get_logger(__name__)
+
+
+# Tabla precalculada de vecinos anime -> anime:
+#   ids[i]   -> los K índices codificados más similares a i (sin i)
+#   sims[i]  -> sus similitudes, de mayor a menor
+# Se calcula al final del entrenamiento con multiplicaciones por bloques
+# (memoria acotada a block_size x N) y en serving se lee con memory-map,
+# así que una consulta de contenido es un slice O(K) sin productos punto.
+class NeighbourTable:
+    def __init__(self, ids, sims):
+        self.ids = ids
+        self.sims = sims
+
+    def __len__(self):
+        return self.ids.shape[0]
+
+    @property
+    def k(self):
+        return self.ids.shape[1]
+
+    # -------------------- CONSTRUCCIÓN --------------------
+    @classmethod
+    def compute(cls, weights, k=50, block_size=2048):
+        try:
+            weights = np.asarray(weights, dtype=np.float32)
+            n_rows = len(weights)
+            k = min(k, n_rows - 1)
+
+            ids = np.empty((n_rows, k), dtype=np.int32)
+            sims = np.empty((n_rows, k), dtype=np.float32)
+
+            for start in range(0, n_rows, block_size):
+                stop = min(start + block_size, n_rows)
+                block = weights[start:stop] @ weights.T
+
+                # Excluye el propio anime
+                block[np.arange(stop - start), np.arange(start, stop)] = -np.inf
+
+                candidates = np.argpartition(-block, k - 1, axis=1)[:, :k]
+                candidate_sims = np.take_along_axis(block, candidates, axis=1)
+                order = np.argsort(-candidate_sims, axis=1, kind="stable")
+
+                ids[start:stop] = np.take_along_axis(candidates, order, axis=1)
+                sims[start:stop] = np.take_along_axis(candidate_sims, order, axis=1)
+
+            logger.info(f"Neighbour table computed: {n_rows} rows, k={k}")
+            return cls(ids, sims)
+        except Exception as e:
+            raise CustomException("Error while computing neighbour table", e)
+
+    # -------------------- PERSISTENCIA --------------------
+    def save(self, ids_path, sims_path):
+        try:
+            os.makedirs(os.path.dirname(ids_path), exist_ok=True)
+            np.save(ids_path, self.ids)
+            np.save(sims_path, self.sims)
+            logger.info(f"Neighbour table saved to {ids_path}")
+        except Exception as e:
+            raise CustomException("Error while saving neighbour table", e)
+
+    @classmethod
+    def load(cls, ids_path, sims_path, mmap_mode="r"):
+        return cls(
+            np.load(ids_path, mmap_mode=mmap_mode),
+            np.load(sims_path, mmap_mode=mmap_mode)
+        )
+
+    @staticmethod
+    def exists(ids_path, sims_path):
+        return os.path.exists(ids_path) and os.path.exists(sims_path)
+
+    # -------------------- CONSULTAS --------------------
+    def lookup(self, indices, k):
+        # Top-k de un lote de índices: (ids, sims), ambos (B, k)
+        indices = np.asarray(indices, dtype=np.int64).ravel()
+        return (
+            np.asarray(self.ids[indices, :k], dtype=np.int64),
+            np.asarray(self.sims[indices, :k], dtype=np.float32)
+        )
@@ -0,0 +1,174 @@
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+from src.logger import get_logger
+from src.exception.exception import CustomException
+
+logger = get_logger(__name__)
+
+
+# Matrices de embeddings cuantizadas para serving:
+#   float16  -> values (N, d) float16, sin escalas
+#   int8     -> values (N, d) int8 + scales (N,) float32 por fila:
+#               fila ~ values * scale, con scale = max|fila| / 127
+# Se guardan como .npy (memory-map) junto a un .json con el sha256 del
+# fichero de pesos float32 del que salen (source): serving lo compara con
+# los pesos actuales para no usar una exportación de un entrenamiento
+# anterior. Los productos punto se hacen por
+# bloques de filas: cada bloque se convierte a float32 al vuelo y, en int8,
+# la escala se aplica sobre los scores (q · (v * s) = (q · v) * s), así que
+# en memoria solo vive la matriz cuantizada más un bloque.
+class QuantizedMatrix:
+    def __init__(self, values, scales=None, block_size=65536):
+        self.values = values
+        self.scales = scales
+        self.block_size = block_size
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    @property
+    def dtype(self):
+        # Tipo de los vectores de consulta y de los scores
+        return np.dtype(np.float32)
+
+    @property
+    def precision(self):
+        return "int8" if self.scales is not None else "float16"
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def __len__(self):
+        return self.values.shape[0]
+
+    def __getitem__(self, rows):
+        # Filas descuantizadas en float32 (también con índices 2-D)
+        values = np.asarray(self.values[rows], dtype=np.float32)
+        if self.scales is not None:
+            values *= np.asarray(self.scales[rows], dtype=np.float32)[..., None]
+        return values
+
+    # -------------------- CONSTRUCCIÓN --------------------
+    @classmethod
+    def quantize(cls, weights, precision):
+        weights = np.asarray(weights, dtype=np.float32)
+        if precision == "float16":
+            return cls(weights.astype(np.float16))
+        if precision == "int8":
+            scales = np.abs(weights).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            values = np.clip(np.rint(weights / scales[:, None]), -127, 127).astype(np.int8)
+            return cls(values, scales.astype(np.float32))
+        raise ValueError(f"Unknown precision: {precision}")
+
+    # -------------------- SCORES --------------------
+    def dot(self, vectors):
+        # vectors (B, d) float32 -> scores (B, N) contra todas las filas
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        scores = np.empty((vectors.shape[0], len(self)), dtype=np.float32)
+
+        for start in range(0, len(self), self.block_size):
+            stop = min(start + self.block_size, len(self))
+            block = vectors @ np.asarray(self.values[start:stop], dtype=np.float32).T
+            if self.scales is not None:
+                block *= self.scales[start:stop]
+            scores[:, start:stop] = block
+
+        return scores
+
+    # -------------------- PERSISTENCIA --------------------
+    def save(self, values_path, scales_path=None, source=None):
+        try:
+            os.makedirs(os.path.dirname(values_path), exist_ok=True)
+            np.save(values_path, self.values)
+            if self.scales is not None:
+                np.save(scales_path, self.scales)
+            with open(self.metadata_path(values_path), "w") as f:
+                json.dump({"shape": list(self.shape), "source": source}, f, indent=2)
+            logger.info(f"Quantized ({self.precision}) weights saved to {values_path}")
+        except Exception as e:
+            raise CustomException("Error while saving quantized weights", e)
+
+    @classmethod
+    def load(cls, values_path, scales_path=None, mmap_mode="r"):
+        values = np.load(values_path, mmap_mode=mmap_mode)
+        scales = np.load(scales_path, mmap_mode=mmap_mode) if values.dtype == np.int8 else None
+        return cls(values, scales)
+
+    @staticmethod
+    def exists(values_path, scales_path=None):
+        return os.path.exists(values_path) and (scales_path is None or os.path.exists(scales_path))
+
+    @staticmethod
+    def metadata_path(values_path):
+        return os.path.splitext(values_path)[0] + ".json"
+
+    @classmethod
+    def source(cls, values_path):
+        # Huella de los pesos float32 de origen (None si no se guardó)
+        path = cls.metadata_path(values_path)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f).get("source")
+
+    @classmethod
+    def remove(cls, values_path, scales_path=None):
+        for path in [values_path, scales_path, cls.metadata_path(values_path)]:
+            if path is not None and os.path.exists(path):
+                os.remove(path)
+
+
+def file_fingerprint(path, chunk_size=16 * 1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# Solapamiento top-k de la matriz cuantizada frente a float32 para un
+# conjunto de consultas (excluyendo la propia fila), más la latencia y el
+# tamaño de cada versión
+def topk_overlap_report(weights, quantized, n_queries=1000, k=10, seed=0):
+    weights = np.asarray(weights, dtype=np.float32)
+    rng = np.random.default_rng(seed)
+    queries = rng.choice(len(weights), min(n_queries, len(weights)), replace=False)
+    vectors = weights[queries]
+    k = min(k, len(weights) - 1)
+
+    def top_k(scores):
+        scores[np.arange(len(queries)), queries] = -np.inf
+        return np.argpartition(-scores, k - 1, axis=1)[:, :k]
+
+    start = time.perf_counter()
+    exact = top_k(vectors @ weights.T)
+    exact_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    start = time.perf_counter()
+    approx = top_k(quantized.dot(vectors))
+    quantized_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    hits = sum(len(np.intersect1d(approx[i], exact[i])) for i in range(len(queries)))
+    overlap = hits / float(len(queries) * k)
+
+    logger.info(f"Quantized {quantized.precision}: top-{k} overlap {overlap:.3f}")
+    return {
+        "precision": quantized.precision,
+        "rows": int(len(weights)),
+        "queries": int(len(queries)),
+        "k": int(k),
+        "topk_overlap": overlap,
+        "max_abs_error": float(np.abs(quantized[queries] - vectors).max()),
+        "bytes": int(quantized.nbytes),
+        "float32_bytes": int(weights.nbytes),
+        "float32_ms_per_query": exact_ms,
+        "quantized_ms_per_query": quantized_ms,
+    }
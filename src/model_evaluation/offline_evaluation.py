@@ -0,0 +1,376 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+
+from src.logger import get_logger
+from src.exception.exception import CustomException
+from src.config.paths_config import *
+from src.utils.common_funtions import read_yaml
+from src.data_preprocessing.columnar_dataset import ColumnarDataset
+from src.data_preprocessing.preference_index import UserPreferenceIndex
+from src.data_trainer.neighbour_table import NeighbourTable
+from src.serving.similarity import SimilarityEngine
+
+logger = get_logger(__name__)
+
+
+# Evaluación offline de las estrategias de recomendación sobre el split de test:
+#   - relevantes de un usuario = sus animes de test con rating >= relevance_threshold
+#   - vistos / favoritos se calculan solo con train (sin fuga del test)
+#   - cada estrategia puntúa todo el catálogo para un bloque de usuarios con
+#     multiplicaciones de matrices (memoria acotada a block_size x N) y se
+#     queda con el top-k por fila con argpartition
+#   - los bloques se reparten entre procesos (ProcessPoolExecutor)
+# Estrategias (mismas reglas que serving, en el espacio de IDs codificados):
+#   user    -> frecuencia de los favoritos de los vecinos (find_similar_users)
+#   content -> suma de similitudes con los favoritos del usuario (find_similar_animes)
+#   hybrid  -> top-k de user con user_weight + sus vecinos de contenido con
+#              content_weight (hybrid_recommendation)
+# En las tres se excluyen los animes que el usuario ya valoró en train.
+
+STRATEGIES = ("user", "content", "hybrid")
+
+
+# =========================
+# ESTADO DE CADA PROCESO
+# =========================
+# Se carga una vez por proceso en el initializer del pool
+
+_STATE = {}
+
+
+def _init_worker(state):
+    _STATE.clear()
+    _STATE.update(state)
+    _STATE["user_engine"] = SimilarityEngine(state["user_weights"], block_size=state["block_size"])
+    _STATE["anime_engine"] = SimilarityEngine(
+        state["anime_weights"], block_size=state["block_size"], neighbours=state["neighbours"]
+    )
+
+
+def _gather(index, positions, liked):
+    # (anime, filas) de varios usuarios del índice CSR: todos sus ratings de
+    # train o solo el prefijo de favoritos
+    starts = index.offsets[positions]
+    counts = index.liked_counts[positions] if liked else index.offsets[positions + 1] - starts
+
+    rows = np.repeat(np.arange(len(positions)), counts)
+    flat = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    flat += np.repeat(starts, counts)
+    return index.anime_ids[flat].astype(np.int64), rows
+
+
+def _find(index, user_ids):
+    # (posiciones en el índice de train, encontrado) de varios usuarios
+    user_ids = np.asarray(user_ids, dtype=np.int64)
+    if len(index.user_ids) == 0:
+        return np.zeros(len(user_ids), dtype=np.int64), np.zeros(len(user_ids), dtype=bool)
+
+    positions = np.minimum(np.searchsorted(index.user_ids, user_ids), len(index.user_ids) - 1)
+    return positions, index.user_ids[positions] == user_ids
+
+
+def _top_rows(scores, k):
+    # Top-k por fila (-1 donde no quedan candidatos con score finito)
+    k = min(k, scores.shape[1])
+    candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+    order = np.argsort(-candidate_scores, axis=1, kind="stable")
+
+    top = np.take_along_axis(candidates, order, axis=1)
+    top[~np.isfinite(np.take_along_axis(candidate_scores, order, axis=1))] = -1
+    return top
+
+
+# =========================
+# ESTRATEGIAS
+# =========================
+# Cada una devuelve los scores (B, n_anime) de un bloque de usuarios;
+# -inf = no recomendable
+
+def _user_scores(users, positions):
+    index = _STATE["train_index"]
+    n_anime = len(_STATE["anime_weights"])
+
+    neighbours, _ = _STATE["user_engine"].top_k(users, k=_STATE["n_neighbours"])
+    neighbour_positions, known = _find(index, neighbours.ravel())
+
+    anime, rows = _gather(index, neighbour_positions[known], liked=True)
+    owners = np.flatnonzero(known)[rows] // neighbours.shape[1]
+
+    counts = np.zeros((len(users), n_anime), dtype=np.float32)
+    np.add.at(counts, (owners, anime), 1.0)
+    counts[counts == 0] = -np.inf
+    return counts
+
+
+def _content_scores(users, positions):
+    index = _STATE["train_index"]
+    anime_weights = _STATE["anime_weights"]
+
+    anime, rows = _gather(index, positions, liked=True)
+    profiles = np.zeros((len(users), anime_weights.shape[1]), dtype=np.float32)
+    np.add.at(profiles, rows, anime_weights[anime])
+
+    scores = _STATE["anime_engine"].score_vectors(profiles)
+    scores[np.bincount(rows, minlength=len(users)) == 0] = -np.inf
+    return scores
+
+
+def _hybrid_scores(users, positions):
+    n_anime = len(_STATE["anime_weights"])
+    user_rec = _top_rows(_masked(_user_scores(users, positions), positions), _STATE["k"])
+
+    scores = np.zeros((len(users), n_anime), dtype=np.float32)
+    rows, ranks = np.nonzero(user_rec >= 0)
+    titles = user_rec[rows, ranks]
+    np.add.at(scores, (rows, titles), _STATE["user_weight"])
+
+    if len(titles):
+        similar, _ = _STATE["anime_engine"].top_k(titles, k=_STATE["n_neighbours"])
+        np.add.at(
+            scores,
+            (np.repeat(rows, similar.shape[1]), similar.ravel()),
+            _STATE["content_weight"]
+        )
+
+    scores[scores == 0] = -np.inf
+    return scores
+
+
+SCORERS = {"user": _user_scores, "content": _content_scores, "hybrid": _hybrid_scores}
+
+
+def _masked(scores, positions):
+    # Los animes ya valorados en train no se recomiendan
+    anime, rows = _gather(_STATE["train_index"], positions, liked=False)
+    scores[rows, anime] = -np.inf
+    return scores
+
+
+# =========================
+# MÉTRICAS
+# =========================
+
+def ranking_metrics(recommended, relevant_anime, relevant_rows, k, n_anime):
+    # recall / precision / NDCG @k por usuario a partir del top-k (B, k)
+    # y de los pares (fila, anime) relevantes
+    n_users = recommended.shape[0]
+    relevant_keys = relevant_rows.astype(np.int64) * n_anime + relevant_anime
+    keys = np.arange(n_users)[:, None] * n_anime + recommended
+
+    hits = np.isin(keys, relevant_keys) & (recommended >= 0)
+    n_relevant = np.bincount(relevant_rows, minlength=n_users)
+
+    discounts = 1.0 / np.log2(np.arange(k) + 2)
+    ideal = np.cumsum(discounts)[np.clip(n_relevant, 1, k) - 1]
+
+    return {
+        "recall": hits.sum(axis=1) / np.maximum(n_relevant, 1),
+        "precision": hits.sum(axis=1) / k,
+        "ndcg": (hits * discounts[:hits.shape[1]]).sum(axis=1) / ideal,
+    }
+
+
+def _evaluate_block(task):
+    users, positions, relevant_anime, relevant_rows = task
+    k = _STATE["k"]
+    n_anime = len(_STATE["anime_weights"])
+
+    results = {}
+    for strategy in _STATE["strategies"]:
+        start = time.perf_counter()
+        recommended = _top_rows(_masked(SCORERS[strategy](users, positions), positions), k)
+        seconds = time.perf_counter() - start
+
+        metrics = ranking_metrics(recommended, relevant_anime, relevant_rows, k, n_anime)
+        results[strategy] = {
+            "sums": {name: float(values.sum()) for name, values in metrics.items()},
+            "covered": np.bincount(recommended[recommended >= 0], minlength=n_anime) > 0,
+            "seconds": seconds,
+        }
+    return len(users), results
+
+
+# =========================
+# OFFLINE EVALUATOR
+# =========================
+
+class OfflineEvaluator:
+    def __init__(self, config=None):
+        config = config if config is not None else read_yaml(CONFIG_PATH)
+        self.config = config.get("evaluation", {})
+
+        self.k = self.config.get("k", 10)
+        self.strategies = list(self.config.get("strategies", STRATEGIES))
+        self.relevance_threshold = self.config.get("relevance_threshold", 0.7)
+        self.max_users = self.config.get("max_users", 0)
+        self.n_neighbours = self.config.get("neighbours", 10)
+        self.user_weight = self.config.get("user_weight", 0.5)
+        self.content_weight = self.config.get("content_weight", 0.5)
+        self.block_size = self.config.get("block_size", 1024)
+        self.workers = self.config.get("workers", 0) or os.cpu_count() or 1
+        self.seed = self.config.get("seed", 42)
+
+        unknown = set(self.strategies) - set(STRATEGIES)
+        if unknown:
+            raise ValueError(f"Unknown evaluation strategies: {sorted(unknown)}")
+
+    # -------------------- DATOS --------------------
+    def load_state(self):
+        try:
+            dataset = ColumnarDataset.open(RATINGS_DATASET_DIR, columns=["user", "anime", "rating"])
+
+            train_index = UserPreferenceIndex.from_ratings(
+                dataset.column("user", "train"),
+                dataset.column("anime", "train"),
+                dataset.column("rating", "train")
+            )
+
+            neighbours = None
+            if NeighbourTable.exists(ANIME_NEIGHBOUR_IDS, ANIME_NEIGHBOUR_SIMS):
+                neighbours = NeighbourTable.load(ANIME_NEIGHBOUR_IDS, ANIME_NEIGHBOUR_SIMS)
+
+            state = {
+                "user_weights": np.asarray(joblib.load(USER_WEIGHTS_PATH), dtype=np.float32),
+                "anime_weights": np.asarray(joblib.load(ANIME_WEIGHTS_PATH), dtype=np.float32),
+                "neighbours": neighbours,
+                "train_index": train_index,
+                "strategies": self.strategies,
+                "k": self.k,
+                "n_neighbours": self.n_neighbours,
+                "user_weight": self.user_weight,
+                "content_weight": self.content_weight,
+                "block_size": self.block_size,
+            }
+            if neighbours is not None and len(neighbours) != len(state["anime_weights"]):
+                state["neighbours"] = None
+
+            logger.info(f"Evaluation state loaded: {len(train_index)} train users")
+            return dataset, state
+        except Exception as e:
+            raise CustomException("Error while loading evaluation data", e)
+
+    def ground_truth(self, dataset, train_index):
+        # (usuarios, posiciones en el índice de train, anime, owners) de los
+        # usuarios con algún anime relevante en test y con historial en train
+        users = np.asarray(dataset.column("user", "test"), dtype=np.int64)
+        anime = np.asarray(dataset.column("anime", "test"), dtype=np.int64)
+        relevant = np.asarray(dataset.column("rating", "test")) >= self.relevance_threshold
+        users, anime = users[relevant], anime[relevant]
+
+        _, known = _find(train_index, users)
+        users, anime = users[known], anime[known]
+
+        eval_users = np.unique(users)
+        if self.max_users and len(eval_users) > self.max_users:
+            rng = np.random.default_rng(self.seed)
+            eval_users = np.sort(rng.choice(eval_users, self.max_users, replace=False))
+
+        keep = np.isin(users, eval_users)
+        owners = np.searchsorted(eval_users, users[keep])
+        return eval_users, np.searchsorted(train_index.user_ids, eval_users), anime[keep], owners
+
+    def tasks(self, eval_users, positions, relevant_anime, owners):
+        order = np.argsort(owners, kind="stable")
+        relevant_anime, owners = relevant_anime[order], owners[order]
+
+        for start in range(0, len(eval_users), self.block_size):
+            stop = min(start + self.block_size, len(eval_users))
+            lo, hi = np.searchsorted(owners, [start, stop])
+            yield (
+                eval_users[start:stop],
+                positions[start:stop],
+                relevant_anime[lo:hi],
+                owners[lo:hi] - start,
+            )
+
+    # -------------------- EVALUACIÓN --------------------
+    def evaluate(self):
+        try:
+            start = time.perf_counter()
+            dataset, state = self.load_state()
+            eval_users, positions, relevant_anime, owners = self.ground_truth(dataset, state["train_index"])
+            if len(eval_users) == 0:
+                raise ValueError("No test users with relevant ratings to evaluate")
+
+            logger.info(f"Evaluating {self.strategies} @ {self.k} on {len(eval_users)} users "
+                        f"with {self.workers} workers")
+
+            tasks = list(self.tasks(eval_users, positions, relevant_anime, owners))
+            if self.workers > 1 and len(tasks) > 1:
+                with ProcessPoolExecutor(
+                        max_workers=min(self.workers, len(tasks)),
+                        initializer=_init_worker, initargs=(state,)) as executor:
+                    blocks = list(executor.map(_evaluate_block, tasks))
+            else:
+                _init_worker(state)
+                blocks = [_evaluate_block(task) for task in tasks]
+
+            n_users = sum(n for n, _ in blocks)
+            n_anime = len(state["anime_weights"])
+
+            strategies = {}
+            for strategy in self.strategies:
+                results = [block[strategy] for _, block in blocks]
+                metrics = {
+                    f"{name}@{self.k}": sum(result["sums"][name] for result in results) / n_users
+                    for name in ["recall", "precision", "ndcg"]
+                }
+                covered = np.logical_or.reduce([result["covered"] for result in results])
+                metrics["coverage"] = float(covered.sum()) / n_anime
+                metrics["cpu_seconds"] = sum(result["seconds"] for result in results)
+                strategies[strategy] = metrics
+
+            report = {
+                "k": self.k,
+                "users": n_users,
+                "relevant_items": len(relevant_anime),
+                "relevance_threshold": self.relevance_threshold,
+                "workers": self.workers,
+                "block_size": self.block_size,
+                "seconds": time.perf_counter() - start,
+                "strategies": strategies,
+            }
+            for strategy, metrics in strategies.items():
+                logger.info(f"{strategy}: " + ", ".join(f"{name}={value:.4f}" for name, value in metrics.items()))
+            return report
+        except Exception as e:
+            raise CustomException("Error during offline evaluation", e)
+
+    @staticmethod
+    def save_report(report, output_path=EVALUATION_REPORT):
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        with open(output_path, "w") as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Evaluation report saved to {output_path}")
+
+    def run(self):
+        report = self.evaluate()
+        self.save_report(report)
+        return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline evaluation of the recommendation strategies")
+    parser.add_argument("--k", type=int, default=None)
+    parser.add_argument("--users", type=int, default=None, help="máximo de usuarios evaluados (0 = todos)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--strategies", nargs="+", choices=STRATEGIES, default=None)
+    parser.add_argument("--output", default=EVALUATION_REPORT)
+    args = parser.parse_args()
+
+    config = read_yaml(CONFIG_PATH)
+    evaluation_config = config.setdefault("evaluation", {})
+    for key, value in [("k", args.k), ("max_users", args.users),
+                       ("workers", args.workers), ("strategies", args.strategies)]:
+        if value is not None:
+            evaluation_config[key] = value
+
+    evaluator = OfflineEvaluator(config)
+    evaluator.save_report(evaluator.evaluate(), args.output)
@@ -0,0 +1,169 @@
+# =========================
+# IMPORTS
+# =========================
+
+import numpy as np
+import pandas as pd
+
+from src.logger import get_logger
+from src.config.paths_config import *
+from src.serving.artifact_store import get_artifact_store
+
+logger = get_logger(__name__)
+
+
+# =========================
+# ANIME CATALOG
+# =========================
+# Catálogo de animes indexado por hash:
+#   - array denso anime_id -> fila (búsqueda O(1) por ID)
+#   - diccionario eng_version -> fila (búsqueda O(1) por nombre)
+#   - columnas como arrays de NumPy (lecturas sin filtrar el dataframe)
+
+class AnimeCatalog:
+    def __init__(self, anime_df, synopsis_df=None):
+        self.df = anime_df.reset_index(drop=True)
+        self.anime_ids = self.df["anime_id"].to_numpy(dtype=np.int64)
+
+        # Columnas del catálogo como arrays (nombre, géneros, score, ...)
+        self.columns = {
+            col: self.df[col].to_numpy() for col in self.df.columns
+        }
+
+        # anime_id -> fila (se queda con la primera aparición, como df[mask].values[0])
+        self._row_of_id = self._dense_index(self.anime_ids)
+
+        # eng_version -> fila
+        self._row_of_name = {}
+        for row, name in enumerate(self.columns["eng_version"]):
+            self._row_of_name.setdefault(name, row)
+
+        # Código entero por nombre (-1 si no hay nombre) para agregar por
+        # título con operaciones vectorizadas; name_rows[c] es la primera
+        # fila con ese nombre
+        self.name_codes, self.names = pd.factorize(self.columns["eng_version"])
+        self.names = np.asarray(self.names, dtype=object)
+        self.name_rows = np.array(
+            [self._row_of_name[name] for name in self.names], dtype=np.int64
+        )
+
+        # Sinopsis indexadas por MAL_ID y por Name
+        self._synopsis_by_id = None
+        self._synopsis_ids = None
+        self._synopsis_by_name = {}
+        if synopsis_df is not None:
+            synopsis_ids = synopsis_df["MAL_ID"].to_numpy(dtype=np.int64)
+            self._synopsis_ids = self._dense_index(synopsis_ids)
+            self._synopsis_by_id = synopsis_df["sypnopsis"].to_numpy()
+            for row, name in enumerate(synopsis_df["Name"].to_numpy()):
+                self._synopsis_by_name.setdefault(name, row)
+
+        logger.info(f"Anime catalog built with {len(self.anime_ids)} titles")
+
+    @staticmethod
+    def _dense_index(ids):
+        # Array denso id -> posición (-1 si el id no existe)
+        size = int(ids.max()) + 1 if len(ids) else 0
+        index = np.full(size, -1, dtype=np.int64)
+        # Se asigna en orden inverso para que gane la primera aparición
+        index[ids[::-1]] = np.arange(len(ids))[::-1]
+        return index
+
+    @staticmethod
+    def _gather_index(index, ids):
+        ids = np.asarray(ids, dtype=np.int64).ravel()
+        rows = np.full(len(ids), -1, dtype=np.int64)
+        valid = (ids >= 0) & (ids < len(index))
+        rows[valid] = index[ids[valid]]
+        return rows
+
+    def __len__(self):
+        return len(self.anime_ids)
+
+    # -------------------- FILAS --------------------
+    def rows(self, anime_ids):
+        # IDs -> filas del catálogo (-1 si no existen)
+        return self._gather_index(self._row_of_id, anime_ids)
+
+    def rows_by_name(self, names):
+        return np.array(
+            [self._row_of_name.get(name, -1) for name in names],
+            dtype=np.int64
+        )
+
+    def row(self, anime):
+        # Acepta ID (int) o nombre (str), igual que getAnimeFrame
+        if isinstance(anime, str):
+            return self._row_of_name.get(anime, -1)
+        return int(self.rows([anime])[0])
+
+    # -------------------- BÚSQUEDAS --------------------
+    def get(self, anime):
+        # Devuelve un diccionario con todos los campos del anime o None
+        row = self.row(anime)
+        if row < 0:
+            return None
+        return {col: values[row] for col, values in self.columns.items()}
+
+    def take(self, rows, columns=None):
+        # Gather por filas: devuelve {columna: array}; filas -1 -> None
+        rows = np.asarray(rows, dtype=np.int64)
+        found = rows >= 0
+        result = {}
+        for col in (columns or list(self.columns)):
+            values = np.empty(len(rows), dtype=object)
+            values[found] = self.columns[col][rows[found]]
+            values[~found] = None
+            result[col] = values
+        return result
+
+    def lookup(self, anime_ids, columns=None):
+        # Búsqueda en lote por IDs
+        return self.take(self.rows(anime_ids), columns)
+
+    def frame(self, anime):
+        # Equivalente a df[df.anime_id == anime] / df[df.eng_version == anime]
+        row = self.row(anime)
+        rows = [row] if row >= 0 else []
+        return self.df.iloc[rows]
+
+    def frame_rows(self, rows):
+        # Sub-dataframe con las filas indicadas (conserva el índice original)
+        return self.df.iloc[np.asarray(rows, dtype=np.int64)]
+
+    # -------------------- SINOPSIS --------------------
+    def synopsis(self, anime):
+        if self._synopsis_by_id is None:
+            return None
+        if isinstance(anime, str):
+            row = self._synopsis_by_name.get(anime, -1)
+        else:
+            row = int(self._gather_index(self._synopsis_ids, [anime])[0])
+        return self._synopsis_by_id[row] if row >= 0 else None
+
+    def synopses(self, anime_ids):
+        # Sinopsis en lote por IDs (None si no existen)
+        rows = self._gather_index(self._synopsis_ids, anime_ids)
+        values = np.empty(len(rows), dtype=object)
+        found = rows >= 0
+        values[found] = self._synopsis_by_id[rows[found]]
+        values[~found] = None
+        return values
+
+
+# =========================
+# ACCESO AL CATÁLOGO
+# =========================
+# El catálogo se construye una sola vez por proceso y se guarda en el
+# ArtifactStore junto a los dataframes de los que sale.
+
+def get_anime_catalog(path_anime_df=DF, path_synopsis_df=SYNOPSIS_DF):
+    def build(store):
+        return AnimeCatalog(
+            store.get(path_anime_df),
+            store.get(path_synopsis_df)
+        )
+
+    return get_artifact_store().derived(
+        f"anime_catalog:{path_anime_df}:{path_synopsis_df}", build
+    )
@@ -0,0 +1,204 @@
+# =========================
+# IMPORTS
+# =========================
+
+import hashlib
+import os
+import threading
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from src.logger import get_logger
+from src.exception import CustomException
+from src.config.paths_config import *
+from src.serving.metrics import metrics
+from src.utils.common_funtions import read_yaml
+from src.data_preprocessing.id_encoding import load_id_encoding
+from src.data_trainer.quantization import QuantizedMatrix, file_fingerprint
+
+logger = get_logger(__name__)
+
+
+# Artefactos que necesita el pipeline de predicción
+SERVING_ARTIFACTS = [
+    USER_WEIGHTS_PATH,
+    ANIME_WEIGHTS_PATH,
+    USER2USER_ENCODED,
+    USER2USER_DECODED,
+    ANIME2ANIME_ENCODED,
+    ANIME2ANIME_DECODED,
+    DF,
+    SYNOPSIS_DF,
+]
+
+
+# Las rutas de los antiguos diccionarios .pkl se sirven con adaptadores
+# tipo dict sobre los arrays .npy de la codificación (o convirtiendo el
+# .pkl si los arrays aún no existen)
+ID_ENCODINGS = {
+    os.path.abspath(USER2USER_ENCODED): (USER_IDS, USER_ID_LOOKUP, False),
+    os.path.abspath(USER2USER_DECODED): (USER_IDS, USER_ID_LOOKUP, True),
+    os.path.abspath(ANIME2ANIME_ENCODED): (ANIME_IDS, ANIME_ID_LOOKUP, False),
+    os.path.abspath(ANIME2ANIME_DECODED): (ANIME_IDS, ANIME_ID_LOOKUP, True),
+}
+
+
+# Con quantization.serving = float16 / int8 las rutas de los pesos .pkl
+# se sirven con la versión cuantizada (memory-map), si se exportó a partir
+# de esos mismos pesos (huella sha256 guardada al exportar)
+QUANTIZED_WEIGHTS = {
+    os.path.abspath(USER_WEIGHTS_PATH): {
+        "float16": (USER_WEIGHTS_FP16, None),
+        "int8": (USER_WEIGHTS_INT8, USER_WEIGHTS_INT8_SCALES),
+    },
+    os.path.abspath(ANIME_WEIGHTS_PATH): {
+        "float16": (ANIME_WEIGHTS_FP16, None),
+        "int8": (ANIME_WEIGHTS_INT8, ANIME_WEIGHTS_INT8_SCALES),
+    },
+}
+
+
+def _read_quantized(path):
+    precision = read_yaml(CONFIG_PATH).get("quantization", {}).get("serving", "float32")
+    if precision == "float32":
+        return None
+
+    paths = QUANTIZED_WEIGHTS[path][precision]
+    if not QuantizedMatrix.exists(*paths):
+        logger.warning(f"No {precision} weights for {path}, serving float32")
+        return None
+
+    if QuantizedMatrix.source(paths[0]) != file_fingerprint(path):
+        logger.warning(f"{precision} weights for {path} come from other weights, serving float32")
+        return None
+    return QuantizedMatrix.load(*paths)
+
+
+# =========================
+# ARTIFACT STORE
+# =========================
+# Carga cada artefacto (pesos, diccionarios, dataframes) una sola vez
+# y lo comparte entre todas las peticiones del proceso.
+# Las claves son las rutas definidas en paths_config.
+
+class ArtifactStore:
+    def __init__(self):
+        self._artifacts = {}     # ruta -> objeto cargado
+        self._derived = {}       # nombre -> objeto construido a partir de artefactos
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _key(path):
+        return os.path.abspath(path)
+
+    @staticmethod
+    def _read(path):
+        # El formato se decide por la extensión del fichero
+        if path in ID_ENCODINGS:
+            ids_path, lookup_path, decoded = ID_ENCODINGS[path]
+            encoding = load_id_encoding(ids_path, lookup_path, path, decoded=decoded)
+            return encoding.decoder() if decoded else encoding.encoder()
+
+        if path in QUANTIZED_WEIGHTS:
+            quantized = _read_quantized(path)
+            if quantized is not None:
+                return quantized
+
+        extension = os.path.splitext(path)[1]
+
+        if extension == ".csv":
+            return pd.read_csv(path)
+        if extension == ".npy":
+            return np.load(path, mmap_mode="r")
+        return joblib.load(path)
+
+    def get(self, path):
+        key = self._key(path)
+
+        # Camino rápido sin lock: el artefacto ya está en memoria
+        artifact = self._artifacts.get(key)
+        if artifact is not None:
+            return artifact
+
+        with self._lock:
+            if key not in self._artifacts:
+                try:
+                    with metrics.timer("artifact_load_seconds", artifact=os.path.basename(key)):
+                        self._artifacts[key] = self._read(key)
+                    logger.info(f"Artifact loaded into memory: {key}")
+                except Exception as e:
+                    logger.error(f"Error while loading artifact {key}")
+                    raise CustomException(f"Failed to load artifact {key}", e)
+            return self._artifacts[key]
+
+    def derived(self, name, builder):
+        # Objetos construidos una sola vez a partir de otros artefactos
+        artifact = self._derived.get(name)
+        if artifact is not None:
+            return artifact
+
+        with self._lock:
+            if name not in self._derived:
+                with metrics.timer("artifact_load_seconds", artifact=name.split(":", 1)[0]):
+                    self._derived[name] = builder(self)
+                logger.info(f"Derived artifact built: {name}")
+            return self._derived[name]
+
+    def load_all(self, paths=None):
+        for path in (paths or SERVING_ARTIFACTS):
+            self.get(path)
+        logger.info("All serving artifacts loaded")
+
+    def clear(self):
+        with self._lock:
+            self._artifacts.clear()
+            self._derived.clear()
+        logger.info("Artifact store cleared")
+
+
+# =========================
+# VERSIÓN DE LOS ARTEFACTOS
+# =========================
+# Huella de los ficheros de pesos y datos procesados (ruta, tamaño, mtime).
+# Cambia cada vez que se reentrena o se reprocesan los datos.
+
+VERSIONED_DIRS = [WEIGHTS_DIR, PROCESSED_DIR]
+
+
+def artifact_version(dirs=None):
+    digest = hashlib.sha1()
+
+    for directory in (dirs or VERSIONED_DIRS):
+        for root, _, files in sorted(os.walk(directory)):
+            for file_name in sorted(files):
+                path = os.path.join(root, file_name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                digest.update(
+                    f"{os.path.relpath(path, ROOT_DIR)}:{stat.st_size}:{stat.st_mtime_ns};".encode()
+                )
+
+    return digest.hexdigest()[:16]
+
+
+# =========================
+# INSTANCIA GLOBAL
+# =========================
+# Un único store por proceso (compartido por Flask y los helpers)
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_artifact_store():
+    global _store
+
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ArtifactStore()
+    return _store
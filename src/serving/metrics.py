@@ -0,0 +1,239 @@
+# =========================
+# IMPORTS
+# =========================
+
+import bisect
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from src.config.paths_config import *
+from src.utils.common_funtions import read_yaml
+
+
+# Buckets de latencia en segundos (estilo Prometheus)
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+# Buckets para nº de candidatos por etapa
+COUNT_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000, 10000)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+# =========================
+# HISTOGRAM
+# =========================
+# Buckets acumulados (para Prometheus) + ventana de las últimas muestras
+# para calcular p50 / p95 / p99
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS, window=2048):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.samples = deque(maxlen=window)
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+        self.samples.append(value)
+
+    def quantiles(self):
+        if not self.samples:
+            return {q: 0.0 for q in QUANTILES}
+        values = np.percentile(np.fromiter(self.samples, dtype=np.float64), [q * 100 for q in QUANTILES])
+        return dict(zip(QUANTILES, values))
+
+
+# =========================
+# TIMERS
+# =========================
+
+class _NullTimer:
+    # Timer vacío cuando las métricas están desactivadas (sin coste)
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _NullStopwatch:
+    def lap(self, stage):
+        pass
+
+    def finish(self):
+        pass
+
+
+_NULL_STOPWATCH = _NullStopwatch()
+
+
+class _Stopwatch:
+    # Mide etapas consecutivas de un mismo flujo sin anidar bloques:
+    # cada lap() registra el tiempo desde el lap anterior
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+        self.start = self.last = time.perf_counter()
+
+    def lap(self, stage):
+        now = time.perf_counter()
+        self.registry.observe(self.name, now - self.last, stage=stage)
+        self.last = now
+
+    def finish(self):
+        self.registry.observe(self.name, time.perf_counter() - self.start, stage="total")
+
+
+class _Timer:
+    def __init__(self, registry, name, labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.observe(self.name, time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+# =========================
+# METRICS REGISTRY
+# =========================
+# Contadores e histogramas con etiquetas, exportados en formato de texto
+# de Prometheus. Si enabled=False todas las operaciones son no-op.
+
+class MetricsRegistry:
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.counters = {}      # (nombre, etiquetas) -> valor
+        self.histograms = {}    # (nombre, etiquetas) -> Histogram
+        self._buckets = {}      # nombre -> buckets
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def register_histogram(self, name, buckets):
+        self._buckets[name] = buckets
+
+    # -------------------- REGISTRO --------------------
+    def inc(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = Histogram(self._buckets.get(name, LATENCY_BUCKETS))
+                self.histograms[key] = histogram
+            histogram.observe(value)
+
+    def timer(self, name, **labels):
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name, labels)
+
+    def stopwatch(self, name):
+        if not self.enabled:
+            return _NULL_STOPWATCH
+        return _Stopwatch(self, name)
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    # -------------------- EXPORTACIÓN --------------------
+    @staticmethod
+    def _labels(labels, extra=()):
+        pairs = list(labels) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+    def render(self):
+        # Formato de texto de Prometheus (version 0.0.4)
+        lines = []
+
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(self.histograms.items(), key=lambda item: item[0])
+
+            seen = set()
+            for (name, labels), value in counters:
+                if name not in seen:
+                    lines.append(f"# TYPE {name} counter")
+                    seen.add(name)
+                lines.append(f"{name}{self._labels(labels)} {value}")
+
+            for (name, labels), histogram in histograms:
+                if name not in seen:
+                    lines.append(f"# TYPE {name} histogram")
+                    seen.add(name)
+
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{self._labels(labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{name}_bucket{self._labels(labels, [('le', '+Inf')])} {histogram.count}")
+                lines.append(f"{name}_sum{self._labels(labels)} {histogram.total}")
+                lines.append(f"{name}_count{self._labels(labels)} {histogram.count}")
+
+            # p50 / p95 / p99 de la ventana reciente como gauges
+            seen = set()
+            for (name, labels), histogram in histograms:
+                if name not in seen:
+                    lines.append(f"# TYPE {name}_quantile gauge")
+                    seen.add(name)
+                for quantile, value in histogram.quantiles().items():
+                    lines.append(
+                        f"{name}_quantile{self._labels(labels, [('quantile', quantile)])} {value}"
+                    )
+
+        return "\n".join(lines) + "\n"
+
+
+# =========================
+# INSTANCIA GLOBAL
+# =========================
+# Se activa con serving.metrics.enabled en config.yaml o con la
+# variable de entorno METRICS_ENABLED=1 (tiene prioridad)
+
+def _metrics_enabled():
+    env = os.environ.get("METRICS_ENABLED")
+    if env is not None:
+        return env.lower() in ("1", "true", "yes")
+
+    try:
+        return bool(read_yaml(CONFIG_PATH).get("serving", {}).get("metrics", {}).get("enabled", False))
+    except Exception:
+        return False
+
+
+metrics = MetricsRegistry(enabled=_metrics_enabled())
+metrics.register_histogram("pipeline_candidates", COUNT_BUCKETS)
+metrics.register_histogram("pipeline_batch_size", COUNT_BUCKETS)
@@ -0,0 +1,103 @@
+# =========================
+# IMPORTS
+# =========================
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+# =========================
+# MICRO-BATCHER
+# =========================
+# Agrupa peticiones concurrentes de un solo usuario en un único lote:
+#   - Cada petición se encola y recibe un Future
+#   - Un hilo de fondo espera hasta max_batch_size peticiones o max_wait_ms
+#     desde la primera, y resuelve todo el lote con una sola llamada
+#   - Las peticiones se agrupan por parámetros (user_weight, content_weight, n)
+# Así N productos matriz-vector se convierten en un producto matriz-matriz.
+
+class MicroBatcher:
+    def __init__(self, process_batch, max_batch_size=64, max_wait_ms=5):
+        # process_batch(user_ids, params) -> lista de resultados en el mismo orden
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self.batches = 0
+        self.batched_requests = 0
+
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            with self._lock:
+                if self._worker is None or not self._worker.is_alive():
+                    self._worker = threading.Thread(
+                        target=self._run, name="micro-batcher", daemon=True
+                    )
+                    self._worker.start()
+
+    # -------------------- API --------------------
+    def submit(self, user_id, params):
+        # params: tupla hashable (user_weight, content_weight, n)
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((user_id, params, future))
+        return future
+
+    def __call__(self, user_id, params, timeout=None):
+        return self.submit(user_id, params).result(timeout=timeout)
+
+    # -------------------- HILO DE FONDO --------------------
+    def _collect(self):
+        # Bloquea hasta la primera petición y espera al resto del lote
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            self.batches += 1
+            self.batched_requests += len(batch)
+
+            # Un lote por combinación de parámetros
+            groups = {}
+            for user_id, params, future in batch:
+                groups.setdefault(params, []).append((user_id, future))
+
+            for params, requests in groups.items():
+                try:
+                    results = self.process_batch(
+                        [user_id for user_id, _ in requests], params
+                    )
+                    for (_, future), result in zip(requests, results):
+                        future.set_result(result)
+                except Exception as e:
+                    logger.error(f"Micro-batch of {len(requests)} requests failed: {e}")
+                    for _, future in requests:
+                        future.set_exception(e)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "requests": self.batched_requests,
+            "mean_batch_size": self.batched_requests / self.batches if self.batches else 0.0,
+        }
@@ -0,0 +1,35 @@
+# =========================
+# IMPORTS
+# =========================
+
+from src.config.paths_config import *
+from src.data_preprocessing.preference_index import UserPreferenceIndex
+from src.data_preprocessing.columnar_dataset import ColumnarDataset
+from src.serving.artifact_store import get_artifact_store
+
+
+# =========================
+# ACCESO AL ÍNDICE DE PREFERENCIAS
+# =========================
+# Usa el índice CSR que genera DataProcessor (memory-mapped). Si no existe
+# (artefactos antiguos), lo construye una sola vez a partir de las columnas
+# de ratings procesados o, en último caso, de rating_df.csv.
+
+def get_preference_index(path_rating_df=RATING_DF):
+    def build(store):
+        if path_rating_df == RATING_DF and UserPreferenceIndex.exists(USER_PREFERENCES_DIR):
+            return UserPreferenceIndex.load(USER_PREFERENCES_DIR)
+
+        if path_rating_df == RATING_DF and ColumnarDataset.exists(RATINGS_DATASET_DIR):
+            rating_df = ColumnarDataset.open(
+                RATINGS_DATASET_DIR, columns=["user_id", "anime_id", "rating"]
+            )
+        else:
+            rating_df = store.get(path_rating_df)
+        return UserPreferenceIndex.from_ratings(
+            rating_df["user_id"].values,
+            rating_df["anime_id"].values,
+            rating_df["rating"].values
+        )
+
+    return get_artifact_store().derived(f"preferences:{path_rating_df}", build)
@@ -0,0 +1,294 @@
+# =========================
+# IMPORTS
+# =========================
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from src.logger import get_logger
+from src.exception import CustomException
+from src.config.paths_config import *
+from src.utils.common_funtions import read_yaml
+from src.serving.artifact_store import artifact_version, get_artifact_store
+
+logger = get_logger(__name__)
+
+
+# =========================
+# BACKENDS
+# =========================
+# Todos los backends guardan bytes (resultado serializado con pickle) y
+# exponen la misma interfaz: get / set / clear / delete_other_versions.
+
+class InMemoryBackend:
+    # LRU en memoria del proceso con TTL y límites de entradas / bytes
+    def __init__(self, max_entries=10000, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()    # key -> (value, expires_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            value, expires_at = entry
+            if expires_at < time.time():
+                self._remove(key)
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl_seconds, version=None):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (value, time.time() + ttl_seconds)
+            self._bytes += len(value)
+
+            # Expulsa las entradas menos usadas recientemente
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        value, _ = self._entries.pop(key)
+        self._bytes -= len(value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def delete_other_versions(self, version):
+        # Las claves llevan la versión como prefijo
+        with self._lock:
+            for key in [k for k in self._entries if not k.startswith(f"{version}:")]:
+                self._remove(key)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteBackend:
+    # Caché compartida entre workers (varios procesos) en un fichero SQLite
+    def __init__(self, path=RESULT_CACHE_PATH, max_entries=100000):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, version TEXT, value BLOB, "
+            "expires_at REAL, last_access REAL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS results_last_access ON results(last_access)"
+        )
+        self._conn.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM results WHERE key = ? AND expires_at >= ?",
+                (key, now)
+            ).fetchone()
+            if row is None:
+                return None
+
+            self._conn.execute(
+                "UPDATE results SET last_access = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            return row[0]
+
+    def set(self, key, value, ttl_seconds, version=None):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                (key, version, sqlite3.Binary(value), now + ttl_seconds, now)
+            )
+
+            # Expulsa caducadas y, si sobran, las menos usadas recientemente
+            self._conn.execute("DELETE FROM results WHERE expires_at < ?", (now,))
+            self._conn.execute(
+                "DELETE FROM results WHERE key IN ("
+                "SELECT key FROM results ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM results")
+            self._conn.commit()
+
+    def delete_other_versions(self, version):
+        with self._lock:
+            self._conn.execute("DELETE FROM results WHERE version != ?", (version,))
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+
+# =========================
+# RESULT CACHE
+# =========================
+# Caché de resultados delante del pipeline de predicción.
+#   - Clave: (versión de artefactos, user_id, user_weight, content_weight, n)
+#   - Backends en cascada: primero memoria del proceso, luego la compartida
+#   - Si los pesos o los datos procesados cambian en disco, la versión
+#     cambia: se descartan las entradas antiguas y se recargan los artefactos
+
+class ResultCache:
+    def __init__(self, backends, ttl_seconds=3600, version_check_seconds=5.0,
+                 version_fn=artifact_version):
+        self.backends = backends
+        self.ttl_seconds = ttl_seconds
+        self.version_check_seconds = version_check_seconds
+        self.version_fn = version_fn
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    # -------------------- VERSIÓN --------------------
+    def version(self):
+        now = time.time()
+        if self._version is not None and now - self._checked_at < self.version_check_seconds:
+            return self._version
+
+        with self._lock:
+            current = self.version_fn()
+            self._checked_at = now
+
+            if self._version is not None and current != self._version:
+                # Artefactos nuevos: fuera resultados viejos y artefactos en memoria
+                for backend in self.backends:
+                    backend.delete_other_versions(current)
+                get_artifact_store().clear()
+                self.invalidations += 1
+                logger.info(f"Artifacts changed ({self._version} -> {current}), cache invalidated")
+
+            self._version = current
+            return current
+
+    @staticmethod
+    def make_key(version, user_id, user_weight, content_weight, n):
+        return f"{version}:{int(user_id)}:{float(user_weight)}:{float(content_weight)}:{int(n)}"
+
+    # -------------------- LECTURA / ESCRITURA --------------------
+    def get(self, key):
+        for level, backend in enumerate(self.backends):
+            value = backend.get(key)
+            if value is not None:
+                # Rellena los niveles más rápidos
+                for faster in self.backends[:level]:
+                    faster.set(key, value, self.ttl_seconds, key.split(":", 1)[0])
+                self.hits += 1
+                return pickle.loads(value)
+
+        self.misses += 1
+        return None
+
+    def set(self, key, result):
+        value = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        version = key.split(":", 1)[0]
+        for backend in self.backends:
+            backend.set(key, value, self.ttl_seconds, version)
+
+    def get_or_compute(self, user_id, user_weight, content_weight, n, compute):
+        key = self.make_key(self.version(), user_id, user_weight, content_weight, n)
+
+        result = self.get(key)
+        if result is None:
+            result = compute()
+            self.set(key, result)
+        return result
+
+    def clear(self):
+        for backend in self.backends:
+            backend.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "invalidations": self.invalidations,
+            "entries": [len(backend) for backend in self.backends],
+            "version": self._version,
+        }
+
+
+# =========================
+# CONSTRUCCIÓN DESDE CONFIG
+# =========================
+
+def build_result_cache(cache_config):
+    try:
+        backend = cache_config.get("backend", "memory")
+        backends = []
+
+        if backend in ("memory", "tiered"):
+            backends.append(InMemoryBackend(
+                max_entries=cache_config.get("max_entries", 10000),
+                max_bytes=cache_config.get("max_bytes", 64 * 1024 * 1024)
+            ))
+        if backend in ("sqlite", "tiered"):
+            backends.append(SQLiteBackend(
+                path=cache_config.get("sqlite_path") or RESULT_CACHE_PATH,
+                max_entries=cache_config.get("sqlite_max_entries", 100000)
+            ))
+        if not backends:
+            raise ValueError(f"Unknown cache backend: {backend}")
+
+        logger.info(f"Result cache created with backend: {backend}")
+        return ResultCache(
+            backends,
+            ttl_seconds=cache_config.get("ttl_seconds", 3600),
+            version_check_seconds=cache_config.get("version_check_seconds", 5)
+        )
+    except Exception as e:
+        raise CustomException("Failed to create result cache", e)
+
+
+_cache = None
+_cache_loaded = False
+_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    # None si la caché está desactivada en config.yaml
+    global _cache, _cache_loaded
+
+    if not _cache_loaded:
+        with _cache_lock:
+            if not _cache_loaded:
+                cache_config = read_yaml(CONFIG_PATH).get("serving", {}).get("cache", {})
+                if cache_config.get("enabled", False):
+                    _cache = build_result_cache(cache_config)
+                _cache_loaded = True
+    return _cache
@@ -0,0 +1,210 @@
+# =========================
+# IMPORTS
+# =========================
+
+import numpy as np
+
+from src.logger import get_logger
+from src.config.paths_config import *
+from src.utils.common_funtions import read_yaml
+from src.data_trainer.ann_index import IVFIndex
+from src.data_trainer.neighbour_table import NeighbourTable
+from src.data_trainer.quantization import QuantizedMatrix
+from src.serving.artifact_store import get_artifact_store
+
+logger = get_logger(__name__)
+
+
+# =========================
+# SIMILARITY ENGINE
+# =========================
+# Búsqueda top-k sobre las matrices de embeddings L2-normalizadas que
+# escribe ModelTraining.extract_weights (la similitud coseno es el
+# producto punto).
+#   - Un lote de consultas se resuelve con una sola multiplicación de matrices
+#   - top-k / bottom-k con argpartition (O(N) por fila en vez de O(N log N))
+#   - Permite excluir índices (la propia consulta o items ya vistos)
+#   - Opcionalmente usa un índice ANN (IVFIndex); exact=True o neg=True
+#     fuerzan la búsqueda exacta por fuerza bruta
+#   - Opcionalmente usa una tabla de vecinos precalculada (NeighbourTable):
+#     top_k sin exclusiones extra y con k <= K es un slice, sin GEMM
+#   - Acepta una QuantizedMatrix (float16 / int8): los scores se calculan
+#     por bloques sobre la matriz cuantizada
+
+class SimilarityEngine:
+    def __init__(self, weights, block_size=1024, index=None, n_probe=None, neighbours=None):
+        self.weights = weights if isinstance(weights, QuantizedMatrix) else np.asarray(weights)
+        self.block_size = block_size   # consultas por bloque (limita memoria B x N)
+        self.index = index             # índice ANN opcional
+        self.n_probe = n_probe
+        self.neighbours = neighbours   # tabla de vecinos precalculada opcional
+
+    def __len__(self):
+        return self.weights.shape[0]
+
+    # -------------------- SCORES --------------------
+    def scores(self, query_indices):
+        # Similitud de cada consulta contra todas las filas: (B, N)
+        query_indices = np.asarray(query_indices, dtype=np.int64).ravel()
+        return self.score_vectors(self.weights[query_indices])
+
+    def score_vectors(self, vectors):
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=self.weights.dtype))
+        if isinstance(self.weights, QuantizedMatrix):
+            return self.weights.dot(vectors)
+        return vectors @ self.weights.T
+
+    # -------------------- TOP-K --------------------
+    def top_k(self, query_indices, k=10, neg=False, exclude=None, exclude_self=True, exact=False):
+        # Vecinos de un lote de índices codificados
+        query_indices = np.asarray(query_indices, dtype=np.int64).ravel()
+
+        # Caso habitual (vecinos de un anime): lectura directa de la tabla
+        if (self.neighbours is not None and exclude_self and exclude is None
+                and not neg and not exact and k <= self.neighbours.k):
+            return self.neighbours.lookup(query_indices, k)
+
+        exclude = self._per_query(exclude, len(query_indices))
+
+        if exclude_self:
+            exclude = [
+                np.append(np.asarray(excluded, dtype=np.int64), query)
+                for excluded, query in zip(exclude, query_indices)
+            ]
+
+        return self.search(
+            self.weights[query_indices], k=k, neg=neg, exclude=exclude, exact=exact
+        )
+
+    def search(self, vectors, k=10, neg=False, exclude=None, exact=False):
+        # Vecinos de un lote de vectores de consulta
+        # Devuelve (indices, scores), ambos (B, k), ordenados de más a menos
+        # similar (o de menos a más si neg=True). Los índices excluidos
+        # nunca se devuelven mientras queden suficientes candidatos.
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=self.weights.dtype))
+        n_queries = vectors.shape[0]
+        k = min(k, len(self))
+        exclude = self._per_query(exclude, n_queries)
+
+        if self.index is not None and not exact and not neg:
+            indices, scores = self.index.search(
+                vectors, k=k, n_probe=self.n_probe, exclude=exclude,
+                rerank_weights=self.weights
+            )
+
+            # Consultas con menos de k candidatos en sus listas -> exacto
+            missing = np.flatnonzero((indices < 0).any(axis=1))
+            if len(missing):
+                indices[missing], scores[missing] = self.search(
+                    vectors[missing], k=k, exclude=[exclude[i] for i in missing], exact=True
+                )
+            return indices, scores
+
+        indices = np.empty((n_queries, k), dtype=np.int64)
+        scores = np.empty((n_queries, k), dtype=np.float32)
+
+        for start in range(0, n_queries, self.block_size):
+            stop = min(start + self.block_size, n_queries)
+            block = self.score_vectors(vectors[start:stop])
+            self._mask(block, exclude[start:stop], neg)
+
+            block_indices, block_scores = self._select(block, k, neg)
+            indices[start:stop] = block_indices
+            scores[start:stop] = block_scores
+
+        return indices, scores
+
+    # -------------------- INTERNOS --------------------
+    @staticmethod
+    def _per_query(exclude, n_queries):
+        # None -> sin exclusiones; array plano -> mismas exclusiones para todas
+        if exclude is None or len(exclude) == 0:
+            return [np.empty(0, dtype=np.int64)] * n_queries
+        if np.ndim(exclude[0]) == 0:
+            shared = np.asarray(exclude, dtype=np.int64)
+            return [shared] * n_queries
+        return list(exclude)
+
+    @staticmethod
+    def _mask(block, exclude, neg):
+        # Los excluidos reciben el peor score posible
+        fill = np.inf if neg else -np.inf
+        rows = [
+            np.full(len(excluded), row, dtype=np.int64)
+            for row, excluded in enumerate(exclude)
+        ]
+        if rows:
+            rows = np.concatenate(rows)
+            cols = np.concatenate([np.asarray(e, dtype=np.int64) for e in exclude])
+            block[rows, cols] = fill
+
+    @staticmethod
+    def _select(block, k, neg):
+        # argpartition para quedarse con k candidatos y ordenarlos solo a ellos
+        keys = block if neg else -block
+        if k < block.shape[1]:
+            candidates = np.argpartition(keys, k - 1, axis=1)[:, :k]
+        else:
+            candidates = np.broadcast_to(np.arange(block.shape[1]), block.shape).copy()
+
+        candidate_keys = np.take_along_axis(keys, candidates, axis=1)
+        order = np.argsort(candidate_keys, axis=1, kind="stable")
+
+        indices = np.take_along_axis(candidates, order, axis=1)
+        scores = np.take_along_axis(block, indices, axis=1)
+        return indices, scores
+
+
+# =========================
+# ACCESO A LOS MOTORES
+# =========================
+# Un motor por matriz de pesos, compartido a través del ArtifactStore.
+# Si ann.enabled está activo en config.yaml y existe el índice junto a
+# los pesos, el motor lo usa para las búsquedas top-k.
+
+ANN_DIRS = {
+    "user": (USER_WEIGHTS_PATH, USER_ANN_DIR),
+    "anime": (ANIME_WEIGHTS_PATH, ANIME_ANN_DIR),
+}
+
+
+def _load_ann_index(path_weights):
+    ann_config = read_yaml(CONFIG_PATH).get("ann", {})
+    if not ann_config.get("enabled", False):
+        return None, None
+
+    for table in ann_config.get("tables", []):
+        table_weights, index_dir = ANN_DIRS[table]
+        if table_weights == path_weights and IVFIndex.exists(index_dir):
+            return IVFIndex.load(index_dir), ann_config.get("n_probe")
+
+    return None, None
+
+
+NEIGHBOUR_TABLES = {
+    ANIME_WEIGHTS_PATH: (ANIME_NEIGHBOUR_IDS, ANIME_NEIGHBOUR_SIMS),
+}
+
+
+def _load_neighbour_table(path_weights, n_rows):
+    paths = NEIGHBOUR_TABLES.get(path_weights)
+    if paths is None or not NeighbourTable.exists(*paths):
+        return None
+
+    table = NeighbourTable.load(*paths)
+
+    # Tabla de un entrenamiento anterior -> se ignora
+    if len(table) != n_rows:
+        logger.warning(f"Neighbour table {paths[0]} does not match {path_weights}, ignoring it")
+        return None
+    return table
+
+
+def get_similarity_engine(path_weights):
+    def build(store):
+        weights = store.get(path_weights)
+        index, n_probe = _load_ann_index(path_weights)
+        neighbours = _load_neighbour_table(path_weights, len(weights))
+        return SimilarityEngine(weights, index=index, n_probe=n_probe, neighbours=neighbours)
+
+    return get_artifact_store().derived(f"similarity:{path_weights}", build)
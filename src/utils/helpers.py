@@ -4,8 +4,11 @@
 
 import pandas as pd              # Para manejo de dataframes
 import numpy as np               # Para operaciones matemáticas y vectores
-import joblib                    # Para cargar modelos y pesos entrenados
 from src.config.paths_config import *  # Importa rutas de archivos (buena práctica MLOps)
+from src.serving.artifact_store import get_artifact_store  # Artefactos cargados una sola vez
+from src.serving.anime_catalog import get_anime_catalog    # Catálogo de animes indexado
+from src.serving.similarity import get_similarity_engine   # Top-k por lotes sobre embeddings
+from src.serving.preferences import get_preference_index   # Índice CSR de preferencias
 
 
 # =========================
@@ -15,15 +18,8 @@ from src.config.paths_config import *  # Importa rutas de archivos (buena práct
 # Puede buscar por ID (int) o por nombre (str)
 
 def getAnimeFrame(anime, path_df):
-    df = pd.read_csv(path_df)    # Carga el dataframe de animes
-
-    # Si el anime se pasa como ID
-    if isinstance(anime, int):
-        return df[df.anime_id == anime]
-
-    # Si el anime se pasa como nombre
-    if isinstance(anime, str):
-        return df[df.eng_version == anime]
+    # Búsqueda O(1) en el catálogo indexado (sin filtrar el dataframe)
+    return get_anime_catalog(path_anime_df=path_df).frame(anime)
 
 
 # =========================
@@ -33,15 +29,8 @@ def getAnimeFrame(anime, path_df):
 # Puede buscar por ID o por nombre
 
 def getSynopsis(anime, path_synopsis_df):
-    synopsis_df = pd.read_csv(path_synopsis_df)  # Carga el dataframe de sinopsis
-
-    # Búsqueda por ID
-    if isinstance(anime, int):
-        return synopsis_df[synopsis_df.MAL_ID == anime].sypnopsis.values[0]
-
-    # Búsqueda por nombre
-    if isinstance(anime, str):
-        return synopsis_df[synopsis_df.Name == anime].sypnopsis.values[0]
+    # Búsqueda O(1) por ID o por nombre en el catálogo
+    return get_anime_catalog(path_synopsis_df=path_synopsis_df).synopsis(anime)
 
 
 # =========================
@@ -59,15 +48,21 @@ def find_similar_animes(
     return_dist=False,
     neg=False
 ):
-    # Carga los pesos del modelo (embeddings)
-    anime_weights = joblib.load(path_anime_weights)
+    store = get_artifact_store()
+    catalog = get_anime_catalog(path_anime_df=path_anime_df)
+
+    # Motor de similitud sobre los embeddings de anime
+    engine = get_similarity_engine(path_anime_weights)
 
     # Diccionarios de codificación / decodificación
-    anime2anime_encoded = joblib.load(path_anime2anime_encoded)
-    anime2anime_decoded = joblib.load(path_anime2anime_decoded)
+    anime2anime_encoded = store.get(path_anime2anime_encoded)
+    anime2anime_decoded = store.get(path_anime2anime_decoded)
 
     # Obtiene el anime_id a partir del nombre
-    index = getAnimeFrame(name, path_anime_df).anime_id.values[0]
+    anime = catalog.get(name)
+    if anime is None:
+        raise ValueError(f"Anime not found in catalog: {name}")
+    index = anime["anime_id"]
 
     # Convierte el anime_id a índice interno del embedding
     encoded_index = anime2anime_encoded.get(index)
@@ -76,50 +71,33 @@ def find_similar_animes(
     if encoded_index is None:
         raise ValueError(f"Encoded index not found for anime ID: {index}")
 
-    # Calcula similitud usando producto punto
-    weights = anime_weights
-    dists = np.dot(weights, weights[encoded_index])
-
-    # Ordena los índices por similitud
-    sorted_dists = np.argsort(dists)
-
-    # Se suma 1 para excluir el propio anime
-    n = n + 1
-
-    # Si neg=True devuelve los menos similares
-    if neg:
-        closest = sorted_dists[:n]
-    else:
-        closest = sorted_dists[-n:]
-
-    # Si solo se quieren distancias
+    # Si solo se quieren distancias (incluye el propio anime, como antes)
     if return_dist:
-        return dists, closest
-
-    # Construye la lista de resultados
-    SimilarityArr = []
+        dists = engine.scores([encoded_index])[0]
+        closest, _ = engine.top_k(
+            [encoded_index], k=n + 1, neg=neg, exclude_self=False
+        )
+        # Mismo orden que np.argsort (ascendente por similitud)
+        return dists, closest[0] if neg else closest[0][::-1]
 
-    for close in closest:
-        decoded_id = anime2anime_decoded.get(close)
+    # Top-n con argpartition, excluyendo el propio anime
+    closest, similarities = engine.top_k([encoded_index], k=n, neg=neg)
+    closest, similarities = closest[0], similarities[0]
 
-        anime_frame = getAnimeFrame(decoded_id, path_anime_df)
+    # Construye los resultados con un único gather sobre el catálogo
+    decoded_ids = np.array(
+        [anime2anime_decoded.get(close) for close in closest], dtype=np.int64
+    )
+    fields = catalog.lookup(decoded_ids, ["eng_version", "Genres"])
 
-        anime_name = anime_frame.eng_version.values[0]
-        genre = anime_frame.Genres.values[0]
-        similarity = dists[close]
-
-        SimilarityArr.append({
-            "anime_id": decoded_id,
-            "name": anime_name,
-            "similarity": similarity,
-            "genre": genre,
-        })
+    Frame = pd.DataFrame({
+        "name": fields["eng_version"],
+        "similarity": similarities,
+        "genre": fields["Genres"],
+    })
 
     # Devuelve dataframe ordenado por similitud
-    Frame = pd.DataFrame(SimilarityArr).sort_values(by="similarity", ascending=False)
-
-    # Elimina el anime original
-    return Frame[Frame.anime_id != index].drop(['anime_id'], axis=1)
+    return Frame.sort_values(by="similarity", ascending=False)
 
 
 # =========================
@@ -137,50 +115,32 @@ def find_similar_users(
     neg=False
 ):
     try:
-        # Carga embeddings y diccionarios
-        user_weights = joblib.load(path_user_weights)
-        user2user_encoded = joblib.load(path_user2user_encoded)
-        user2user_decoded = joblib.load(path_user2user_decoded)
+        # Motor de similitud y diccionarios (en memoria)
+        store = get_artifact_store()
+        engine = get_similarity_engine(path_user_weights)
+        user2user_encoded = store.get(path_user2user_encoded)
+        user2user_decoded = store.get(path_user2user_decoded)
 
         index = item_input
         encoded_index = user2user_encoded.get(index)
 
-        weights = user_weights
-
-        # Similaridad por producto punto
-        dists = np.dot(weights, weights[encoded_index])
-        sorted_dists = np.argsort(dists)
-
-        n = n + 1
-
-        if neg:
-            closest = sorted_dists[:n]
-        else:
-            closest = sorted_dists[-n:]
-
         if return_dist:
-            return dists, closest
-
-        SimilarityArr = []
-
-        for close in closest:
-            similarity = dists[close]
-
-            if isinstance(item_input, int):
-                decoded_id = user2user_decoded.get(close)
-                SimilarityArr.append({
-                    "similar_users": decoded_id,
-                    "similarity": similarity
-                })
-
-        similar_users = pd.DataFrame(SimilarityArr).sort_values(
-            by="similarity", ascending=False
-        )
-
-        # Elimina el propio usuario
-        similar_users = similar_users[similar_users.similar_users != item_input]
+            dists = engine.scores([encoded_index])[0]
+            closest, _ = engine.top_k(
+                [encoded_index], k=n + 1, neg=neg, exclude_self=False
+            )
+            # Mismo orden que np.argsort (ascendente por similitud)
+            return dists, closest[0] if neg else closest[0][::-1]
+
+        # Top-n con argpartition, excluyendo el propio usuario
+        closest, similarities = engine.top_k([encoded_index], k=n, neg=neg)
+
+        similar_users = pd.DataFrame({
+            "similar_users": [user2user_decoded.get(close) for close in closest[0]],
+            "similarity": similarities[0],
+        })
 
-        return similar_users
+        return similar_users.sort_values(by="similarity", ascending=False)
 
     except Exception as e:
         print("Error Occured", e)
@@ -192,34 +152,24 @@ def find_similar_users(
 # Obtiene los animes favoritos de un usuario
 # Usa el percentil 75 de rating
 
-def get_user_preferences(user_id, path_rating_df, path_anime_df):
+def get_user_preference_rows(user_id, path_rating_df, path_anime_df):
+    # Filas del catálogo con los animes favoritos del usuario
+    # (slice del índice de preferencias, sin recorrer rating_df)
+    index = get_preference_index(path_rating_df)
+    catalog = get_anime_catalog(path_anime_df=path_anime_df)
 
-    rating_df = pd.read_csv(path_rating_df)
-    df = pd.read_csv(path_anime_df)
+    rows = catalog.rows(index.liked(user_id))
+    return np.unique(rows[rows >= 0])
 
-    # Filtra ratings del usuario
-    animes_watched_by_user = rating_df[rating_df.user_id == user_id]
 
-    # Calcula el percentil 75
-    user_rating_percentile = np.percentile(
-        animes_watched_by_user.rating, 75
-    )
-
-    # Filtra animes mejor valorados
-    animes_watched_by_user = animes_watched_by_user[
-        animes_watched_by_user.rating >= user_rating_percentile
-    ]
+def get_user_preferences(user_id, path_rating_df, path_anime_df):
+    catalog = get_anime_catalog(path_anime_df=path_anime_df)
 
-    # Obtiene IDs ordenados por rating
-    top_animes_user = (
-        animes_watched_by_user
-        .sort_values(by="rating", ascending=False)
-        .anime_id.values
-    )
+    # Animes con rating >= percentil 75 (precalculado en el índice)
+    rows = get_user_preference_rows(user_id, path_rating_df, path_anime_df)
 
-    # Obtiene nombre y género
-    anime_df_rows = df[df["anime_id"].isin(top_animes_user)]
-    anime_df_rows = anime_df_rows[["eng_version", "Genres"]]
+    # Obtiene nombre y género (filas del catálogo en su orden original)
+    anime_df_rows = catalog.frame_rows(rows)[["eng_version", "Genres"]]
 
     return anime_df_rows
 
@@ -241,19 +191,26 @@ def get_user_recommendations(
     recommended_animes = []
     anime_list = []
 
+    catalog = get_anime_catalog(
+        path_anime_df=path_anime_df,
+        path_synopsis_df=path_synopsis_df
+    )
+    anime_names = catalog.columns["eng_version"]
+
     # Recorre usuarios similares
     for user_id in similar_users.similar_users.values:
-        pref_list = get_user_preferences(
+        rows = get_user_preference_rows(
             int(user_id), path_rating_df, path_anime_df
         )
+        pref_list = pd.Series(anime_names[rows])
 
         # Elimina animes ya vistos por el usuario original
         pref_list = pref_list[
-            ~pref_list.eng_version.isin(user_pref.eng_version.values)
+            ~pref_list.isin(user_pref.eng_version.values)
         ]
 
         if not pref_list.empty:
-            anime_list.append(pref_list.eng_version.values)
+            anime_list.append(pref_list.values)
 
     if anime_list:
         anime_list = pd.DataFrame(anime_list)
@@ -264,22 +221,27 @@ def get_user_recommendations(
             .head(n)
         )
 
-        for anime_name in sorted_list.index:
-            n_user_pref = sorted_list.loc[anime_name].values[0]
-
-            if isinstance(anime_name, str):
-                frame = getAnimeFrame(anime_name, path_anime_df)
-                anime_id = frame.anime_id.values[0]
-                genre = frame.Genres.values[0]
-                synopsis = getSynopsis(
-                    int(anime_id), path_synopsis_df
-                )
-
-                recommended_animes.append({
-                    "n": n_user_pref,
-                    "anime_name": anime_name,
-                    "Genres": genre,
-                    "Synopsis": synopsis
-                })
+        # Solo nombres válidos (str)
+        sorted_list = sorted_list[
+            [isinstance(anime_name, str) for anime_name in sorted_list.index]
+        ]
+
+        # Gather en lote de géneros y sinopsis
+        fields = catalog.take(
+            catalog.rows_by_name(sorted_list.index),
+            ["anime_id", "Genres"]
+        )
+        synopses = catalog.synopses(
+            [-1 if anime_id is None else anime_id for anime_id in fields["anime_id"]]
+        )
+
+        recommended_animes = pd.DataFrame({
+            "n": sorted_list.iloc[:, 0].values,
+            "anime_name": sorted_list.index.values,
+            "Genres": fields["Genres"],
+            "Synopsis": synopses,
+        })
+
+        return recommended_animes.head(n)
 
     return pd.DataFrame(recommended_animes).head(n)
@@ -0,0 +1,85 @@
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:     # Windows
+    resource = None
+
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def _max_rss_mb():
+    # Pico de memoria residente del proceso (ru_maxrss está en KB en Linux)
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+# Mide tiempo y pico de memoria de cada etapa de un pipeline:
+#   - peak_mb: pico de memoria asignada durante la etapa (tracemalloc,
+#     incluye los buffers de NumPy / pandas)
+#   - delta_mb: memoria que la etapa deja viva al terminar
+#   - max_rss_mb: pico de RSS del proceso hasta ese momento
+# tracemalloc mide todo el proceso: cuando el DAG de entrenamiento ejecuta
+# etapas a la vez en hilos, el pico de una etapa incluye lo que asignan las
+# demás. Además añade un coste apreciable a cada asignación, por eso
+# data_processing.report_memory está desactivado por defecto.
+class StageMemoryTracker:
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.report = {}
+        self._started = False
+
+    @contextmanager
+    def stage(self, name):
+        if not self.enabled:
+            yield
+            return
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started = True
+
+        # reset_peak solo existe desde Python 3.9 (la imagen usa 3.8): sin
+        # él el pico es el máximo desde que empezó la traza, así que si no
+        # creció durante la etapa se toma la memoria al final
+        can_reset = hasattr(tracemalloc, "reset_peak")
+        if can_reset:
+            tracemalloc.reset_peak()
+        before, peak_before = tracemalloc.get_traced_memory()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            current, peak = tracemalloc.get_traced_memory()
+            if not can_reset and peak <= peak_before:
+                peak = max(before, current)
+            self.report[name] = {
+                "seconds": time.perf_counter() - start,
+                "peak_mb": peak / 2 ** 20,
+                "delta_mb": (current - before) / 2 ** 20,
+                "max_rss_mb": _max_rss_mb(),
+            }
+            logger.info(
+                f"Stage {name}: {self.report[name]['seconds']:.2f}s, "
+                f"peak {self.report[name]['peak_mb']:.1f} MB"
+            )
+
+    def stop(self):
+        if self._started:
+            tracemalloc.stop()
+            self._started = False
+
+    def save(self, path):
+        if not self.enabled:
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.report, f, indent=2)
+        logger.info(f"Memory report saved to {path}")
@@ -0,0 +1,189 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from src.logger import get_logger
+from src.exception import CustomException
+from src.config.paths_config import *
+
+logger = get_logger(__name__)
+
+
+# Etapa del pipeline: qué ejecuta, de qué depende y qué produce.
+#   inputs       -> ficheros / directorios que lee (se hashea su contenido)
+#   outputs      -> ficheros / directorios que escribe
+#   config_keys  -> secciones de config.yaml que le afectan ("model", "ann"...)
+#   code         -> módulos / paquetes cuyo código define la etapa
+#   after        -> etapas que deben terminar antes
+#   exclusive    -> se ejecuta sin ninguna otra etapa en marcha (las que
+#                   abren un ProcessPoolExecutor: hacer fork con otros hilos
+#                   activos puede dejar bloqueados locks de logging / pandas)
+class Stage:
+    def __init__(self, name, run, inputs=(), outputs=(), config_keys=(), code=(), after=(),
+                 exclusive=False):
+        self.name = name
+        self.run = run
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.config_keys = list(config_keys)
+        self.code = list(code)
+        self.after = list(after)
+        self.exclusive = exclusive
+
+
+# =========================
+# DAG CON CACHÉ POR CONTENIDO
+# =========================
+# Cada etapa se salta si la huella (hash de entradas + config + código)
+# coincide con la de la última ejecución y sus salidas siguen intactas.
+# Las etapas sin dependencias pendientes se ejecutan a la vez en hilos
+# (el trabajo pesado está en pandas / NumPy / TensorFlow, fuera del GIL).
+# El hash de cada fichero se guarda junto a su tamaño y mtime, así que
+# solo se vuelve a leer un fichero cuando cambia en disco.
+
+class StageDAG:
+    def __init__(self, stages, config, state_path=PIPELINE_STATE_PATH, max_workers=None):
+        self.stages = {stage.name: stage for stage in stages}
+        self.config = config
+        self.state_path = state_path
+        self.max_workers = max_workers or len(stages)
+
+        self.state = self._load_state()
+        self._lock = threading.Lock()
+
+        for stage in stages:
+            missing = [dep for dep in stage.after if dep not in self.stages]
+            if missing:
+                raise ValueError(f"Stage {stage.name} depends on unknown stages {missing}")
+
+    # -------------------- ESTADO --------------------
+    def _load_state(self):
+        if os.path.exists(self.state_path):
+            with open(self.state_path) as f:
+                return json.load(f)
+        return {"stages": {}, "files": {}}
+
+    def _save_state(self):
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        with open(self.state_path + ".tmp", "w") as f:
+            json.dump(self.state, f, indent=2, sort_keys=True)
+        os.replace(self.state_path + ".tmp", self.state_path)
+
+    # -------------------- HASHES --------------------
+    def _file_hash(self, path):
+        stat = os.stat(path)
+        signature = [stat.st_size, stat.st_mtime_ns]
+
+        with self._lock:
+            cached = self.state["files"].get(path)
+        if cached and cached[:2] == signature:
+            return cached[2]
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(16 * 1024 * 1024), b""):
+                digest.update(block)
+
+        with self._lock:
+            self.state["files"][path] = signature + [digest.hexdigest()]
+        return digest.hexdigest()
+
+    def _path_hash(self, path):
+        path = os.path.abspath(path)
+        if os.path.isfile(path):
+            return self._file_hash(path)
+        if not os.path.isdir(path):
+            return "missing"
+
+        digest = hashlib.sha256()
+        for root, dirs, files in os.walk(path):
+            dirs[:] = sorted(d for d in dirs if d != "__pycache__")
+            for name in sorted(files):
+                if name.endswith(".pyc"):
+                    continue
+                file_path = os.path.join(root, name)
+                digest.update(os.path.relpath(file_path, path).encode())
+                digest.update(self._file_hash(file_path).encode())
+        return digest.hexdigest()
+
+    def fingerprint(self, stage):
+        digest = hashlib.sha256(stage.name.encode())
+        for path in stage.inputs + stage.code:
+            digest.update(f"{path}:{self._path_hash(path)}".encode())
+        for key in stage.config_keys:
+            digest.update(f"{key}:{json.dumps(self.config.get(key), sort_keys=True)}".encode())
+        return digest.hexdigest()
+
+    def outputs_hash(self, stage):
+        return {path: self._path_hash(path) for path in stage.outputs}
+
+    def is_fresh(self, stage, fingerprint):
+        previous = self.state["stages"].get(stage.name)
+        return (
+            previous is not None
+            and previous["fingerprint"] == fingerprint
+            and previous["outputs"] == self.outputs_hash(stage)
+        )
+
+    # -------------------- EJECUCIÓN --------------------
+    def _execute(self, stage, force):
+        fingerprint = self.fingerprint(stage)
+        if not force and self.is_fresh(stage, fingerprint):
+            logger.info(f"Stage {stage.name} is up to date, skipping")
+            return "skipped", 0.0
+
+        logger.info(f"Running stage {stage.name}")
+        start = time.perf_counter()
+        stage.run()
+        seconds = time.perf_counter() - start
+
+        outputs = self.outputs_hash(stage)
+        with self._lock:
+            self.state["stages"][stage.name] = {"fingerprint": fingerprint, "outputs": outputs}
+            self._save_state()
+
+        logger.info(f"Stage {stage.name} finished in {seconds:.1f}s")
+        return "ran", seconds
+
+    def run(self, only=None, force=False):
+        # only: subconjunto de etapas a ejecutar (el resto se da por hecho)
+        selected = set(only or self.stages)
+        done = set(self.stages) - selected
+        pending = {name: self.stages[name] for name in selected}
+        results = {}
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                running = {}
+                while pending or running:
+                    ready = [
+                        name for name, stage in pending.items()
+                        if all(dep in done for dep in stage.after)
+                    ]
+                    exclusive = [name for name in ready if self.stages[name].exclusive]
+                    if any(self.stages[name].exclusive for name in running.values()):
+                        ready = []
+                    elif exclusive:
+                        # Espera a que terminen las demás y arranca sola
+                        ready = [] if running else exclusive[:1]
+
+                    for name in ready:
+                        running[pool.submit(self._execute, self.stages[name], force)] = name
+                        del pending[name]
+
+                    if not running:
+                        raise ValueError(f"Stages with unresolved dependencies: {sorted(pending)}")
+
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        name = running.pop(future)
+                        results[name] = future.result()
+                        done.add(name)
+
+            logger.info(f"Pipeline finished: {results}")
+            return results
+        except Exception as e:
+            raise CustomException("Pipeline stage failed", e)